@@ -1,133 +1,21 @@
 import sqlite3
-from datetime import datetime
-
-conn = sqlite3.connect('Hospital_Database.db')
-cursor = conn.cursor()
-
-# Create Patient table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS Patient (
-    PatientID INTEGER PRIMARY KEY AUTOINCREMENT,
-    Name TEXT,
-    DOB DATE,
-    Weight REAL,
-    Height REAL,
-    Gender TEXT,
-    PhoneNo TEXT,
-    EmailID TEXT,
-    Address TEXT,
-    MedicalHistory TEXT
-)
-''')
-
-# Create Doctor table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS Doctor (
-    DoctorID INTEGER PRIMARY KEY AUTOINCREMENT,
-    Name TEXT,
-    DOB DATE,
-    Gender TEXT,
-    Specialization TEXT,
-    PhoneNo TEXT,
-    EmailID TEXT,
-    Address TEXT,
-    AppointmentCost INTEGER,
-    YearsOfExperience INTEGER,
-    WorkStatus TEXT DEFAULT 'Active'
-)
-''')
-
-# Create Bill table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS Bill (
-    BillID INTEGER PRIMARY KEY AUTOINCREMENT,
-    PatientID INTEGER,
-    BillType TEXT,
-    Amount REAL,
-    Date DATE,
-    PaymentStatus TEXT DEFAULT 'Pending',
-    FOREIGN KEY (PatientID) REFERENCES Patient(PatientID)
-)
-''')
-
-# Create Room table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS Room (
-    RoomID INTEGER PRIMARY KEY AUTOINCREMENT,
-    RoomType TEXT,
-    AvailabilityStatus TEXT,
-    Cost REAL
-)
-''')
-
-# Create Leave table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS Leave (
-    LeaveID INTEGER PRIMARY KEY AUTOINCREMENT,
-    DoctorID INTEGER,
-    SelectDate DATE,
-    ReturnDate DATE,
-    NoOfDays INTEGER,
-    Reason TEXT,
-    LeaveStatus TEXT DEFAULT 'Pending',
-    FOREIGN KEY (DoctorID) REFERENCES Doctor(DoctorID)
-)
-''')
-
-# Create Treatment table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS Treatment (
-    TreatmentID INTEGER PRIMARY KEY AUTOINCREMENT,
-    PatientID INTEGER,
-    DoctorID INTEGER,
-    Diagnosis TEXT,
-    TreatmentPlan TEXT,
-    Medicines TEXT,
-    StartDate DATE,
-    EndDate DATE,
-    FOREIGN KEY (PatientID) REFERENCES Patient(PatientID),
-    FOREIGN KEY (DoctorID) REFERENCES Doctor(DoctorID)
-)
-''')
-
-# Create Medicine table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS Medicine (
-    MedicineID INTEGER PRIMARY KEY AUTOINCREMENT,
-    Name TEXT,
-    Cost REAL,
-    Use TEXT
-)
-''')
-
-# Create Appointment table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS Appointment (
-    AppointmentID INTEGER PRIMARY KEY AUTOINCREMENT,
-    PatientID INTEGER,
-    DoctorID INTEGER,
-    Date DATE,
-    Time TEXT,
-    Purpose TEXT,
-    FOREIGN KEY (PatientID) REFERENCES Patient(PatientID),
-    FOREIGN KEY (DoctorID) REFERENCES Doctor(DoctorID)
-)
-''')
-
-# Create LoginCredits table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS LoginCredits (
-    UserID INTEGER PRIMARY KEY AUTOINCREMENT,
-    Password TEXT,
-    UserType TEXT
-)
-''')
-
-# Commit the changes and close the connection
-conn.commit()
-conn.close()
-
-print("Database and tables created successfully.")
+from datetime import date, datetime, timedelta
+
+from availability import doctor_calendar, slot_index
+from catalog import medicine_index
+from connection import DB_PATH, DEFAULT_PROFILE, connect, get_pool
+from credentials import authenticate, hash_password, password_status, set_password
+from data_access import builder_stats, execute_query, fetch_data, query_stats
+from dates import birth_date_range, parse_date, to_iso
+from directory import directory
+from instrumentation import sql_metrics
+from migrations import init_schema
+from paging import KeysetPager, browse
+from reports import ReportError, build_report, print_report
+from scheduler import default_scheduler, print_metrics
+import services
+from search import SEARCH_COLUMNS, search_doctors, search_patients, search_treatments
+from transactions import transaction
 
 def insert_initial_data(conn):
     cursor = conn.cursor()
@@ -172,7 +60,7 @@ def insert_initial_data(conn):
     cursor.execute('''
     INSERT INTO Leave (DoctorID, SelectDate, ReturnDate, NoOfDays, Reason, LeaveStatus)
     VALUES 
-    (1, '2024-11-01', '2024-11-10', 10, 'Medical Leave', 'Approved'),
+    (1, '2024-11-01', '2024-11-10', 10, 'Medical Leave', 'Accepted'),
     (2, '2024-12-01', '2024-12-05', 5, 'Vacation', 'Pending')
     ''')
 
@@ -218,46 +106,48 @@ def insert_initial_data(conn):
 
     print("Initial data inserted successfully.")
 
-import sqlite3
-from sqlite3 import Error
-
-def create_connection():
-    """Create a database connection to the SQLite database specified."""
+def create_connection(profile=DEFAULT_PROFILE):
+    """Create a database connection with the given PRAGMA profile (see connection.py)."""
     try:
-        conn = sqlite3.connect('Hospital_Database.db')  # Change 'hospital.db' to the desired database file name
+        conn = connect(DB_PATH, profile)
         print("Connection established successfully")
         return conn
-    except Error as e:
+    except sqlite3.Error as e:
         print(f"Error: {e}")
         return None
 
 #enable the following comments for input data in database
 #conn = create_connection()
+#init_schema(conn)
 #insert_initial_data(conn)
 
-import sqlite3
-from datetime import datetime, date
-
-def calculate_age(dob):
-    today = date.today()
-    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+# Rows shown per page in the admin and doctor listings
+PAGE_SIZE = 20
 
-def create_connection():
-    return sqlite3.connect('Hospital_Database.db')
+def input_date(prompt):
+    """Ask until a valid date is entered; returns it as YYYY-MM-DD."""
+    while True:
+        try:
+            value = to_iso(input(prompt))
+        except ValueError:
+            value = None
+        if value:
+            return value
+        print("Invalid date. Please use DD/MM/YYYY or YYYY-MM-DD.")
 
-def execute_query(conn, query, params=()):
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    conn.commit()
-    return cursor
+# Leaves, room stays and old appointments move on with the calendar
+scheduler = default_scheduler()
 
-def fetch_data(conn, query, params=()):
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    return cursor.fetchall()
+# Written by the Database Metrics page for node_exporter's textfile collector
+METRICS_FILE = 'hospital_metrics.prom'
 
 def main():
-    conn = create_connection()
+    pool = get_pool()
+    conn = pool.acquire()
+    # Creates or upgrades the tables; a current database is only version-checked
+    if init_schema(conn):
+        print("Database and tables created successfully.")
+    scheduler.start()
     
     while True:
         print("\nWelcome to Amrita Hospital")
@@ -280,7 +170,9 @@ def main():
         else:
             print("Invalid option. Please enter a number between 1 and 4.")
     
-    conn.close()
+    scheduler.stop()
+    pool.release(conn)
+    pool.close_all()
     
 def login(conn):
     while True:
@@ -299,33 +191,23 @@ def login(conn):
         user_id = input("Enter UserID: ")
         password = input("Enter Password: ")
         
-        query = "SELECT * FROM LoginCredits WHERE UserID = ? AND Password = ? AND UserType = ?"
-        result = fetch_data(conn, query, (user_id, password, user_type))
-        
-        if result:
-            if user_type == 'Doctor':
-                doctor_function(conn, user_id)
-            elif user_type == 'Patient':
-                patient_function(conn, user_id)
-            elif user_type == 'Admin':
-                admin_function(conn, user_id)
+        if authenticate(conn, user_id, password, user_type):
+            # Each signed-in session works on its own pooled connection
+            with get_pool().connection() as session:
+                if user_type == 'Doctor':
+                    doctor_function(session, user_id)
+                elif user_type == 'Patient':
+                    patient_function(session, user_id)
+                elif user_type == 'Admin':
+                    admin_function(session, user_id)
         else:
             print("Invalid credentials.")
         break
         
 def sign_in(conn):
     password = input("Enter Password: ")
-
-    execute_query(conn, "INSERT INTO LoginCredits (Password, UserType) VALUES (?, ?)", (password, 'Patient'))
-
-    cursor = conn.cursor()
-    cursor.execute("SELECT last_insert_rowid()")
-    user_id = cursor.fetchone()[0]
-
-    print(f"Your UserID (also your PatientID) is: {user_id}")
-
     name = input("Name: ")
-    dob = datetime.strptime(input("DOB (dd/mm/yyyy): "), "%d/%m/%Y").date()
+    dob = input_date("DOB (dd/mm/yyyy): ")
     weight = float(input("Weight: "))
     height = float(input("Height: "))
     gender = input("Gender: ")
@@ -334,11 +216,11 @@ def sign_in(conn):
     address = input("Address: ")
     medical_history = input("Medical History: ")
 
-    execute_query(conn, """
-    INSERT INTO Patient (PatientID, Name, DOB, Weight, Height, Gender, PhoneNo, EmailID, Address, MedicalHistory)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (user_id, name, dob, weight, height, gender, phone, email, address, medical_history))
+    # Credentials and patient record are created together or not at all
+    user_id = services.create_patient(conn, password, name, dob, weight, height, gender, phone, email,
+                                      address, medical_history, same_id=True)
 
+    print(f"Your UserID (also your PatientID) is: {user_id}")
     print("Sign-in successful and patient details recorded.")
     
 def hospital_info(conn):
@@ -346,8 +228,7 @@ def hospital_info(conn):
     print("Email: amritahosptal1990@gmail.com")
     print("Address: Amritapuri, Kochi")
     print("Timing: 24 hours doctor availability 10:00 to 5:00")
-    query = "SELECT DISTINCT Specialization FROM doctor"
-    specialists = fetch_data(conn, query)
+    specialists = directory.fetch(conn, 'specializations')
     print("Specialists:")
     if specialists:
         for specialist in specialists:
@@ -391,15 +272,14 @@ def doctor_function(conn, doctor_id):
             print("Invalid option. Please enter a number between 1 and 11.")
 
 def my_profile(conn, doctor_id):
-    query = "SELECT * FROM Doctor WHERE DoctorID = ?"
-    result = fetch_data(conn, query, (doctor_id,))
+    result = fetch_data(conn, 'doctor_by_id', (doctor_id,))
     
     if result:
         print('=========== MY PROFILE ===========')
         doctor = result[0]
         print(f"DoctorID: {doctor[0]}")
         print(f"Name: {doctor[1]}")
-        print(f"Age: {calculate_age(datetime.strptime(doctor[2], '%Y-%m-%d').date())}")
+        print(f"Age: {doctor[11]}")
         print(f"DOB: {doctor[2]}")
         print(f"Gender: {doctor[3]}")
         print(f"Specialization: {doctor[4]}")
@@ -442,18 +322,16 @@ def edit_info(conn, doctor_id):
                 '3': 'Address'
             }[choice]
             
-            execute_query(conn, f"UPDATE Doctor SET {field} = ? WHERE DoctorID = ?", (new_value, doctor_id))
+            execute_query(conn, f'update_doctor_{field}', (new_value, doctor_id))
             print("Information updated successfully.")
             break
         else:
             print("Invalid option. Please enter a number between 1 and 3.")
 
 def view_doctors(conn):
-    query = "SELECT DoctorID, Name, Specialization FROM Doctor ORDER BY Specialization"
-    doctors = fetch_data(conn, query)
-    
-    for doctor in doctors:
-        print(f"DoctorID: {doctor[0]}, Name: {doctor[1]}, Specialization: {doctor[2]}")
+    pager = KeysetPager(conn, ["DoctorID", "Name", "Specialization"], "Doctor",
+                        keys=["Specialization", "DoctorID"], page_size=PAGE_SIZE)
+    browse(pager, lambda doctor: print(f"DoctorID: {doctor[0]}, Name: {doctor[1]}, Specialization: {doctor[2]}"))
     
     while True:
         print("\n1. Search by Attribute")
@@ -485,8 +363,16 @@ def search_doctor_by_attribute(conn):
         attr = attributes[int(choice) - 1]
         search_value = input(f"Search by {attr}: ")
         
-        query = f"SELECT * FROM Doctor WHERE {attr} LIKE ?"
-        results = fetch_data(conn, query, (f"%{search_value}%",))
+        if attr in SEARCH_COLUMNS['Doctor']:
+            # Ranked, index-backed full-text match
+            results = search_doctors(conn, search_value, [attr])
+        elif attr == 'Age':
+            if not search_value.strip().isdigit():
+                print("Age must be a whole number.")
+                return
+            results = fetch_data(conn, 'search_doctor_Age', birth_date_range(int(search_value)))
+        else:
+            results = fetch_data(conn, f'search_doctor_{attr}', (f"%{search_value}%",))
         
         if results:
             for doctor in results:
@@ -498,14 +384,13 @@ def search_doctor_by_attribute(conn):
 
 def view_doctor_info(conn):
     doctor_id = input("Enter DoctorID: ")
-    query = "SELECT * FROM Doctor WHERE DoctorID = ?"
-    result = fetch_data(conn, query, (doctor_id,))
+    result = fetch_data(conn, 'doctor_by_id', (doctor_id,))
     
     if result:
         doctor = result[0]
         print(f"DoctorID: {doctor[0]}")
         print(f"Name: {doctor[1]}")
-        print(f"Age: {calculate_age(datetime.strptime(doctor[2], '%Y-%m-%d').date())}")
+        print(f"Age: {doctor[11]}")
         print(f"DOB: {doctor[2]}")
         print(f"Gender: {doctor[3]}")
         print(f"Specialization: {doctor[4]}")
@@ -519,11 +404,9 @@ def view_doctor_info(conn):
         print("Doctor not found.")
 
 def view_patients(conn):
-    query = "SELECT PatientID, Name, DOB FROM Patient ORDER BY Name"
-    patients = fetch_data(conn, query)
-    
-    for patient in patients:
-        print(f"PatientID: {patient[0]}, Name: {patient[1]}, DOB: {patient[2]}")
+    pager = KeysetPager(conn, ["PatientID", "Name", "DOB"], "Patient",
+                        keys=["Name", "PatientID"], page_size=PAGE_SIZE)
+    browse(pager, lambda patient: print(f"PatientID: {patient[0]}, Name: {patient[1]}, DOB: {patient[2]}"))
     
     while True:
         print("\n1. Search by Attribute")
@@ -545,7 +428,7 @@ def view_patients(conn):
             print("Invalid option. Please enter a number between 1 and 4.")
 
 def search_patient_by_attribute(conn):
-    attributes = ['PatientID', 'Name', 'DOB', 'Gender', 'PhoneNo', 'EmailID', 'Weight', 'Height', 'MedicalHistory']
+    attributes = ['PatientID', 'Name', 'DOB', 'Gender', 'PhoneNo', 'EmailID', 'Weight', 'Height', 'MedicalHistory', 'Address']
     
     for i, attr in enumerate(attributes, 1):
         print(f"{i}. {attr}")
@@ -556,8 +439,11 @@ def search_patient_by_attribute(conn):
         attr = attributes[int(choice) - 1]
         search_value = input(f"Search by {attr}: ")
         
-        query = f"SELECT * FROM Patient WHERE {attr} LIKE ?"
-        results = fetch_data(conn, query, (f"%{search_value}%",))
+        if attr in SEARCH_COLUMNS['Patient']:
+            # Ranked, index-backed full-text match
+            results = search_patients(conn, search_value, [attr])
+        else:
+            results = fetch_data(conn, f'search_patient_{attr}', (f"%{search_value}%",))
         
         if results:
             for patient in results:
@@ -568,8 +454,7 @@ def search_patient_by_attribute(conn):
         print(f"Invalid option. Please enter a number between 1 and {len(attributes)}.")
 
 def view_patient_info(conn, patient_id):
-    query = "SELECT * FROM Patient WHERE PatientID = ?"
-    result = fetch_data(conn, query, (patient_id,))
+    result = fetch_data(conn, 'patient_by_id', (patient_id,))
     
     if result:
         patient = result[0]
@@ -587,27 +472,19 @@ def view_patient_info(conn, patient_id):
         print("Patient not found.")
 
 def my_patients(conn, doctor_id):
-    query = """
-    SELECT DISTINCT p.* 
-    FROM Patient p
-    JOIN Treatment t ON p.PatientID = t.PatientID
-    WHERE t.DoctorID = ?
-    """
-    patients = fetch_data(conn, query, (doctor_id,))
+    patients = fetch_data(conn, 'doctor_patients', (doctor_id,))
     
     for patient in patients:
         print(f"PatientID: {patient[0]}, Name: {patient[1]}")
 
-import sqlite3
-from datetime import datetime, date, timedelta
-
 def view_patient_treatment_info(conn, doctor_id):
     
     while True:
         print("\n1. Search by patientId")
         print("2. Search by treatmentId")
-        print("3. Back")
-        print("4. Exit")
+        print("3. Search by diagnosis, plan or medicines")
+        print("4. Back")
+        print("5. Exit")
         choice = input("Enter your option: ")
         
         if choice == '1':
@@ -615,20 +492,31 @@ def view_patient_treatment_info(conn, doctor_id):
         elif choice == '2':
             treatment_info(conn, 'TreatmentID', doctor_id)
         elif choice == '3':
-            break
+            search_treatment_records(conn)
         elif choice == '4':
+            break
+        elif choice == '5':
             exit()
         else:
-            print("Invalid option. Please enter a number between 1 and 4.")
+            print("Invalid option. Please enter a number between 1 and 5.")
+
+
+def search_treatment_records(conn):
+    search_value = input("Search treatments: ")
+    results = search_treatments(conn, search_value)
+    
+    if results:
+        for treatment in results:
+            print(f"TreatmentID: {treatment[0]}, PatientID: {treatment[1]}, DoctorID: {treatment[2]}, "
+                  f"Diagnosis: {treatment[3]}, Medicines: {treatment[5]}")
+    else:
+        print("Not found.")
 
 
 def treatment_info(conn, search_column, doctor_id):
     
-    query = f"""
-    SELECT * FROM Treatment WHERE {search_column} = ?
-    """
     search_id=input(f'Enter the {search_column}:')
-    treatment = fetch_data(conn, query, (search_id,))
+    treatment = fetch_data(conn, f'treatment_by_{search_column}', (search_id,))
     if treatment:
         treatment = treatment[0]
         print(f"TreatmentID: {treatment[0]}")
@@ -656,7 +544,7 @@ def treatment_info(conn, search_column, doctor_id):
 
 def edit_treatment(conn, doctor_id, treatment_id):
     
-    result = fetch_data(conn, "SELECT * FROM Treatment WHERE TreatmentID = ? AND DoctorID = ?", (treatment_id, doctor_id))
+    result = fetch_data(conn, 'treatment_for_doctor', (treatment_id, doctor_id))
     
     if not result:
         print("TreatmentID not found or you are not authorized to edit this record.")
@@ -674,21 +562,17 @@ def edit_treatment(conn, doctor_id, treatment_id):
     choice = input("Enter your option: ")
     
     if choice in options:
-        new_value = input(f"Enter new {options[choice]}: ")
-        execute_query(conn, f"UPDATE Treatment SET {options[choice]} = ? WHERE TreatmentID = ?", (new_value, treatment_id))
+        if options[choice] in ('StartDate', 'EndDate'):
+            new_value = input_date(f"Enter new {options[choice]} (dd/mm/yyyy): ")
+        else:
+            new_value = input(f"Enter new {options[choice]}: ")
+        execute_query(conn, f'update_treatment_{options[choice]}', (new_value, treatment_id))
         print("Treatment updated successfully.")
     else:
         print("Invalid option.")
 
 def my_appointments(conn, doctor_id):
-    query = """
-    SELECT a.AppointmentID, a.PatientID, a.Date, a.Time, p.Name, p.DOB, p.Gender
-    FROM Appointment a
-    JOIN Patient p ON a.PatientID = p.PatientID
-    WHERE a.DoctorID = ?
-    ORDER BY a.Date, a.Time
-    """
-    appointments = fetch_data(conn, query, (doctor_id,))
+    appointments = fetch_data(conn, 'doctor_appointments', (doctor_id,))
     
     # Check if there are no appointments
     if not appointments:  # If appointments is empty
@@ -697,9 +581,7 @@ def my_appointments(conn, doctor_id):
     
     # Displaying the appointment and patient information
     for appointment in appointments:
-        patient_dob = datetime.strptime(appointment[5], '%Y-%m-%d').date()  # Assuming p.DOB is at index 5
-        age = calculate_age(patient_dob)
-        print(f"AppointmentID: {appointment[0]}, PatientID: {appointment[1]}, Name: {appointment[4]}, Age: {age}, Gender: {appointment[6]}, Time: {appointment[3]}, Date: {appointment[2]}")
+        print(f"AppointmentID: {appointment[0]}, PatientID: {appointment[1]}, Name: {appointment[4]}, Age: {appointment[7]}, Gender: {appointment[6]}, Time: {appointment[3]}, Date: {appointment[2]}")
     
     print("-------------------------------------")
     
@@ -730,7 +612,7 @@ def start_treatment(conn, doctor_id):
     appointment_id = input("Enter AppointmentID: ")
     
     # Check if the appointment exists and belongs to the doctor
-    result = fetch_data(conn, "SELECT * FROM Appointment WHERE AppointmentID = ? AND DoctorID = ?", (appointment_id, doctor_id))
+    result = fetch_data(conn, 'appointment_for_doctor', (appointment_id, doctor_id))
     
     if not result:
         print("AppointmentID not found or you are not appointed to this patient.")
@@ -748,20 +630,18 @@ def start_treatment(conn, doctor_id):
     diagnosis = input("\nDiagnosis: ")
     medicines = input("Medicines: ")
     treatment_plan = input("Treatment Plan: ")
-    start_date = input("Start Date (dd/mm/yyyy): ")
-    end_date = input("End Date (dd/mm/yyyy): ")
+    start_date = input_date("Start Date (dd/mm/yyyy): ")
+    end_date = input_date("End Date (dd/mm/yyyy): ")
     
-    # Insert the treatment data into the Treatment table
-    execute_query(conn, """
-    INSERT INTO Treatment (PatientID, DoctorID, Diagnosis, Medicines, TreatmentPlan, StartDate, EndDate)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (patient_id, doctor_id, diagnosis, medicines, treatment_plan, start_date, end_date))
+    with transaction(conn):
+        # Insert the treatment data into the Treatment table
+        execute_query(conn, 'insert_treatment', (patient_id, doctor_id, diagnosis, medicines, treatment_plan, start_date, end_date))
+        
+        # Delete the appointment from the Appointment table after treatment
+        execute_query(conn, 'delete_appointment', (appointment_id,))
+    slot_index.mark_free(doctor_id, appointment[3], appointment[4])
     
     print("\nTreatment started successfully.")
-    
-    # Delete the appointment from the Appointment table after treatment
-    execute_query(conn, "DELETE FROM Appointment WHERE AppointmentID = ?", (appointment_id,))
-    
     print("Appointment record deleted after treatment.")
 
 def apply_leave(conn, doctor_id):
@@ -770,7 +650,7 @@ def apply_leave(conn, doctor_id):
     
     while True:
         select_date = input(f"Select date (dd/mm/yyyy, must be after {min_leave_date.strftime('%d/%m/%Y')}): ")
-        select_date = datetime.strptime(select_date, "%d/%m/%Y").date()
+        select_date = parse_date(select_date)
         
         if select_date > min_leave_date:
             break
@@ -778,28 +658,21 @@ def apply_leave(conn, doctor_id):
             print("Invalid date. Please select a date at least 3 weeks from today.")
     
     return_date = input("Return date (dd/mm/yyyy): ")
-    return_date = datetime.strptime(return_date, "%d/%m/%Y").date()
+    return_date = parse_date(return_date)
     reason = input("Reason: ")
     
-    no_of_days = (return_date - select_date).days + 1
-    
-    execute_query(conn, """
-    INSERT INTO Leave (DoctorID, SelectDate, ReturnDate, NoOfDays, Reason, LeaveStatus)
-    VALUES (?, ?, ?, ?, ?, 'Pending')
-    """, (doctor_id, select_date, return_date, no_of_days, reason))
-    
-    print("Leave application submitted successfully.")
+    try:
+        services.apply_leave(conn, doctor_id, select_date, return_date, reason)
+        print("Leave application submitted successfully.")
+    except services.ServiceError as e:
+        print(e)
 
 def edit_password(conn, user_id):
     new_password = input("Enter new password: ")
-    execute_query(conn, "UPDATE LoginCredits SET Password = ? WHERE UserID = ?", (new_password, user_id))
+    set_password(conn, user_id, new_password)
     print("Password updated successfully.")
     input("\nPress Enter to continue...")
 
-import sqlite3
-from datetime import datetime, date, timedelta
-import calendar
-
 
 def patient_function(conn, patient_id):
     while True:
@@ -831,15 +704,14 @@ def patient_function(conn, patient_id):
             print("Invalid option. Please enter a number between 1 and 7.")
 
 def patient_profile(conn, patient_id):
-    query = "SELECT * FROM Patient WHERE PatientID = ?"
-    result = fetch_data(conn, query, (patient_id,))
+    result = fetch_data(conn, 'patient_by_id', (patient_id,))
     
     if result:
         print('=========== MY PROFILE ===========')
         patient = result[0]
         print(f"PatientID: {patient[0]}")
         print(f"Name: {patient[1]}")
-        print(f"Age: {calculate_age(datetime.strptime(patient[2], '%Y-%m-%d').date())}")
+        print(f"Age: {patient[10]}")
         print(f"DOB: {patient[2]}")
         print(f"Weight: {patient[3]}")
         print(f"Height: {patient[4]}")
@@ -877,7 +749,7 @@ def edit_patient_info(conn, patient_id):
         if choice in ['1', '2', '3']:
             field = ['PhoneNo', 'EmailID', 'Address'][int(choice) - 1]
             new_value = input(f"Enter new {field}: ")
-            execute_query(conn, f"UPDATE Patient SET {field} = ? WHERE PatientID = ?", (new_value, patient_id))
+            execute_query(conn, f'update_patient_{field}', (new_value, patient_id))
             print("Information updated successfully.")
             break
         else:
@@ -900,14 +772,7 @@ def patient_appointments(conn, patient_id):
             print("Invalid option. Please enter a number between 1 and 2.")
 
 def view_patient_appointments(conn, patient_id):
-    query = """
-    SELECT a.*, d.Name as DoctorName
-    FROM Appointment a
-    JOIN Doctor d ON a.DoctorID = d.DoctorID
-    WHERE a.PatientID = ?
-    ORDER BY a.Date, a.Time
-    """
-    appointments = fetch_data(conn, query, (patient_id,))
+    appointments = fetch_data(conn, 'patient_appointments', (patient_id,))
     
     for appointment in appointments:
         print(f"AppointmentID: {appointment[0]}, Doctor: {appointment[5]}, Date: {appointment[3]}, Time: {appointment[4]}")
@@ -930,7 +795,7 @@ def view_patient_appointments(conn, patient_id):
             print("Enter number from 1-3")
 
 def book_appointment(conn, patient_id):
-    active_doctors = fetch_data(conn, "SELECT DoctorID, Name, Specialization FROM Doctor WHERE WorkStatus = 'Active' ORDER BY Specialization")
+    active_doctors = directory.fetch(conn, 'active_doctors')
     for doctor in active_doctors:
         print(f"DoctorID: {doctor[0]}, Name: {doctor[1]}, Specialization: {doctor[2]}")
     
@@ -954,7 +819,7 @@ def book_appointment(conn, patient_id):
 
 
 def select_doctors_by_specialization(conn, patient_id):
-    specializations = fetch_data(conn, "SELECT DISTINCT Specialization FROM Doctor WHERE WorkStatus = 'Active'")
+    specializations = directory.fetch(conn, 'active_specializations')
     
     while True:
         print("\n=== Available Specializations ===")
@@ -969,13 +834,7 @@ def select_doctors_by_specialization(conn, patient_id):
             elif 1 <= choice <= len(specializations):
                 selected_spec = specializations[choice - 1][0]
                 
-                # Updated query to include AppointmentCost
-                doctors = fetch_data(conn, """
-                    SELECT DoctorID, Name, YearsOfExperience, AppointmentCost 
-                    FROM Doctor 
-                    WHERE Specialization = ? AND WorkStatus = 'Active'
-                    ORDER BY Name
-                """, (selected_spec,))
+                doctors = directory.fetch(conn, 'active_doctors_by_specialization', (selected_spec,))
                 
                 print(f"\n=== Doctors specialized in {selected_spec} ===")
                 for doctor in doctors:
@@ -988,10 +847,7 @@ def select_doctors_by_specialization(conn, patient_id):
                     
                     if subchoice == '1':
                         doctor_id = input("Enter Doctor ID to proceed: ")
-                        doctor_check = fetch_data(conn, """
-                            SELECT DoctorID, AppointmentCost FROM Doctor 
-                            WHERE DoctorID = ? AND Specialization = ? AND WorkStatus = 'Active'
-                        """, (doctor_id, selected_spec))
+                        doctor_check = directory.fetch(conn, 'active_doctor_in_specialization', (doctor_id, selected_spec))
                         
                         if doctor_check:
                             proceed_with_appointment(conn, patient_id, doctor_id, doctor_check[0][1])
@@ -1022,21 +878,16 @@ def select_doctor(conn, patient_id):
             search_term = input("Enter search term: ")
             
             if choice == '1':
-                query = """
-                    SELECT DoctorID, Name, Specialization, YearsOfExperience, AppointmentCost 
-                    FROM Doctor 
-                    WHERE DoctorID = ? AND WorkStatus = 'Active'
-                """
+                query = 'active_doctor_by_id'
                 params = (search_term,)
             else:  # choice == '2'
-                query = """
-                    SELECT DoctorID, Name, Specialization, YearsOfExperience, AppointmentCost 
-                    FROM Doctor 
-                    WHERE Name LIKE ? AND WorkStatus = 'Active'
-                """
+                query = 'active_doctors_by_name'
                 params = (f"%{search_term}%",)
             
-            doctors = fetch_data(conn, query, params)
+            if query == 'active_doctor_by_id':
+                doctors = directory.fetch(conn, query, params)
+            else:
+                doctors = fetch_data(conn, query, params)
             
             if doctors:
                 print("\n=== Matching Doctors ===")
@@ -1051,10 +902,7 @@ def select_doctor(conn, patient_id):
                     
                     if subchoice == '1':
                         doctor_id = input("Enter Doctor ID to proceed: ")
-                        doctor_check = fetch_data(conn, """
-                            SELECT DoctorID, AppointmentCost FROM Doctor 
-                            WHERE DoctorID = ? AND WorkStatus = 'Active'
-                        """, (doctor_id,))
+                        doctor_check = directory.fetch(conn, 'active_doctor_cost', (doctor_id,))
                         
                         if doctor_check:
                             proceed_with_appointment(conn, patient_id, doctor_id, doctor_check[0][1])
@@ -1070,65 +918,24 @@ def select_doctor(conn, patient_id):
         else:
             print("Invalid option. Please enter a number between 1 and 3.")
 
-def is_date_available(conn, doctor_id, date):
-    """
-    Check if there are any available slots on a given date for a doctor
-    Returns True if slots are available, False if fully booked
-    """
-    # Get all booked appointments for the doctor on the given date
-    booked_times = fetch_data(conn, """
-        SELECT Time 
-        FROM Appointment 
-        WHERE DoctorID = ? AND Date = ?
-    """, (doctor_id, date))
-    
-    # Convert booked_times to a list of time strings
-    booked_slots = [appointment[0] for appointment in booked_times]
-    
-    # Get all possible time slots (9 AM to 5 PM, 1-hour slots)
-    all_slots = [f"{hour:02d}:00" for hour in range(9, 17)]
-    
-    # Check if there are any available slots
-    return any(slot not in booked_slots for slot in all_slots)
-
-def get_available_slots(conn, doctor_id, date):
-    """
-    Get list of available time slots for a given doctor and date
-    """
-    # Get all booked appointments for the doctor on the given date
-    booked_times = fetch_data(conn, """
-        SELECT Time 
-        FROM Appointment 
-        WHERE DoctorID = ? AND Date = ?
-    """, (doctor_id, date))
-    
-    # Convert booked_times to a list of time strings
-    booked_slots = [appointment[0] for appointment in booked_times]
-    
-    # Define all possible time slots (9 AM to 5 PM, 1-hour slots)
-    all_slots = [f"{hour:02d}:00" for hour in range(9, 17)]
-    
-    # Return only available slots
-    return [slot for slot in all_slots if slot not in booked_slots]
-
 def proceed_with_appointment(conn, patient_id, doctor_id, appointment_cost):
     today = date.today()
     
     print("\n=== Available Dates ===")
-    available_dates = []
+    available_dates = {}
     
-    # Check availability for next 21 days
-    for i in range(21):  # Next 3 weeks
-        current_date = today + timedelta(days=i)
-        is_available = is_date_available(conn, doctor_id, current_date)
+    # Check availability for next 21 days (one query for the whole window)
+    unavailable = {}
+    for current_date, booked_count, free_slots, on_leave in doctor_calendar(conn, doctor_id, today, 21):
         date_str = current_date.strftime("%Y-%m-%d")
         
         # Store available dates and display status
-        if is_available:
-            available_dates.append(current_date)
+        if free_slots:
+            available_dates[current_date] = free_slots
             print(f"{date_str} - Available")
         else:
-            print(f"{date_str} - Fully Booked")
+            unavailable[current_date] = "On Leave" if on_leave else "Fully Booked"
+            print(f"{date_str} - {unavailable[current_date]}")
     
     if not available_dates:
         print("\nNo available slots in the next 3 weeks. Please try another doctor.")
@@ -1141,15 +948,16 @@ def proceed_with_appointment(conn, patient_id, doctor_id, appointment_cost):
             selected_date = datetime.strptime(selected_date, "%Y-%m-%d").date()
             if selected_date in available_dates:
                 break
-            elif today <= selected_date <= today + timedelta(weeks=3):
-                print("This date is fully booked. Please select an available date.")
+            elif selected_date in unavailable:
+                print(f"This date is unavailable ({unavailable[selected_date].lower()}). "
+                      "Please select an available date.")
             else:
                 print("Please select a date within the next 3 weeks.")
         except ValueError:
             print("Invalid date format. Please use YYYY-MM-DD.")
     
-    # Get available time slots
-    available_slots = get_available_slots(conn, doctor_id, selected_date)
+    # Available time slots come from the calendar built above
+    available_slots = available_dates[selected_date]
     
     if not available_slots:
         print("No available time slots for this date. Please select another date.")
@@ -1170,27 +978,13 @@ def proceed_with_appointment(conn, patient_id, doctor_id, appointment_cost):
         except ValueError:
             print("Please enter a valid number.")
     
-    # Double-check if slot is still available before booking
-    if selected_time in get_available_slots(conn, doctor_id, selected_date):
+    # The slot is re-checked inside the booking transaction
+    try:
+        services.book_appointment(conn, patient_id, doctor_id, selected_date, selected_time)
+    except services.ServiceError as e:
+        print(f"{e} Please try another slot.")
+    else:
         try:
-            # Start transaction
-            conn.execute("BEGIN TRANSACTION")
-            
-            # Insert the appointment
-            execute_query(conn, """
-            INSERT INTO Appointment (PatientID, DoctorID, Date, Time, Purpose)
-            VALUES (?, ?, ?, ?, ?)
-            """, (patient_id, doctor_id, selected_date, selected_time, "Regular checkup"))
-            
-            # Create the corresponding bill
-            execute_query(conn, """
-            INSERT INTO Bill (PatientID, BillType, Amount, Date, PaymentStatus)
-            VALUES (?, 'Appointment', ?, ?, 'Pending')
-            """, (patient_id, appointment_cost, selected_date))
-            
-            # Commit transaction
-            conn.commit()
-            
             print("\n=== Appointment Booked Successfully! ===")
             print(f"Date: {selected_date}")
             print(f"Time: {selected_time}")
@@ -1198,32 +992,26 @@ def proceed_with_appointment(conn, patient_id, doctor_id, appointment_cost):
             print("A bill has been generated for your appointment.")
             
             # Get doctor's name for confirmation
-            doctor_name = fetch_data(conn, "SELECT Name FROM Doctor WHERE DoctorID = ?", (doctor_id,))[0][0]
+            doctor_name = fetch_data(conn, 'doctor_name', (doctor_id,))[0][0]
             print(f"Doctor: {doctor_name}")
             
         except Exception as e:
-            # Rollback in case of error
-            conn.rollback()
             print("Error booking appointment. Please try again.")
             print(f"Error details: {str(e)}")
-    else:
-        print("Sorry, this slot has just been booked by another patient. Please try another slot.")
 
-        
-def is_date_available(conn, doctor_id, date):
-    query = "SELECT COUNT(*) FROM Appointment WHERE DoctorID = ? AND Date = ?"
-    result = fetch_data(conn, query, (doctor_id, date))
-    return result[0][0] < 14  # Assuming 14 slots per day
 
-def get_available_slots(conn, doctor_id, date):
-    all_slots = ["10:00", "10:30", "11:00", "11:30", "12:00", "12:30", "13:00", "13:30", "14:00", "14:30", "15:00", "15:30", "16:00", "16:30"]
-    query = "SELECT Time FROM Appointment WHERE DoctorID = ? AND Date = ?"
-    booked_slots = [row[0] for row in fetch_data(conn, query, (doctor_id, date))]
-    return [slot for slot in all_slots if slot not in booked_slots]
+def show_balance(balance):
+    if balance['pending_count']:
+        print(f"Outstanding: ${balance['outstanding']} across {balance['pending_count']} unpaid bill(s), "
+              f"oldest from {balance['oldest_pending']}")
+    else:
+        print("No outstanding bills.")
+    if balance['last_payment']:
+        print(f"Last payment: {balance['last_payment']}")
 
 def patient_bills(conn, patient_id):
-    query = "SELECT BillID, Amount, BillType, Date, PaymentStatus FROM Bill WHERE PatientID = ?"
-    bills = fetch_data(conn, query, (patient_id,))
+    show_balance(services.patient_balance(conn, patient_id))
+    bills = fetch_data(conn, 'patient_bills', (patient_id,))
     
     for bill in bills:
         print(f"BillID: {bill[0]}, Amount: {bill[1]}, Bill Type:{bill[2]}, Date: {bill[3]}, Payment Status: {bill[4]}")
@@ -1244,8 +1032,12 @@ def patient_bills(conn, patient_id):
             print("Invalid option. Please enter a number between 1 and 3.")
 
 def view_unpaid_bills(conn, patient_id):
-    query = "SELECT BillID, Amount, BillType, Date FROM Bill WHERE PatientID = ? AND PaymentStatus = 'Pending'"
-    unpaid_bills = fetch_data(conn, query, (patient_id,))
+    balance = services.patient_balance(conn, patient_id)
+    if not balance['pending_count']:
+        print("You have no unpaid bills.")
+        return
+    print(f"Total due: ${balance['outstanding']}")
+    unpaid_bills = fetch_data(conn, 'unpaid_bills', (patient_id,))
     
     for bill in unpaid_bills:
         print(f"BillID: {bill[0]}, Amount: {bill[1]}, Bill Type:{bill[2]}, Date: {bill[3]}")
@@ -1264,60 +1056,80 @@ def view_unpaid_bills(conn, patient_id):
 
 def pay_bill(conn, patient_id):
     bill_id = input("Enter the BillID: ")
-    query = "SELECT Amount FROM Bill WHERE BillID = ? AND PatientID = ? AND PaymentStatus = 'Pending'"
-    result = fetch_data(conn, query, (bill_id, patient_id))
-    
-    if result:
-        amount = result[0][0]
+    try:
+        amount = services.pending_bill_amount(conn, patient_id, bill_id)
         confirm = input(f"Do you accept to pay ${amount}? [y/n]: ")
         if confirm.lower() == 'y':
-            execute_query(conn, "UPDATE Bill SET PaymentStatus = 'Paid' WHERE BillID = ?", (bill_id,))
+            services.pay_bill(conn, patient_id, bill_id)
             print("Bill paid successfully.")
         else:
             print("Payment cancelled.")
-    else:
-        print("Invalid BillID or bill is already paid.")
+    except services.ServiceError as e:
+        print(e)
 
 def book_room(conn, patient_id):
-    room_types = fetch_data(conn, "SELECT DISTINCT RoomType FROM Room")
-    for i, room_type in enumerate(room_types, 1):
-        print(f"{i}. {room_type[0]}")
-    
+    entered = input("Check-in date (YYYY-MM-DD, Enter for today): ").strip()
+    nights = input("Number of nights: ").strip()
+    if not nights.isdigit():
+        print("Invalid number of nights.")
+        return
+    try:
+        check_in = to_iso(entered) or date.today().isoformat()
+        rooms = services.room_availability(conn, check_in, int(nights))
+    except (ValueError, services.ServiceError) as e:
+        print(e)
+        return
+
+    for i, room in enumerate(rooms, 1):
+        print(f"{i}. {room['room_type']} ({len(room['free_rooms'])} free)")
     choice = input("Enter Room Type (Enter the labeled number): ")
-    if choice.isdigit() and 1 <= int(choice) <= len(room_types):
-        selected_room_type = room_types[int(choice) - 1][0]
-        available_rooms = fetch_data(conn, 
-            "SELECT RoomID, Cost FROM Room WHERE RoomType = ? AND LOWER(AvailabilityStatus) = 'available'", 
-            (selected_room_type,))
-        
-        if available_rooms:
-            for room in available_rooms:
-                print(f"RoomID: {room[0]}, Cost: ${room[1]}")
-            
-            room_id = input("Enter RoomID: ")
-            selected_room = next((room for room in available_rooms if str(room[0]) == room_id), None)
-            
-            if selected_room:
-                execute_query(conn, """
-                INSERT INTO Bill (PatientID, BillType, Amount, Date, PaymentStatus)
-                VALUES (?, 'Room', ?, ?, 'Pending')
-                """, (patient_id, selected_room[1], date.today()))
-                
-                execute_query(conn, "UPDATE Room SET AvailabilityStatus = 'occupied' WHERE RoomID = ?", (room_id,))
-                
-                print(f"Room {room_id} booked successfully. A bill has been generated.")
-            else:
-                print("Invalid RoomID.")
-        else:
-            print("The chosen room type is not available.")
-    else:
+    if not (choice.isdigit() and 1 <= int(choice) <= len(rooms)):
         print("Invalid choice.")
+        return
+    selected = rooms[int(choice) - 1]
+    if not selected['free_rooms']:
+        print("The chosen room type is not available for those dates.")
+        return
+
+    for room_id, cost in zip(selected['free_rooms'], selected['cost']):
+        print(f"RoomID: {room_id}, Cost: ${cost} per night")
+    room_id = input("Enter RoomID (Enter for any): ").strip()
+    try:
+        stay = services.book_room(conn, patient_id, selected['room_type'], check_in, int(nights),
+                                  room_id=room_id or None)
+    except (ValueError, services.ServiceError) as e:
+        print(e)
+        return
+    print(f"Room {stay['room_id']} booked from {stay['check_in']} to {stay['check_out']}. "
+          f"A bill of ${stay['cost']} has been generated.")
+
+def room_stays(conn):
+    patient_id = input("Enter PatientID: ")
+    stays = services.patient_room_stays(conn, patient_id)
+    if not stays:
+        print("This patient has no room bookings.")
+        return
+    for stay in stays:
+        print(f"StayID: {stay['stay_id']}, Room {stay['room_id']} ({stay['room_type']}), "
+              f"{stay['check_in']} to {stay['check_out']}")
+    print("1] Discharge patient\n2] Release one booking\n3] Back")
+    option = input("Enter your option: ")
+    try:
+        if option == '1':
+            ended = services.discharge_patient(conn, patient_id)
+            print(f"Discharged from {len(ended)} room(s)." if ended else "No stay has started yet.")
+        elif option == '2':
+            result = services.end_stay(conn, input("Enter StayID: "))
+            print(f"Room {result['room_id']} {result['status'].lower()}.")
+    except services.ServiceError as e:
+        print(e)
 
 def buy_medicines(conn, patient_id):
-    cart = []
+    # MedicineID -> [name, unit cost, quantity]
+    cart = {}
     while True:
         print("1. View all Medicines")
-        print("2. Search by MedicineID")
+        print("2. Search Medicines (name, use or MedicineID)")
         print("3. View Cart")
         print("4. Back")
         choice = input("Enter your option: ")
@@ -1334,13 +1146,11 @@ def buy_medicines(conn, patient_id):
             print("Invalid option. Please enter a number between 1 and 4.")
 
 def view_all_medicines(conn, cart):
-    cursor = conn.cursor()
-    cursor.execute("SELECT MedicineID, Name FROM Medicine")
-    medicines = cursor.fetchall()
-    for medicine in medicines:
-        print(f"MedicineID: {medicine[0]}, Name: {medicine[1]}")
+    pager = KeysetPager(conn, ["MedicineID", "Name"], "Medicine",
+                        keys=["MedicineID"], page_size=PAGE_SIZE)
+    browse(pager, lambda medicine: print(f"MedicineID: {medicine[0]}, Name: {medicine[1]}"))
     print("--------------------------------")
-    print("1] Search by MedicineID\n2] Back")
+    print("1] Search Medicines\n2] Back")
     option = input("Enter your option: ")
     if option == '1':
         search_medicine(conn, cart)
@@ -1348,21 +1158,36 @@ def view_all_medicines(conn, cart):
         return
     else:
         print("Invalid option. Please enter a number between 1 and 2.")
-        view_all_medicines(conn)
+        view_all_medicines(conn, cart)
 
 def search_medicine(conn, cart):
-    medicine_id = input("Enter MedicineID: ")
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT Name, Cost, Use FROM Medicine WHERE MedicineID='{medicine_id}'")
-    medicine = cursor.fetchone()
-    if medicine:
-        print(f"Name: {medicine[0]}, Cost: {medicine[1]}, Use: {medicine[2]}")
-        add_to_cart = input("Add the medicine to the cart [y/n]: ")
-        if add_to_cart.lower() == 'y':
-            cart.append((medicine_id, medicine[0], medicine[1]))
-    else:
+    medicine_index.ensure_current(conn)
+    while True:
+        text = input("Type a medicine name, use or MedicineID (Enter to go back): ").strip()
+        if not text:
+            return
+        if not text.isdigit():
+            matches = medicine_index.search(text)
+            if not matches:
+                print("No matching medicines.")
+                continue
+            for match in matches:
+                print(f"MedicineID: {match[0]}, Name: {match[1]}, Cost: {match[2]}, Use: {match[3]}")
+            text = input("Enter MedicineID to add to the cart (Enter to search again): ").strip()
+            if not text:
+                continue
+        medicine = medicine_index.get(text)
+        if medicine:
+            print(f"Name: {medicine[0]}, Cost: {medicine[1]}, Use: {medicine[2]}")
+            quantity = input("Quantity to add to the cart (0 to skip) [1]: ").strip() or '1'
+            if not quantity.isdigit():
+                print("Quantity must be a whole number.")
+            elif int(quantity) > 0:
+                line = cart.setdefault(int(text), [medicine[0], medicine[1], 0])
+                line[2] += int(quantity)
+                print(f"{line[0]} x{line[2]} in cart.")
+            return
         print("Medicine not found.")
-    return
 
 def view_cart(conn, patient_id, cart):
     if not cart:
@@ -1370,30 +1195,21 @@ def view_cart(conn, patient_id, cart):
         return
     total_cost = 0
     print("Medicines in cart:")
-    for medicine in cart:
-        print(f"MedicineID: {medicine[0]}, Name: {medicine[1]}, Cost: {medicine[2]}")
-        total_cost += medicine[2]
+    for medicine_id, (name, cost, quantity) in cart.items():
+        print(f"MedicineID: {medicine_id}, Name: {name}, Cost: {cost}, Quantity: {quantity}, Subtotal: {cost * quantity}")
+        total_cost += cost * quantity
     print(f"Total Cost: {total_cost}")
     
     pay = input("Do you wish to pay [y/n]: ")
     if pay.lower() == 'y':
-        print("You can make the payment in Bills.")
-        cursor = conn.cursor()
-        medicines_bought = ", ".join([f"{med[1]} (ID: {med[0]})" for med in cart])
-        today = datetime.today().strftime('%Y-%m-%d')
-        cursor.execute(f"INSERT INTO Bill (PatientID, BillType, Amount, Date, PaymentStatus) VALUES (?, 'Medicines', ?, ?, 'Pending')", 
-                       (patient_id, total_cost, today))
-        conn.commit()
-
-def execute_query(conn, query, params=()):
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    conn.commit()
-
-def fetch_data(conn, query, params=()):
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    return cursor.fetchall()
+        try:
+            bill = services.checkout_medicines(conn, patient_id,
+                                               [(medicine_id, line[2]) for medicine_id, line in cart.items()])
+        except services.ServiceError as e:
+            print(e)
+            return
+        cart.clear()
+        print(f"Bill {bill['bill_id']} raised for ${bill['amount']}. You can make the payment in Bills.")
 
 def doctors_menu(conn):
     while True:
@@ -1424,7 +1240,7 @@ def edit_doctor_profile(conn):
     doctor_id = input("Enter Doctor ID to edit: ")
     
     # First check if doctor exists
-    doctor = fetch_data(conn, "SELECT * FROM Doctor WHERE DoctorID = ?", (doctor_id,))
+    doctor = fetch_data(conn, 'doctor_by_id', (doctor_id,))
     if not doctor:
         print("Doctor not found!")
         return
@@ -1465,10 +1281,16 @@ def edit_doctor_profile(conn):
             except ValueError:
                 print("Invalid input. Years of experience must be a number.")
                 return
+        elif field == 'DOB':
+            try:
+                new_value = to_iso(new_value)
+            except ValueError:
+                print("Invalid date. Please use YYYY-MM-DD.")
+                return
         
         # Update the database
-        execute_query(conn, f"UPDATE Doctor SET {field} = ? WHERE DoctorID = ?", 
-                     (new_value, doctor_id))
+        execute_query(conn, f'update_doctor_{field}', (new_value, doctor_id))
+        directory.invalidate()
         print(f"Doctor {field} updated successfully.")
     else:
         print("Invalid choice!")
@@ -1480,8 +1302,9 @@ def patients_menu(conn):
         print("1] View Patients")
         print("2] Add Patient")
         print("3] Edit Patient Profile")
-        print("4] Back")
-        print("5] Exit")
+        print("4] Room Stays")
+        print("5] Back")
+        print("6] Exit")
         
         choice = input("Enter your choice: ")
         
@@ -1492,23 +1315,17 @@ def patients_menu(conn):
         elif choice == '3':
             edit_patient_profile(conn)
         elif choice == '4':
-            return
+            room_stays(conn)
         elif choice == '5':
+            return
+        elif choice == '6':
             print("Exiting...")
             exit()
         else:
-            print("Invalid choice, please enter a number between 1 and 5.")
+            print("Invalid choice, please enter a number between 1 and 6.")
 
 def add_doctor(conn):
     password = input("Enter Password: ")
-
-    execute_query(conn, "INSERT INTO LoginCredits (Password, UserType) VALUES (?, ?)", (password, 'Doctor'))
-
-    cursor = conn.cursor()
-    cursor.execute("SELECT last_insert_rowid()")
-    user_id = cursor.fetchone()[0]
-
-    print(f"Doctor UserID is: {user_id}")
     name = input("Doctor Name: ")
     dob = input("Date of Birth (YYYY-MM-DD): ")
     gender = input("Gender: ")
@@ -1517,25 +1334,19 @@ def add_doctor(conn):
     email = input("Email: ")
     address = input("Address: ")
     experience = int(input("Years of Experience: "))
-    execute_query(conn, """
-    INSERT INTO Doctor (Name, DOB, Gender, Specialization, PhoneNo, EmailID, Address, YearsOfExperience, WorkStatus)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (name, dob, gender, specialization, phone, email, address, experience, 'Active'))
+    try:
+        user_id = services.create_doctor(conn, password, name, dob, gender, specialization, phone, email,
+                                         address, experience)
+    except services.ServiceError as e:
+        print(e)
+        return
+    print(f"Doctor UserID is: {user_id}")
     print(f"Doctor {name} added successfully.")
     input("\nPress Enter to continue...")
 
 def add_patient(conn):
     password = input("Enter Password for Patient: ")
     
-    # Add login credentials
-    execute_query(conn, "INSERT INTO LoginCredits (Password, UserType) VALUES (?, ?)", (password, 'Patient'))
-    
-    cursor = conn.cursor()
-    cursor.execute("SELECT last_insert_rowid()")
-    user_id = cursor.fetchone()[0]
-    
-    print(f"Patient UserID is: {user_id}")
-    
     # Get patient details
     name = input("Patient Name: ")
     dob = input("Date of Birth (YYYY-MM-DD): ")
@@ -1547,12 +1358,15 @@ def add_patient(conn):
     address = input("Address: ")
     medical_history = input("Medical History (if any): ")
     
-    # Insert patient data
-    execute_query(conn, """
-    INSERT INTO Patient (Name, DOB, Weight, Height, Gender, PhoneNo, EmailID, Address, MedicalHistory)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (name, dob, weight, height, gender, phone, email, address, medical_history))
+    # Login credentials and patient data are added together
+    try:
+        user_id = services.create_patient(conn, password, name, dob, weight, height, gender, phone, email,
+                                          address, medical_history)
+    except services.ServiceError as e:
+        print(e)
+        return
     
+    print(f"Patient UserID is: {user_id}")
     print(f"Patient {name} added successfully.")
     input("\nPress Enter to continue...")
 
@@ -1560,7 +1374,7 @@ def edit_patient_profile(conn):
     patient_id = input("Enter Patient ID to edit: ")
     
     # First check if patient exists
-    patient = fetch_data(conn, "SELECT * FROM Patient WHERE PatientID = ?", (patient_id,))
+    patient = fetch_data(conn, 'patient_by_id', (patient_id,))
     if not patient:
         print("Patient not found!")
         return
@@ -1601,10 +1415,15 @@ def edit_patient_profile(conn):
             except ValueError:
                 print(f"Invalid input. {field} must be a number.")
                 return
+        elif field == 'DOB':
+            try:
+                new_value = to_iso(new_value)
+            except ValueError:
+                print("Invalid date. Please use YYYY-MM-DD.")
+                return
         
         # Update the database
-        execute_query(conn, f"UPDATE Patient SET {field} = ? WHERE PatientID = ?", 
-                     (new_value, patient_id))
+        execute_query(conn, f'update_patient_{field}', (new_value, patient_id))
         print(f"Patient {field} updated successfully.")
     else:
         print("Invalid choice!")
@@ -1613,7 +1432,7 @@ def edit_patient_profile(conn):
 def add_admin(conn):
     name = input("Admin Name: ")
     password = input("Admin Password: ")
-    execute_query(conn, "INSERT INTO LoginCredits (Password) VALUES (?)", (password,))
+    execute_query(conn, 'insert_admin_credentials', (hash_password(password),))
     print(f"Admin {name} added successfully.")
     input("\nPress Enter to continue...")
 
@@ -1640,27 +1459,25 @@ def leave_menu(conn):
             print("Invalid choice, please enter a number between 1 and 4.")
 
 def view_all_leaves(conn):
-    # Fetch all leaves with doctor names
-    leaves = fetch_data(conn, """
-        SELECT Leave.LeaveID, Doctor.Name, Leave.SelectDate, Leave.ReturnDate, 
-               Leave.NoOfDays, Leave.Reason, Leave.LeaveStatus
-        FROM Leave
-        JOIN Doctor ON Leave.DoctorID = Doctor.DoctorID
-        ORDER BY Leave.SelectDate DESC
-    """)
-    
-    if leaves:
+    # Page through all leaves with doctor names, latest first
+    pager = KeysetPager(conn,
+                        ["Leave.LeaveID", "Doctor.Name", "Leave.SelectDate", "Leave.ReturnDate",
+                         "Leave.NoOfDays", "Leave.Reason", "Leave.LeaveStatus"],
+                        "Leave JOIN Doctor ON Leave.DoctorID = Doctor.DoctorID",
+                        keys=["Leave.SelectDate", "Leave.LeaveID"], page_size=PAGE_SIZE, descending=True)
+    
+    def header():
         print("\nAll Leaves Information:")
         print("-" * 100)
         print(f"{'LeaveID':^8} | {'Doctor Name':^20} | {'Start Date':^12} | {'End Date':^12} | "
               f"{'Days':^6} | {'Reason':^25} | {'Status':^10}")
         print("-" * 100)
-        
-        for leave in leaves:
-            print(f"{leave[0]:^8} | {leave[1]:^20} | {leave[2]:^12} | {leave[3]:^12} | "
-                  f"{leave[4]:^6} | {leave[5]:^10} | {leave[6][:25]:^25}")
-        print("-" * 100)
-    else:
+    
+    def show(leave):
+        print(f"{leave[0]:^8} | {leave[1]:^20} | {leave[2]:^12} | {leave[3]:^12} | "
+              f"{leave[4]:^6} | {leave[5]:^10} | {leave[6][:25]:^25}")
+    
+    if not browse(pager, show, header):
         print("No leaves found in the system.")
     
     input("\nPress Enter to continue...")
@@ -1668,14 +1485,7 @@ def view_all_leaves(conn):
 def handle_pending_leaves(conn):
     while True:
         # Fetch pending leaves with doctor names
-        pending_leaves = fetch_data(conn, """
-            SELECT Leave.LeaveID, Doctor.Name, Leave.SelectDate, Leave.ReturnDate, 
-                   Leave.NoOfDays, Leave.Reason
-            FROM Leave
-            JOIN Doctor ON Leave.DoctorID = Doctor.DoctorID
-            WHERE Leave.LeaveStatus = 'Pending'
-            ORDER BY Leave.SelectDate
-        """)
+        pending_leaves = fetch_data(conn, 'pending_leaves')
         
         if pending_leaves:
             print("\nPending Leaves:")
@@ -1711,76 +1521,25 @@ def handle_pending_leaves(conn):
 def accept_leave(conn):
     leave_id = input("Enter LeaveID to accept: ")
     
-    # Check if leave exists and is pending
-    leave_info = fetch_data(conn, """
-        SELECT LeaveID, DoctorID, LeaveStatus
-        FROM Leave
-        WHERE LeaveID = ?
-    """, (leave_id,))
-    
-    if not leave_info:
-        print("Leave ID not found!")
-        return
-    
-    if leave_info[0][2] != 'Pending':
-        print("This leave is not in pending state!")
-        return
-    
-    # Update leave status and doctor work status
     try:
-        # Start a transaction
-        conn.execute("BEGIN TRANSACTION")
-        
-        # Update leave status
-        execute_query(conn, """
-            UPDATE Leave 
-            SET LeaveStatus = 'Accepted' 
-            WHERE LeaveID = ?
-        """, (leave_id,))
-        
-        # Update doctor work status
-        execute_query(conn, """
-            UPDATE Doctor 
-            SET WorkStatus = 'On Leave' 
-            WHERE DoctorID = ?
-        """, (leave_info[0][1],))
-        
-        # Commit the transaction
-        conn.commit()
+        result = services.accept_leave(conn, leave_id)
         print("Leave accepted successfully.")
-        
+        if result['appointments_affected']:
+            print(f"Note: {result['appointments_affected']} appointment(s) are already booked during this leave.")
+    except services.ServiceError as e:
+        print(e)
     except Exception as e:
-        # Rollback in case of error
-        conn.rollback()
         print(f"Error occurred: {e}")
         print("Leave acceptance failed.")
 
 def reject_leave(conn):
     leave_id = input("Enter LeaveID to reject: ")
     
-    # Check if leave exists and is pending
-    leave_info = fetch_data(conn, """
-        SELECT LeaveStatus
-        FROM Leave
-        WHERE LeaveID = ?
-    """, (leave_id,))
-    
-    if not leave_info:
-        print("Leave ID not found!")
-        return
-    
-    if leave_info[0][0] != 'Pending':
-        print("This leave is not in pending state!")
-        return
-    
-    # Update leave status
-    execute_query(conn, """
-        UPDATE Leave 
-        SET LeaveStatus = 'Rejected' 
-        WHERE LeaveID = ?
-    """, (leave_id,))
-    
-    print("Leave rejected successfully.")
+    try:
+        services.reject_leave(conn, leave_id)
+        print("Leave rejected successfully.")
+    except services.ServiceError as e:
+        print(e)
 
 def admin_function(conn, user_id):
     while True:
@@ -1789,9 +1548,11 @@ def admin_function(conn, user_id):
         print("2] Patients")
         print("3] Leave Management")
         print("4] Pending Bills")
-        print("5] View passwords")
-        print("6] Edit password")
-        print("7] Exit")
+        print("5] Revenue Reports")
+        print("6] View accounts")
+        print("7] Database Metrics")
+        print("8] Edit password")
+        print("9] Exit")
         
         choice = input("Enter your choice: ")
         
@@ -1804,32 +1565,99 @@ def admin_function(conn, user_id):
         elif choice == '4':
             pending_bills(conn)
         elif choice == '5':
-            view_passwords(conn)
+            revenue_reports(conn)
         elif choice == '6':
-            edit_password(conn, user_id)
+            view_accounts(conn)
         elif choice == '7':
+            database_metrics()
+        elif choice == '8':
+            edit_password(conn, user_id)
+        elif choice == '9':
             print("Exiting...")
             break
         else:
-            print("Invalid choice, please enter a number between 1 and 7.")
+            print("Invalid choice, please enter a number between 1 and 9.")
 
 def pending_bills(conn):
-    bills = fetch_data(conn, "SELECT * FROM Bill WHERE PaymentStatus = 'Pending'")
-    if bills:
-        for bill in bills:
-            print(f"BillID: {bill[0]}, PatientID: {bill[1]}, Amount: {bill[3]}, Date: {bill[4]}, Status: {bill[5]}")
-    else:
+    # Patients who owe money, oldest debt first, straight from the balance summary
+    pager = KeysetPager(conn, ["PatientID", "Outstanding", "PendingCount", "LastPayment"], "PatientBalance",
+                        keys=["OldestPending", "PatientID"], where="PendingCount > 0", page_size=PAGE_SIZE)
+    show = lambda row: print(f"PatientID: {row[0]}, Outstanding: {row[1]}, Unpaid bills: {row[2]}, "
+                             f"Last payment: {row[3] or 'never'}")
+    if not browse(pager, show):
         print("No pending bills.")
+        input("\nPress Enter to continue...")
+        return
+    patient_id = input("\nEnter a PatientID to see their unpaid bills (or press Enter to go back): ")
+    if patient_id.isdigit():
+        for bill in fetch_data(conn, 'unpaid_bills', (patient_id,)):
+            print(f"BillID: {bill[0]}, Amount: {bill[1]}, Bill Type: {bill[2]}, Date: {bill[3]}")
+        input("\nPress Enter to continue...")
+
+def revenue_reports(conn):
+    since = input("Report from date (YYYY-MM-DD, Enter for all): ").strip() or None
+    until = input("Report up to date (YYYY-MM-DD, Enter for today): ").strip() or None
+    try:
+        print_report(build_report(conn, since, until))
+    except ReportError as e:
+        print(e)
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD.")
     input("\nPress Enter to continue...")
 
-def view_passwords(conn):
-    users = fetch_data(conn, "SELECT * FROM LoginCredits")
-    if users:
-        for user in users:
-            print(f"UserID: {user[0]}, Password: {user[1]}, UserType: {user[2]}")
-    else:
+def view_accounts(conn):
+    # Passwords are never shown; only how each one is stored
+    pager = KeysetPager(conn, ["UserID", "Password", "UserType"], "LoginCredits",
+                        keys=["UserID"], page_size=PAGE_SIZE)
+    show = lambda user: print(f"UserID: {user[0]}, UserType: {user[2]}, Password: {password_status(user[1])}")
+    if not browse(pager, show):
         print("No accounts found.")
     input("\nPress Enter to continue...")
 
+def _cache_metrics():
+    cache = directory.stats()
+    statements = query_stats()
+    return {
+        'hospital_directory_cache_hits_total': ("Doctor directory cache hits.", 'counter', cache['hits']),
+        'hospital_directory_cache_misses_total': ("Doctor directory cache misses.", 'counter', cache['misses']),
+        'hospital_directory_cache_entries': ("Doctor directory cache entries.", 'gauge', cache['entries']),
+        'hospital_statement_cache_hits_total': ("Named queries run from the statement cache.", 'counter',
+                                                sum(row[1] for row in statements)),
+        'hospital_statement_cache_misses_total': ("Named queries that had to be prepared.", 'counter',
+                                                  sum(row[2] for row in statements)),
+    }
+
+def database_metrics(top=15):
+    ms = lambda seconds: "-" if seconds is None else f"{seconds * 1000:.2f}"
+    print(f"\n{'Query':<34} | {'Calls':>7} | {'Total ms':>10} | {'Avg ms':>8} | {'p95 ms':>8} | {'Rows':>8} | {'Slow':>4}")
+    print("-" * 98)
+    for row in sql_metrics.summary()[:top]:
+        print(f"{row['query'][:34]:<34} | {row['count']:>7} | {row['total_seconds'] * 1000:>10.2f} | "
+              f"{ms(row['avg_seconds']):>8} | {ms(row['p95_seconds']):>8} | {row['rows']:>8} | {row['slow']:>4}")
+
+    waits = sql_metrics.lock_waits
+    print(f"\nWrite lock waits: {waits.count} ({waits.total * 1000:.1f} ms total), "
+          f"busy errors: {sql_metrics.busy_errors}")
+    cache = directory.stats()
+    print(f"Doctor directory cache: {cache['hits']} hits, {cache['misses']} misses, "
+          f"hit rate {cache['hit_rate'] * 100:.1f}%")
+    print(f"Slow queries (over {sql_metrics.slow_seconds * 1000:.0f} ms) are logged to {sql_metrics.slow_log}")
+
+    print(f"\n{'Statement cache':<34} | {'Hits':>7} | {'Misses':>7} | {'Hit rate':>8}")
+    print("-" * 66)
+    for name, hits, misses in query_stats()[:top]:
+        print(f"{name[:34]:<34} | {hits:>7} | {misses:>7} | {hits / (hits + misses) * 100:>7.1f}%")
+    for name, hits, misses, variants in builder_stats():
+        if hits or misses:
+            print(f"Builder {name}: {variants} statement variants, {hits} reused, {misses} built")
+    print_metrics(scheduler.metrics())
+
+    if input(f"\nWrite metrics to {METRICS_FILE} for Prometheus? (y/n): ").lower() == 'y':
+        try:
+            sql_metrics.write_prometheus(METRICS_FILE, _cache_metrics())
+            print("Metrics written.")
+        except OSError as e:
+            print(f"Could not write metrics: {e}")
+
 if __name__ == "__main__":
     main()
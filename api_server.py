@@ -0,0 +1,453 @@
+import argparse
+import asyncio
+import json
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import services
+from availability import slot_index
+from credentials import authenticate
+from connection import DB_PATH, connect
+from data_access import fetch_data
+from directory import directory
+from migrations import init_schema
+from rooms import room_allocator
+from scheduler import default_scheduler
+from transactions import GroupCommitter
+
+# Requests from one connection that may be in flight at once (pipelining)
+MAX_PIPELINE = 32
+MAX_BODY = 1 << 20
+
+# Lifetime of a login token (seconds)
+SESSION_SECONDS = 8 * 3600
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+           404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Session:
+    def __init__(self, token, user_id, user_type, expires):
+        self.token = token
+        self.user_id = user_id
+        self.user_type = user_type
+        self.expires = expires
+
+
+class SessionStore:
+    """
+    Bearer tokens issued by POST /login, held in memory: a restart logs
+    everyone out. Expired tokens are dropped when next presented.
+    """
+
+    def __init__(self, ttl=SESSION_SECONDS):
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, user_id, user_type):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[token] = Session(token, user_id, user_type, time.monotonic() + self.ttl)
+        return token
+
+    def get(self, token):
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is not None and session.expires <= time.monotonic():
+                del self._sessions[token]
+                session = None
+        return session
+
+
+# Route handlers run on the worker pool with that thread's own connection.
+# Each receives (conn, session, match, query, body) and returns (status,
+# payload); `session` is the caller's login and each handler checks that it
+# may act on the records it names. Patients and doctors act on their own
+# records (their UserID is their PatientID / DoctorID); admins on anyone's.
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"{name} must be an integer")
+
+
+def _field(body, name):
+    if name not in body:
+        raise HttpError(400, f"missing field {name!r}")
+    return body[name]
+
+
+def _require(session, *user_types):
+    if session.user_type not in user_types:
+        raise HttpError(403, f"not allowed for {session.user_type} accounts")
+
+
+def _own_patient(session, patient_id):
+    if session.user_type != 'Admin' and (session.user_type, session.user_id) != ('Patient', patient_id):
+        raise HttpError(403, "patients may only reach their own records")
+
+
+def _own_doctor(session, doctor_id):
+    if session.user_type != 'Admin' and (session.user_type, session.user_id) != ('Doctor', doctor_id):
+        raise HttpError(403, "doctors may only act for themselves")
+
+
+def post_login(conn, session, match, query, body):
+    # The token is added by ApiServer.dispatch once the password checks out
+    user_id, user_type = _int(_field(body, 'user_id'), 'user_id'), _field(body, 'user_type')
+    if not authenticate(conn, user_id, str(_field(body, 'password')), user_type):
+        raise HttpError(401, "invalid credentials")
+    return 200, {'user_id': user_id, 'user_type': user_type}
+
+
+def get_doctors(conn, session, match, query, body):
+    return 200, services.list_doctors(conn, query.get('specialization'))
+
+
+def get_availability(conn, session, match, query, body):
+    days = _int(query.get('days', services.BOOKING_WINDOW_DAYS), 'days')
+    if not 1 <= days <= 366:
+        raise HttpError(400, "days must be between 1 and 366")
+    return 200, services.doctor_availability(conn, int(match['doctor_id']), query.get('start'), days)
+
+
+def post_appointment(conn, session, match, query, body):
+    patient_id = _int(_field(body, 'patient_id'), 'patient_id')
+    _own_patient(session, patient_id)
+    return 201, services.book_appointment(
+        conn, patient_id, _int(_field(body, 'doctor_id'), 'doctor_id'),
+        _field(body, 'date'), _field(body, 'time'), body.get('purpose', "Regular checkup"))
+
+
+def get_bills(conn, session, match, query, body):
+    _own_patient(session, int(match['patient_id']))
+    unpaid_only = query.get('status', '').lower() == 'pending'
+    return 200, services.patient_bills(conn, int(match['patient_id']), unpaid_only)
+
+
+def get_balance(conn, session, match, query, body):
+    _own_patient(session, int(match['patient_id']))
+    return 200, services.patient_balance(conn, int(match['patient_id']))
+
+
+def post_pay_bill(conn, session, match, query, body):
+    # pay_bill only finds the bill among this patient's own
+    patient_id = _int(_field(body, 'patient_id'), 'patient_id')
+    _own_patient(session, patient_id)
+    return 200, services.pay_bill(conn, patient_id, int(match['bill_id']))
+
+
+def get_rooms(conn, session, match, query, body):
+    nights = _int(query.get('nights', 1), 'nights')
+    return 200, services.room_availability(conn, query.get('check_in'), nights)
+
+
+def post_room_stay(conn, session, match, query, body):
+    patient_id = _int(_field(body, 'patient_id'), 'patient_id')
+    _own_patient(session, patient_id)
+    room_id = body.get('room_id')
+    return 201, services.book_room(
+        conn, patient_id, _field(body, 'room_type'), _field(body, 'check_in'),
+        _int(body.get('nights', 1), 'nights'), None if room_id is None else _int(room_id, 'room_id'))
+
+
+def post_end_stay(conn, session, match, query, body):
+    _require(session, 'Admin')
+    return 200, services.end_stay(conn, int(match['stay_id']))
+
+
+def get_treatments(conn, session, match, query, body):
+    # Medical records: the patient, an admin, or a doctor who has seen them
+    patient_id = int(match['patient_id'])
+    if session.user_type == 'Doctor':
+        if not fetch_data(conn, 'doctor_has_patient', (session.user_id, patient_id)):
+            raise HttpError(403, "doctors may only read their own patients' records")
+    else:
+        _own_patient(session, patient_id)
+    return 200, services.patient_treatments(conn, patient_id)
+
+
+def post_leave(conn, session, match, query, body):
+    doctor_id = _int(_field(body, 'doctor_id'), 'doctor_id')
+    _own_doctor(session, doctor_id)
+    return 201, services.apply_leave(conn, doctor_id, _field(body, 'select_date'), _field(body, 'return_date'),
+                                     body.get('reason', ''))
+
+
+def post_accept_leave(conn, session, match, query, body):
+    _require(session, 'Admin')
+    return 200, services.accept_leave(conn, int(match['leave_id']))
+
+
+def post_reject_leave(conn, session, match, query, body):
+    _require(session, 'Admin')
+    return 200, services.reject_leave(conn, int(match['leave_id']))
+
+
+ROUTES = [
+    ('POST', r'/login', post_login),
+    ('GET', r'/doctors', get_doctors),
+    ('GET', r'/doctors/(?P<doctor_id>\d+)/availability', get_availability),
+    ('POST', r'/appointments', post_appointment),
+    ('GET', r'/patients/(?P<patient_id>\d+)/bills', get_bills),
+    ('GET', r'/patients/(?P<patient_id>\d+)/balance', get_balance),
+    ('POST', r'/bills/(?P<bill_id>\d+)/pay', post_pay_bill),
+    ('GET', r'/rooms', get_rooms),
+    ('POST', r'/room-stays', post_room_stay),
+    ('POST', r'/room-stays/(?P<stay_id>\d+)/end', post_end_stay),
+    ('GET', r'/patients/(?P<patient_id>\d+)/treatments', get_treatments),
+    ('POST', r'/leaves', post_leave),
+    ('POST', r'/leaves/(?P<leave_id>\d+)/accept', post_accept_leave),
+    ('POST', r'/leaves/(?P<leave_id>\d+)/reject', post_reject_leave),
+]
+ROUTES = [(method, re.compile(pattern + '$'), handler) for method, pattern, handler in ROUTES]
+
+# The busiest small writes: concurrent requests are handed to the group
+# committer, so a burst of bookings and payments shares one commit and fsync
+GROUP_COMMIT = {post_appointment, post_pay_bill}
+
+
+def _drop_cached_writes():
+    # A group commit was rolled back: bookings marked in memory may not exist
+    slot_index.invalidate()
+    room_allocator.invalidate()
+    directory.invalidate()
+
+
+class ApiServer:
+    """
+    HTTP/1.1 JSON front end for the booking, billing, treatment and leave
+    services. Connections are kept alive and may pipeline requests; blocking
+    sqlite3 work runs on a bounded thread pool, one connection per worker,
+    except the writes in GROUP_COMMIT, which go through one group committer.
+    The housekeeping scheduler runs alongside once the schema is migrated.
+
+    Every route but POST /login needs the token it returns, sent as
+    `Authorization: Bearer <token>`.
+    """
+
+    def __init__(self, db_path=DB_PATH, workers=8):
+        self.db_path = db_path
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db')
+        self.committer = None
+        self.scheduler = default_scheduler(db_path)
+        self.sessions = SessionStore()
+        self._handlers = set()
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.server = None
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.db_path)
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, handler, session, match, query, body):
+        return handler(self._conn(), session, match, query, body)
+
+    def _session(self, headers):
+        scheme, _, token = (headers or {}).get('authorization', '').partition(" ")
+        session = self.sessions.get(token.strip()) if scheme.lower() == 'bearer' else None
+        if session is None:
+            raise HttpError(401, "log in first: send Authorization: Bearer <token> from POST /login")
+        return session
+
+    async def dispatch(self, method, target, body, headers=None):
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        allowed = False
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            try:
+                data = json.loads(body) if body else {}
+            except json.JSONDecodeError:
+                return 400, {'error': "invalid JSON body"}
+            if not isinstance(data, dict):
+                return 400, {'error': "request body must be a JSON object"}
+            loop = asyncio.get_running_loop()
+            try:
+                session = None if handler is post_login else self._session(headers)
+                args = (session, match.groupdict(), query, data)
+                if handler in GROUP_COMMIT:
+                    return await asyncio.wrap_future(self.committer.submit(handler, *args))
+                status, payload = await loop.run_in_executor(self.executor, self._call, handler, *args)
+                if handler is post_login:
+                    payload['token'] = self.sessions.create(payload['user_id'], payload['user_type'])
+                return status, payload
+            except HttpError as e:
+                return e.status, {'error': str(e)}
+            except services.ServiceError as e:
+                return 400, {'error': str(e)}
+            except Exception as e:
+                return 500, {'error': f"{type(e).__name__}: {e}"}
+        if allowed:
+            return 405, {'error': f"{method} not allowed on {url.path}"}
+        return 404, {'error': f"no route for {url.path}"}
+
+    async def _read_request(self, reader):
+        """Parse one request; returns None on a clean end of stream."""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HttpError(400, "incomplete request")
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(413, "request head too large")
+
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        length = _int(headers.get('content-length', 0), 'Content-Length')
+        if length < 0:
+            raise HttpError(400, "invalid Content-Length")
+        if length > MAX_BODY:
+            raise HttpError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        return method.upper(), target, body, headers, keep_alive
+
+    @staticmethod
+    def _response(status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode() + body
+
+    async def handle(self, reader, writer):
+        # Requests are started as soon as they are parsed and answered in order
+        pending = asyncio.Queue(MAX_PIPELINE)
+
+        async def respond():
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                task, keep_alive = item
+                status, payload = await task
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+
+        self._handlers.add(asyncio.current_task())
+        responder = asyncio.create_task(respond())
+        try:
+            while not responder.done():
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    error = asyncio.get_running_loop().create_future()
+                    error.set_result((e.status, {'error': str(e)}))
+                    await pending.put((error, False))
+                    break
+                if request is None:
+                    break
+                method, target, body, headers, keep_alive = request
+                await pending.put((asyncio.create_task(self.dispatch(method, target, body, headers)), keep_alive))
+                if not keep_alive:
+                    break
+            await pending.put(None)
+            await responder
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # close() is shutting the server down. This task is the stream's
+            # connection callback, which must not finish cancelled: asyncio
+            # would report it as an unhandled exception.
+            pass
+        finally:
+            # On a dropped connection or shutdown, stop the requests still queued
+            responder.cancel()
+            while not pending.empty():
+                item = pending.get_nowait()
+                if item is not None:
+                    item[0].cancel()
+            await asyncio.gather(responder, return_exceptions=True)
+            writer.close()
+            self._handlers.discard(asyncio.current_task())
+
+    async def start(self, host='127.0.0.1', port=8080):
+        await asyncio.get_running_loop().run_in_executor(self.executor, lambda: init_schema(self._conn()))
+        self.committer = GroupCommitter(self.db_path, on_rollback=_drop_cached_writes)
+        self.scheduler.start()
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def serve_forever(self, host='127.0.0.1', port=8080):
+        await self.start(host, port)
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+        # Kept-alive connections would otherwise wait for their next request
+        handlers = list(self._handlers)
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        if self.server:
+            await self.server.wait_closed()
+        self.scheduler.stop()
+        if self.committer:
+            self.committer.close()
+            self.committer = None
+        self.executor.shutdown(wait=True)
+        for conn in self._connections:
+            conn.close()
+        self._connections = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hospital JSON API server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--workers', type=int, default=8, help="database worker threads")
+    args = parser.parse_args()
+
+    server = ApiServer(args.db, args.workers)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import threading
+from datetime import date, timedelta
+
+from data_access import fetch_data
+from leaves import leave_calendar
+
+# Appointment slots offered every day (10:00 to 16:30, half-hourly)
+ALL_SLOTS = ["10:00", "10:30", "11:00", "11:30", "12:00", "12:30", "13:00",
+             "13:30", "14:00", "14:30", "15:00", "15:30", "16:00", "16:30"]
+
+# Bit i of a day's mask is set when ALL_SLOTS[i] is booked
+SLOT_BITS = {slot: 1 << i for i, slot in enumerate(ALL_SLOTS)}
+FULL_MASK = (1 << len(ALL_SLOTS)) - 1
+
+
+def _day_key(day):
+    return day.isoformat() if isinstance(day, date) else str(day)
+
+
+class SlotIndex:
+    """
+    In-memory index of booked slots: one bitmask per doctor per day.
+
+    A day is read from Appointment the first time it is asked for and served
+    from its mask afterwards; bookings and cancellations made here keep the
+    masks current through mark_booked / mark_free. Days before today are
+    dropped, so the index only ever holds the booking window.
+
+    Appointment's unique slot index stays the authority: a slot booked by
+    another process is found when the insert fails, and the booker marks it.
+    """
+
+    def __init__(self):
+        self._masks = {}
+        self._today = None
+        # Bumped by every mark, so a load that raced one is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _drop_past(self):
+        # Called with the lock held
+        today = date.today().isoformat()
+        if today != self._today:
+            for key in [key for key in self._masks if key[1] < today]:
+                del self._masks[key]
+            self._today = today
+
+    def load(self, conn, doctor_id, start_date, days=1):
+        """(Re)load `days` days of bookings for a doctor with one query."""
+        start_date = start_date if isinstance(start_date, date) else date.fromisoformat(start_date)
+        end_date = start_date + timedelta(days=days - 1)
+        doctor_id = int(doctor_id)
+        with self._lock:
+            generation = self._generation
+
+        masks = {(doctor_id, (start_date + timedelta(days=i)).isoformat()): 0 for i in range(days)}
+        for day, time in fetch_data(conn, 'doctor_booked_slots',
+                                    (doctor_id, start_date.isoformat(), end_date.isoformat())):
+            masks[(doctor_id, day)] = masks.get((doctor_id, day), 0) | SLOT_BITS.get(time, 0)
+
+        with self._lock:
+            self._drop_past()
+            if generation == self._generation:
+                self._masks.update((key, mask) for key, mask in masks.items() if key[1] >= self._today)
+        return masks
+
+    def ensure_loaded(self, conn, doctor_id, start_date, days=1):
+        """
+        Masks for `days` days from `start_date`. Days not yet indexed are
+        read with one query over the span they cover; the rest come from memory.
+        """
+        doctor_id = int(doctor_id)
+        keys = [(doctor_id, (start_date + timedelta(days=i)).isoformat()) for i in range(days)]
+        with self._lock:
+            self._drop_past()
+            masks = {key: self._masks[key] for key in keys if key in self._masks}
+        missing = [key for key in keys if key not in masks]
+        if missing:
+            first, last = date.fromisoformat(missing[0][1]), date.fromisoformat(missing[-1][1])
+            masks.update(self.load(conn, doctor_id, first, (last - first).days + 1))
+        return [masks[key] for key in keys]
+
+    def booked_mask(self, conn, doctor_id, day):
+        day = day if isinstance(day, date) else date.fromisoformat(day)
+        return self.ensure_loaded(conn, doctor_id, day)[0]
+
+    def free_slots(self, conn, doctor_id, day):
+        mask = self.booked_mask(conn, doctor_id, day)
+        return [slot for slot in ALL_SLOTS if not mask & SLOT_BITS[slot]]
+
+    def is_fully_booked(self, conn, doctor_id, day):
+        return self.booked_mask(conn, doctor_id, day) & FULL_MASK == FULL_MASK
+
+    def is_free(self, conn, doctor_id, day, time):
+        return time in SLOT_BITS and not self.booked_mask(conn, doctor_id, day) & SLOT_BITS[time]
+
+    def mark_booked(self, doctor_id, day, time):
+        key = (int(doctor_id), _day_key(day))
+        with self._lock:
+            self._generation += 1
+            if key in self._masks:
+                self._masks[key] |= SLOT_BITS.get(time, 0)
+
+    def mark_free(self, doctor_id, day, time):
+        key = (int(doctor_id), _day_key(day))
+        with self._lock:
+            self._generation += 1
+            if key in self._masks:
+                self._masks[key] &= ~SLOT_BITS.get(time, 0)
+
+    def invalidate(self, doctor_id=None):
+        with self._lock:
+            self._generation += 1
+            if doctor_id is None:
+                self._masks.clear()
+            else:
+                for key in [key for key in self._masks if key[0] == int(doctor_id)]:
+                    del self._masks[key]
+
+
+slot_index = SlotIndex()
+
+
+def doctor_calendar(conn, doctor_id, start_date=None, days=21):
+    """
+    Build a doctor's availability calendar for `days` days from `start_date`.
+    Booked slots come from the slot index (one query for any days it has not
+    seen yet) and leave days from the leave calendar, so days on leave have
+    no free slots.
+    Returns a list of (date, booked_count, free_slots, on_leave) tuples, one per day.
+    """
+    if start_date is None:
+        start_date = date.today()
+    masks = slot_index.ensure_loaded(conn, doctor_id, start_date, days)
+    leave_calendar.ensure_current(conn)
+    on_leave = leave_calendar.leave_days(doctor_id, start_date, days)
+
+    calendar = []
+    for i, mask in enumerate(masks):
+        current_date = start_date + timedelta(days=i)
+        if current_date in on_leave:
+            free_slots = []
+        else:
+            free_slots = [slot for slot in ALL_SLOTS if not mask & SLOT_BITS[slot]]
+        calendar.append((current_date, bin(mask).count("1"), free_slots, current_date in on_leave))
+    return calendar
@@ -0,0 +1,156 @@
+import argparse
+import json
+import sqlite3
+import sys
+import time
+
+import services
+from availability import slot_index
+from connection import DB_PATH, connect
+from directory import directory
+from migrations import init_schema
+from rooms import room_allocator
+from transactions import transaction
+
+
+class BatchError(Exception):
+    pass
+
+
+def _get(op, name, default=...):
+    if name in op:
+        return op[name]
+    if default is ...:
+        raise BatchError(f"missing field {name!r}")
+    return default
+
+
+# Each operation maps a JSON object onto the same service call the
+# interactive menus use.
+OPERATIONS = {
+    'book_appointment': lambda conn, op: services.book_appointment(
+        conn, _get(op, 'patient_id'), _get(op, 'doctor_id'), _get(op, 'date'), _get(op, 'time'),
+        _get(op, 'purpose', "Regular checkup")),
+    'buy_medicines': lambda conn, op: services.checkout_medicines(
+        conn, _get(op, 'patient_id'),
+        [(_get(item, 'medicine_id'), _get(item, 'quantity', 1)) for item in _get(op, 'items')]),
+    'book_room': lambda conn, op: services.book_room(
+        conn, _get(op, 'patient_id'), _get(op, 'room_type'), _get(op, 'check_in'), _get(op, 'nights', 1),
+        _get(op, 'room_id', None)),
+    'discharge_patient': lambda conn, op: services.discharge_patient(conn, _get(op, 'patient_id')),
+    'pay_bill': lambda conn, op: services.pay_bill(conn, _get(op, 'patient_id'), _get(op, 'bill_id')),
+    'add_patient': lambda conn, op: {'user_id': services.create_patient(
+        conn, _get(op, 'password'), _get(op, 'name'), _get(op, 'dob', None), _get(op, 'weight', None),
+        _get(op, 'height', None), _get(op, 'gender', None), _get(op, 'phone', None), _get(op, 'email', None),
+        _get(op, 'address', None), _get(op, 'medical_history', None))},
+    'add_doctor': lambda conn, op: {'user_id': services.create_doctor(
+        conn, _get(op, 'password'), _get(op, 'name'), _get(op, 'dob', None), _get(op, 'gender', None),
+        _get(op, 'specialization'), _get(op, 'phone', None), _get(op, 'email', None),
+        _get(op, 'address', None), _get(op, 'experience', 0))},
+    'apply_leave': lambda conn, op: services.apply_leave(
+        conn, _get(op, 'doctor_id'), _get(op, 'select_date'), _get(op, 'return_date'), _get(op, 'reason', '')),
+    'accept_leave': lambda conn, op: services.accept_leave(conn, _get(op, 'leave_id')),
+    'reject_leave': lambda conn, op: services.reject_leave(conn, _get(op, 'leave_id')),
+}
+
+
+def read_operations(stream):
+    """Yield (line_number, operation or error message) for each non-blank JSONL line."""
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            op = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, f"invalid JSON: {e}"
+            continue
+        if not isinstance(op, dict):
+            yield number, "each line must be a JSON object"
+        else:
+            yield number, op
+
+
+def run_operation(conn, op):
+    name = op.get('op')
+    if name not in OPERATIONS:
+        raise BatchError(f"unknown op {name!r}")
+    return OPERATIONS[name](conn, op)
+
+
+def run_batch(conn, operations, batch_size=500, out=sys.stdout):
+    """
+    Run operations in transactions of `batch_size`. Each operation is its own
+    savepoint, so a failing one (including a database error such as a
+    constraint violation or an unbindable value) is rolled back alone and
+    reported while the rest of its batch still commits. Returns (succeeded, failed, seconds).
+    """
+    succeeded = failed = 0
+    start = time.perf_counter()
+    operations = iter(operations)
+    finished = False
+
+    while not finished:
+        results = []
+        try:
+            with transaction(conn):
+                for _ in range(batch_size):
+                    item = next(operations, None)
+                    if item is None:
+                        finished = True
+                        break
+                    number, op = item
+                    if isinstance(op, str):
+                        results.append({'line': number, 'ok': False, 'error': op})
+                        continue
+                    try:
+                        with transaction(conn):
+                            result = run_operation(conn, op)
+                        results.append({'line': number, 'op': op['op'], 'ok': True, 'result': result})
+                    except (BatchError, services.ServiceError, ValueError, TypeError, sqlite3.Error) as e:
+                        results.append({'line': number, 'op': op.get('op'), 'ok': False, 'error': str(e)})
+        except Exception:
+            # The whole batch was rolled back; cached bookings, doctors and stays may be stale
+            slot_index.invalidate()
+            directory.invalidate()
+            room_allocator.invalidate()
+            raise
+
+        for result in results:
+            if result['ok']:
+                succeeded += 1
+            else:
+                failed += 1
+            if out:
+                out.write(json.dumps(result, default=str) + "\n")
+
+    return succeeded, failed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run hospital operations from a JSONL file without prompts")
+    parser.add_argument('path', nargs='?', default='-', help="JSONL file of operations (default: stdin)")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--batch-size', type=int, default=500, help="operations per transaction")
+    parser.add_argument('--quiet', action='store_true', help="print only the summary")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    init_schema(conn)
+    stream = sys.stdin if args.path == '-' else open(args.path, encoding='utf-8')
+    try:
+        succeeded, failed, seconds = run_batch(conn, read_operations(stream), args.batch_size,
+                                               None if args.quiet else sys.stdout)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        conn.close()
+
+    total = succeeded + failed
+    rate = total / seconds if seconds else 0
+    print(f"{total} operations in {seconds:.2f}s ({rate:,.0f} ops/s): "
+          f"{succeeded} succeeded, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
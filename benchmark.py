@@ -0,0 +1,545 @@
+import argparse
+import builtins
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+
+from availability import ALL_SLOTS
+from connection import PROFILES, connect
+from migrations import init_schema, migrate
+
+
+def build_database(path, doctors=50, patients=1000):
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.executemany("INSERT INTO Doctor (Name, Specialization, AppointmentCost, WorkStatus) VALUES (?, ?, ?, 'Active')",
+                     [(f"Dr. {i}", f"Spec {i % 8}", 500) for i in range(doctors)])
+    conn.executemany("INSERT INTO Patient (Name, DOB) VALUES (?, '1990-01-01')",
+                     [(f"Patient {i}",) for i in range(patients)])
+    conn.commit()
+    conn.close()
+
+
+def profile_workload(path, profile, readers=4, seconds=3.0, doctors=50, patients=1000):
+    """
+    Front-desk workload: one terminal books appointments (appointment + bill
+    per commit) while `readers` terminals browse doctor calendars.
+    """
+    stop = threading.Event()
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    today = date.today()
+
+    def writer():
+        conn = connect(path, profile)
+        rng = random.Random(1)
+        while not stop.is_set():
+            day = today + timedelta(days=rng.randrange(21))
+            try:
+                conn.execute("BEGIN")
+                conn.execute("INSERT OR IGNORE INTO Appointment (PatientID, DoctorID, Date, Time, Purpose) VALUES (?, ?, ?, ?, ?)",
+                             (rng.randrange(1, patients), rng.randrange(1, doctors), day.isoformat(),
+                              rng.choice(ALL_SLOTS), "Regular checkup"))
+                conn.execute("INSERT INTO Bill (PatientID, BillType, Amount, Date, PaymentStatus) VALUES (?, 'Appointment', 500, ?, 'Pending')",
+                             (rng.randrange(1, patients), day.isoformat()))
+                conn.commit()
+                with lock:
+                    counts['writes'] += 1
+            except sqlite3.OperationalError:
+                conn.rollback()
+                with lock:
+                    counts['locked'] += 1
+        conn.close()
+
+    def reader(seed):
+        conn = connect(path, profile)
+        rng = random.Random(seed)
+        while not stop.is_set():
+            try:
+                conn.execute("""
+                    SELECT Date, COUNT(*) FROM Appointment
+                    WHERE DoctorID = ? AND Date BETWEEN ? AND ? GROUP BY Date
+                """, (rng.randrange(1, doctors), today.isoformat(),
+                      (today + timedelta(days=20)).isoformat())).fetchall()
+                with lock:
+                    counts['reads'] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts['locked'] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'profile': profile,
+        'writes_per_sec': counts['writes'] / seconds,
+        'reads_per_sec': counts['reads'] / seconds,
+        'locked_errors': counts['locked'],
+    }
+
+
+def compare_profiles(profiles, readers, seconds):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in profiles:
+            path = os.path.join(tmp, f"{profile}.db")
+            build_database(path)
+            results.append(profile_workload(path, profile, readers, seconds))
+
+    print(f"{'Profile':<10} | {'Writes/s':>10} | {'Reads/s':>10} | {'Locked':>7}")
+    print("-" * 46)
+    for result in results:
+        print(f"{result['profile']:<10} | {result['writes_per_sec']:>10.1f} | "
+              f"{result['reads_per_sec']:>10.1f} | {result['locked_errors']:>7}")
+    return results
+
+
+SPECIALIZATIONS = ["Cardiologist", "Neurologist", "Orthopedist", "Dermatologist",
+                   "Pediatrician", "Oncologist", "Radiologist", "Psychiatrist"]
+DIAGNOSES = ["Hypertension", "Migraine", "Knee Injury", "Asthma", "Diabetes", "Fracture"]
+DRUG_STEMS = ["amoxi", "parace", "ibupro", "lisino", "metfor", "atorva", "omepra", "cetiri", "azithro", "losar"]
+DRUG_USES = ["Pain relief", "Fever", "Antibiotic", "Blood pressure control", "Diabetes", "Allergy", "Acid reflux"]
+
+
+def build_workload_database(path, rows, chunk=100000):
+    """
+    Fill a database with `rows` patients, appointments, bills and treatments
+    (plus proportional doctors and leaves) around today's date.
+    """
+    conn = connect(path, 'bulk')
+    migrate(conn)
+    rng = random.Random(rows)
+    doctors = max(10, rows // 1000)
+    today = date.today()
+
+    def day(spread):
+        return (today + timedelta(days=rng.randrange(-spread, spread))).isoformat()
+
+    tables = [
+        ("INSERT INTO Doctor (Name, DOB, Specialization, AppointmentCost, YearsOfExperience, WorkStatus) "
+         "VALUES (?, '1975-01-01', ?, 500, 10, 'Active')",
+         ((f"Dr. {i}", SPECIALIZATIONS[i % len(SPECIALIZATIONS)]) for i in range(doctors))),
+        ("INSERT INTO LoginCredits (Password, UserType) VALUES (?, 'Patient')",
+         ((f"pass{i}",) for i in range(rows))),
+        ("INSERT INTO Patient (Name, DOB, Gender, MedicalHistory) VALUES (?, ?, ?, ?)",
+         ((f"Patient {i}", f"{1940 + i % 60}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+           "Female" if i % 2 else "Male", rng.choice(DIAGNOSES)) for i in range(rows))),
+        ("INSERT OR IGNORE INTO Appointment (PatientID, DoctorID, Date, Time, Purpose) VALUES (?, ?, ?, ?, 'Regular checkup')",
+         ((rng.randrange(1, rows + 1), rng.randrange(1, doctors + 1), day(30), rng.choice(ALL_SLOTS))
+          for _ in range(rows))),
+        ("INSERT INTO Bill (PatientID, BillType, Amount, Date, PaymentStatus) VALUES (?, ?, ?, ?, ?)",
+         ((rng.randrange(1, rows + 1), rng.choice(["Appointment", "Room", "Medicines"]),
+           rng.randrange(100, 5000), day(365), rng.choice(["Paid", "Pending"])) for _ in range(rows))),
+        ("INSERT INTO Treatment (PatientID, DoctorID, Diagnosis, TreatmentPlan, Medicines, StartDate, EndDate) "
+         "VALUES (?, ?, ?, 'Medication', 'Paracetamol', ?, ?)",
+         ((rng.randrange(1, rows + 1), rng.randrange(1, doctors + 1), rng.choice(DIAGNOSES), day(365), day(365))
+          for _ in range(rows))),
+        ("INSERT INTO Leave (DoctorID, SelectDate, ReturnDate, NoOfDays, Reason, LeaveStatus) "
+         "VALUES (?, ?, ?, 5, 'Vacation', 'Pending')",
+         ((rng.randrange(1, doctors + 1), day(60), day(60)) for _ in range(max(1000, rows // 10)))),
+        ("INSERT INTO Medicine (Name, Cost, Use) VALUES (?, ?, ?)",
+         ((f"{DRUG_STEMS[i % len(DRUG_STEMS)]}{chr(97 + i // 10 % 26)}{i} {rng.choice([50, 100, 250, 500])}mg",
+           rng.randrange(1, 100), rng.choice(DRUG_USES)) for i in range(min(rows, 50000)))),
+    ]
+    for query, values in tables:
+        values = iter(values)
+        while True:
+            batch = [row for _, row in zip(range(chunk), values)]
+            if not batch:
+                break
+            conn.execute("BEGIN")
+            conn.executemany(query, batch)
+            conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return doctors
+
+
+def scripted(func, *args, answers=()):
+    """Call an interactive menu function with canned input() answers and no output."""
+    answers = list(answers)
+    real_input = builtins.input
+
+    def fake_input(prompt=''):
+        if not answers:
+            raise EOFError(f"{func.__name__} asked for more input than scripted")
+        return answers.pop(0)
+
+    builtins.input = fake_input
+    try:
+        with redirect_stdout(io.StringIO()):
+            return func(*args)
+    finally:
+        builtins.input = real_input
+
+
+def measure(operation, ops):
+    """Run operation(i) `ops` times; return ops/sec and latency percentiles in ms."""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(ops):
+        t0 = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+    return {
+        'ops': ops,
+        'ops_per_sec': ops / total if total else 0,
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'p99_ms': pct(99),
+    }
+
+
+def run_suite(path, rows, ops):
+    """Drive the real Hospital_Database.py functions against a database of `rows` rows."""
+    import Hospital_Database as hospital
+    from credentials import authenticate
+
+    conn = connect(path)
+    migrate(conn)
+    hospital.medicine_index.load(conn)
+    doctors = conn.execute("SELECT COUNT(*) FROM Doctor").fetchone()[0]
+    leaves = [row[0] for row in conn.execute(
+        "SELECT LeaveID FROM Leave WHERE LeaveStatus = 'Pending' LIMIT ?", (ops,))]
+    rng = random.Random(7)
+    today = date.today()
+
+    def patient():
+        return rng.randrange(1, rows + 1)
+
+    def doctor():
+        return rng.randrange(1, doctors + 1)
+
+    operations = {
+        'login': lambda i: authenticate(conn, patient(), f"pass{i}", 'Patient'),
+        'availability_calendar': lambda i: hospital.doctor_calendar(conn, doctor(), today, 21),
+        'search_doctor_by_attribute': lambda i: scripted(
+            hospital.search_doctor_by_attribute, conn, answers=['2', f"Dr. {doctor()}"]),
+        'search_patient_by_attribute': lambda i: scripted(
+            hospital.search_patient_by_attribute, conn, answers=['2', f"Patient {patient()}"]),
+        'patient_bills': lambda i: scripted(hospital.patient_bills, conn, patient(), answers=['2']),
+        'my_appointments': lambda i: scripted(hospital.my_appointments, conn, doctor(), answers=['3', '9']),
+        'accept_leave': lambda i: scripted(hospital.accept_leave, conn, answers=[str(leaves[i % len(leaves)])]),
+        'medicine_search': lambda i: hospital.medicine_index.search(
+            DRUG_STEMS[i % len(DRUG_STEMS)][:2 + i % 4]),
+    }
+
+    results = []
+    for name, operation in operations.items():
+        count = min(ops, len(leaves)) if name == 'accept_leave' else ops
+        result = measure(operation, count)
+        result.update(operation=name, rows=rows)
+        results.append(result)
+        print(f"{rows:>10} | {name:<28} | {result['ops_per_sec']:>10.1f} | "
+              f"{result['p50_ms']:>8.3f} | {result['p95_ms']:>8.3f} | {result['p99_ms']:>8.3f}")
+    conn.close()
+    return results
+
+
+def suite(sizes, ops, data_dir, output):
+    os.makedirs(data_dir, exist_ok=True)
+    print(f"{'Rows':>10} | {'Operation':<28} | {'Ops/s':>10} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    print("-" * 87)
+
+    results = []
+    for rows in sizes:
+        path = os.path.join(data_dir, f"bench_{rows}.db")
+        if not os.path.exists(path):
+            build_workload_database(path, rows)
+        # Work on a copy so accept_leave does not use up the cached database
+        work_path = path + ".run"
+        source, target = sqlite3.connect(path), sqlite3.connect(work_path)
+        source.backup(target)
+        source.close()
+        target.close()
+        try:
+            results.extend(run_suite(work_path, rows, ops))
+        finally:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(work_path + suffix):
+                    os.remove(work_path + suffix)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+    return report
+
+
+def _booker(path, seed, slots, patients, start, results):
+    """One contention worker: try to book every slot in `slots`, in random order."""
+    import services
+
+    conn = connect(path)
+    rng = random.Random(seed)
+    slots = list(slots)
+    rng.shuffle(slots)
+    counts = {'booked': 0, 'taken': 0, 'errors': 0}
+    start.wait()
+    for doctor_id, day, slot in slots:
+        try:
+            services.book_appointment(conn, rng.randrange(1, patients + 1), doctor_id, day, slot)
+            counts['booked'] += 1
+        except services.ServiceError:
+            counts['taken'] += 1
+        except sqlite3.Error:
+            counts['errors'] += 1
+    conn.close()
+    results.put(counts)
+
+
+def contention(bookers=64, doctors=5, days=3, patients=1000):
+    """
+    Start `bookers` processes that all race for the same doctors' slots over
+    the next `days` days, then check that no slot was sold twice.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "contention.db")
+        build_database(path, doctors, patients)
+        today = date.today()
+        slots = [(doctor_id, (today + timedelta(days=d)).isoformat(), slot)
+                 for doctor_id in range(1, doctors + 1) for d in range(1, days + 1) for slot in ALL_SLOTS]
+
+        start, results = multiprocessing.Event(), multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_booker, args=(path, i, slots, patients, start, results))
+                     for i in range(bookers)]
+        for process in processes:
+            process.start()
+        began = time.perf_counter()
+        start.set()
+        counts = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - began
+        for process in processes:
+            process.join()
+
+        conn = sqlite3.connect(path)
+        appointments = conn.execute("SELECT COUNT(*) FROM Appointment").fetchone()[0]
+        bills = conn.execute("SELECT COUNT(*) FROM Bill").fetchone()[0]
+        double_booked = conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM Appointment GROUP BY DoctorID, Date, Time HAVING COUNT(*) > 1
+            )
+        """).fetchone()[0]
+        conn.close()
+
+    booked = sum(c['booked'] for c in counts)
+    attempts = booked + sum(c['taken'] + c['errors'] for c in counts)
+    result = {
+        'bookers': bookers,
+        'slots': len(slots),
+        'attempts': attempts,
+        'booked': booked,
+        'rejected': sum(c['taken'] for c in counts),
+        'errors': sum(c['errors'] for c in counts),
+        'appointments': appointments,
+        'bills': bills,
+        'double_booked': double_booked,
+        'seconds': elapsed,
+        'attempts_per_sec': attempts / elapsed if elapsed else 0,
+    }
+    print(f"{bookers} bookers raced for {len(slots)} slots: {attempts} attempts in {elapsed:.2f}s "
+          f"({result['attempts_per_sec']:,.0f}/s)")
+    print(f"Booked {booked}, rejected {result['rejected']}, errors {result['errors']}; "
+          f"{appointments} appointments, {bills} bills, {double_booked} double-booked slots")
+    ok = double_booked == 0 and booked == appointments == bills == len(slots) and not result['errors']
+    print("OK" if ok else "FAILED")
+    return result
+
+
+def login_throughput(scheme, costs, logins=200, threads=8, users=100):
+    """
+    Logins per second at each KDF cost, verifying inline in the calling
+    threads and through the credentials process pool.
+    """
+    import credentials
+
+    print(f"{'Scheme':<14} | {'Cost':>8} | {'Mode':<6} | {'Logins/s':>9} | {'ms/login':>9}")
+    print("-" * 58)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for cost in costs:
+            path = os.path.join(tmp, f"logins_{cost}.db")
+            conn = connect(path)
+            migrate(conn)
+            stored = credentials.hash_password("secret", scheme, cost)
+            conn.execute("BEGIN")
+            conn.executemany("INSERT INTO LoginCredits (Password, UserType) VALUES (?, 'Patient')",
+                             [(stored,)] * users)
+            conn.execute("COMMIT")
+            conn.close()
+
+            local = threading.local()
+
+            def login(i, inline):
+                if not hasattr(local, 'conn'):
+                    local.conn = connect(path)
+                assert credentials.authenticate(local.conn, 1 + i % users, "secret", 'Patient',
+                                                upgrade=False, inline=inline)
+
+            for mode in ('inline', 'pool'):
+                with ThreadPoolExecutor(threads) as executor:
+                    list(executor.map(login, range(threads), [mode == 'inline'] * threads))  # warm up
+                    start = time.perf_counter()
+                    list(executor.map(login, range(logins), [mode == 'inline'] * logins))
+                    elapsed = time.perf_counter() - start
+                result = {'scheme': scheme, 'cost': cost, 'mode': mode, 'threads': threads,
+                          'logins_per_sec': logins / elapsed, 'ms_per_login': elapsed / logins * 1000}
+                results.append(result)
+                print(f"{scheme:<14} | {cost:>8} | {mode:<6} | {result['logins_per_sec']:>9.1f} | "
+                      f"{result['ms_per_login']:>9.2f}")
+    credentials.shutdown()
+    print(f"({threads} login threads, {credentials.VERIFY_WORKERS} verification processes)")
+    return results
+
+
+# Run in a fresh interpreter: prints the seconds spent importing the app
+_IMPORT_PROBE = "import time; t = time.perf_counter(); import Hospital_Database; print(time.perf_counter() - t)"
+
+
+def startup(runs=20):
+    """
+    What starting the app costs: importing Hospital_Database in a fresh
+    interpreter (which must not touch the disk or print), and bringing an
+    up-to-date database through init_schema() compared with migrate().
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get('PYTHONPATH')])))
+    with tempfile.TemporaryDirectory() as tmp:
+        import_times, side_effects = [], []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], cwd=tmp, env=env,
+                                 capture_output=True, text=True, check=True).stdout.splitlines()
+            import_times.append(float(out[-1]))
+            side_effects += out[:-1] + os.listdir(tmp)
+
+        path = os.path.join(tmp, "startup.db")
+        conn = connect(path)
+        migrate(conn)
+        conn.close()
+        schema_times = {}
+        for name, step in (('migrate', migrate), ('init_schema', init_schema)):
+            times = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                conn = connect(path)
+                step(conn)
+                conn.close()
+                times.append(time.perf_counter() - start)
+            schema_times[name] = times
+
+    result = {'runs': runs, 'import_ms': statistics.median(import_times) * 1000,
+              'side_effects': sorted(set(side_effects)),
+              **{f'{name}_ms': statistics.median(times) * 1000 for name, times in schema_times.items()}}
+    print(f"Import Hospital_Database: {result['import_ms']:.1f} ms (median of {runs} fresh interpreters)")
+    print(f"Open a current database + migrate():     {result['migrate_ms']:.2f} ms")
+    print(f"Open a current database + init_schema(): {result['init_schema_ms']:.2f} ms")
+    if result['side_effects']:
+        print(f"Import was not side-effect free: {result['side_effects']}")
+    print("OK" if not result['side_effects'] else "FAILED")
+    return result
+
+
+def compare(baseline_path, current_path):
+    with open(baseline_path) as f:
+        baseline = {(r['rows'], r['operation']): r for r in json.load(f)['results']}
+    with open(current_path) as f:
+        current = json.load(f)['results']
+
+    print(f"{'Rows':>10} | {'Operation':<28} | {'Ops/s before':>12} | {'Ops/s after':>12} | {'Change':>8} | {'p99 change':>10}")
+    print("-" * 97)
+    for result in current:
+        before = baseline.get((result['rows'], result['operation']))
+        if not before:
+            continue
+        change = (result['ops_per_sec'] / before['ops_per_sec'] - 1) * 100 if before['ops_per_sec'] else 0
+        p99 = (result['p99_ms'] / before['p99_ms'] - 1) * 100 if before['p99_ms'] else 0
+        print(f"{result['rows']:>10} | {result['operation']:<28} | {before['ops_per_sec']:>12.1f} | "
+              f"{result['ops_per_sec']:>12.1f} | {change:>+7.1f}% | {p99:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hospital database benchmarks")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    profiles = sub.add_parser('profiles', help="compare connection PRAGMA profiles")
+    profiles.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                          help="profile to run (repeatable, default: all)")
+    profiles.add_argument('--readers', type=int, default=4)
+    profiles.add_argument('--seconds', type=float, default=3.0)
+
+    suite_parser = sub.add_parser('suite', help="per-operation benchmarks of the hospital workflows")
+    suite_parser.add_argument('--rows', type=int, action='append',
+                              help="table size to test (repeatable, e.g. 10000 1000000 10000000; default: 10000)")
+    suite_parser.add_argument('--ops', type=int, default=1000, help="operations per benchmark")
+    suite_parser.add_argument('--data-dir', default='bench_data',
+                              help="where generated databases are kept for reuse")
+    suite_parser.add_argument('--output', default='benchmark_results.json')
+
+    compare_parser = sub.add_parser('compare', help="compare two saved suite runs")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+
+    contention_parser = sub.add_parser('contention', help="race many booking processes for the same slots")
+    contention_parser.add_argument('--bookers', type=int, default=64)
+    contention_parser.add_argument('--doctors', type=int, default=5)
+    contention_parser.add_argument('--days', type=int, default=3)
+
+    logins_parser = sub.add_parser('logins', help="login throughput against password hashing cost")
+    logins_parser.add_argument('--scheme', choices=['scrypt', 'pbkdf2_sha256'], default='scrypt')
+    logins_parser.add_argument('--cost', type=int, action='append',
+                               help="scrypt n or PBKDF2 iterations (repeatable; default: a range around the policy)")
+    logins_parser.add_argument('--logins', type=int, default=200)
+    logins_parser.add_argument('--threads', type=int, default=8, help="concurrent login requests")
+
+    startup_parser = sub.add_parser('startup', help="import time and schema check cost at startup")
+    startup_parser.add_argument('--runs', type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == 'profiles':
+        compare_profiles(args.profile or sorted(PROFILES), args.readers, args.seconds)
+    elif args.command == 'suite':
+        suite(args.rows or [10000], args.ops, args.data_dir, args.output)
+    elif args.command == 'contention':
+        return 0 if contention(args.bookers, args.doctors, args.days)['double_booked'] == 0 else 1
+    elif args.command == 'logins':
+        default_costs = [2 ** 12, 2 ** 14, 2 ** 15] if args.scheme == 'scrypt' else [100000, 300000, 600000]
+        login_throughput(args.scheme, args.cost or default_costs, args.logins, args.threads)
+    elif args.command == 'startup':
+        return 0 if not startup(args.runs)['side_effects'] else 1
+    elif args.command == 'compare':
+        compare(args.baseline, args.current)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
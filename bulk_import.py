@@ -0,0 +1,175 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from connection import DB_PATH, connect
+from data_access import execute_many_built
+from dates import to_iso
+from migrations import init_schema
+from transactions import transaction
+
+# Columns accepted for each table and the type every value is normalized to
+TABLES = {
+    'Patient': {
+        'Name': str, 'DOB': 'date', 'Weight': float, 'Height': float, 'Gender': str,
+        'PhoneNo': str, 'EmailID': str, 'Address': str, 'MedicalHistory': str,
+    },
+    'Doctor': {
+        'Name': str, 'DOB': 'date', 'Gender': str, 'Specialization': str, 'PhoneNo': str,
+        'EmailID': str, 'Address': str, 'AppointmentCost': int, 'YearsOfExperience': int,
+        'WorkStatus': str,
+    },
+    'Medicine': {
+        'Name': str, 'Cost': float, 'Use': str,
+    },
+    'Room': {
+        'RoomType': str, 'AvailabilityStatus': str, 'Cost': float,
+    },
+}
+
+REQUIRED = {
+    'Patient': ['Name'],
+    'Doctor': ['Name', 'Specialization'],
+    'Medicine': ['Name', 'Cost'],
+    'Room': ['RoomType', 'Cost'],
+}
+
+DEFAULTS = {
+    'Doctor': {'WorkStatus': 'Active'},
+    'Room': {'AvailabilityStatus': 'Available'},
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+def parse_date(value):
+    try:
+        return to_iso(value)
+    except ValueError as e:
+        raise RowError(str(e))
+
+
+def _read_jsonl(lines):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, RowError(f"invalid JSON: {e}")
+            continue
+        yield number, row if isinstance(row, dict) else RowError("each line must be a JSON object")
+
+
+def read_rows(path):
+    """
+    Yield (number, record) for each record of a .csv or .jsonl file (or '-'
+    for JSONL on stdin): the data row number for CSV, the line number for
+    JSONL. A JSONL line that is not a JSON object is yielded as a RowError.
+    """
+    if path == '-':
+        yield from _read_jsonl(sys.stdin)
+    elif path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from enumerate(csv.DictReader(f), 1)
+    else:
+        with open(path, encoding='utf-8') as f:
+            yield from _read_jsonl(f)
+
+
+def normalize_rows(table, rows, errors):
+    """
+    Validate and normalize each (number, record) into a tuple in column order.
+    Rejected rows are recorded in `errors` as (number, message).
+    """
+    columns = TABLES[table]
+    defaults = DEFAULTS.get(table, {})
+    for number, row in rows:
+        try:
+            if isinstance(row, RowError):
+                raise row
+            values = []
+            for column, kind in columns.items():
+                value = row.get(column)
+                if isinstance(value, str):
+                    value = value.strip()
+                if value in (None, ''):
+                    if column in REQUIRED[table]:
+                        raise RowError(f"missing {column}")
+                    values.append(defaults.get(column))
+                elif kind == 'date':
+                    values.append(parse_date(str(value)))
+                else:
+                    try:
+                        values.append(kind(value))
+                    except (TypeError, ValueError):
+                        raise RowError(f"invalid {column} {value!r}")
+            yield tuple(values)
+        except RowError as e:
+            errors.append((number, str(e)))
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_rows(conn, table, rows, batch_size=5000, report_every=50000, out=sys.stdout):
+    """
+    Stream (number, record) pairs from read_rows() into `table` with one
+    executemany per chunk, each chunk in its own transaction.
+    Returns (inserted, errors, seconds).
+    """
+    columns = tuple(TABLES[table])
+    errors = []
+    inserted = 0
+    next_report = report_every
+    start = time.perf_counter()
+
+    for chunk in chunked(normalize_rows(table, rows, errors), batch_size):
+        with transaction(conn, immediate=False):
+            execute_many_built(conn, 'bulk_insert', (table, columns), chunk)
+        inserted += len(chunk)
+        if out and inserted >= next_report:
+            elapsed = time.perf_counter() - start
+            print(f"{table}: {inserted} rows, {inserted / elapsed:,.0f} rows/s", file=out)
+            next_report += report_every
+
+    return inserted, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load CSV/JSONL files into the hospital database")
+    parser.add_argument('table', choices=sorted(TABLES))
+    parser.add_argument('path', help=".csv or .jsonl file, or '-' for JSONL on stdin")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--report-every', type=int, default=50000)
+    args = parser.parse_args()
+
+    conn = connect(args.db, 'bulk')
+    init_schema(conn)
+    inserted, errors, seconds = import_rows(conn, args.table, read_rows(args.path),
+                                            args.batch_size, args.report_every)
+    conn.close()
+
+    for number, message in errors[:20]:
+        print(f"Row {number} rejected: {message}")
+    if len(errors) > 20:
+        print(f"... and {len(errors) - 20} more rejected rows")
+    rate = inserted / seconds if seconds else 0
+    print(f"Imported {inserted} {args.table} rows in {seconds:.2f}s ({rate:,.0f} rows/s), "
+          f"{len(errors)} rejected.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import re
+import threading
+from bisect import bisect_left
+
+from data_access import fetch_data
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _words(text):
+    return _WORD.findall((text or "").casefold())
+
+
+class MedicineIndex:
+    """
+    In-memory type-ahead index over the Medicine catalog.
+
+    Three sorted key lists are searched in turn, each with one bisect and a
+    scan that stops after k results:
+      1. the whole name          ("paracetamol 500mg")
+      2. later words of the name ("500mg")
+      3. words of the use        ("fever", "relief")
+    so names starting with the query rank first, alphabetically. Extra query
+    words must each prefix some word of the medicine's name or use.
+
+    The index is rebuilt when CatalogVersion shows the Medicine table changed,
+    which triggers keep current for every writer, including other processes.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.medicines = {}
+        self._words = {}
+        self._tiers = ()
+        self._lock = threading.Lock()
+
+    def load(self, conn):
+        version = self._current_version(conn)
+        rows = fetch_data(conn, 'all_medicines')
+        medicines, words, tiers = {}, {}, ([], [], [])
+        for medicine_id, name, cost, use in rows:
+            medicines[medicine_id] = (name, cost, use)
+            name_words, use_words = _words(name), _words(use)
+            words[medicine_id] = tuple(name_words + use_words)
+            if name_words:
+                tiers[0].append((" ".join(name_words), medicine_id))
+            tiers[1].extend((word, medicine_id) for word in name_words[1:])
+            tiers[2].extend((word, medicine_id) for word in use_words)
+
+        built = []
+        for entries in tiers:
+            entries.sort()
+            built.append(([key for key, _ in entries], [mid for _, mid in entries]))
+        with self._lock:
+            self.medicines, self._words, self._tiers, self.version = medicines, words, tuple(built), version
+
+    @staticmethod
+    def _current_version(conn):
+        row = fetch_data(conn, 'catalog_version', ('Medicine',))
+        return row[0][0] if row else None
+
+    def ensure_current(self, conn):
+        """Reload if the catalog changed since the last load (one primary-key lookup)."""
+        if self.version is None or self._current_version(conn) != self.version:
+            self.load(conn)
+
+    def get(self, medicine_id):
+        """(name, cost, use) for a MedicineID, or None."""
+        try:
+            return self.medicines.get(int(medicine_id))
+        except (TypeError, ValueError):
+            return None
+
+    def search(self, text, k=10):
+        """Top-k (MedicineID, name, cost, use) matches for a typed prefix."""
+        query = _words(text)
+        if not query:
+            return []
+        first, rest = query[0], query[1:]
+        with self._lock:
+            tiers, words, medicines = self._tiers, self._words, self.medicines
+
+        found, seen = [], set()
+        for keys, ids in tiers:
+            i = bisect_left(keys, first)
+            while i < len(keys) and keys[i].startswith(first):
+                medicine_id = ids[i]
+                i += 1
+                if medicine_id in seen:
+                    continue
+                if rest and not all(any(w.startswith(t) for w in words[medicine_id]) for t in rest):
+                    continue
+                seen.add(medicine_id)
+                found.append((medicine_id, *medicines[medicine_id]))
+                if len(found) == k:
+                    return found
+        return found
+
+
+medicine_index = MedicineIndex()
@@ -0,0 +1,134 @@
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import instrumentation
+
+DB_PATH = 'Hospital_Database.db'
+
+# PRAGMA settings applied to every new connection, by profile name.
+#   legacy  - SQLite defaults (rollback journal), what the app used before
+#   wal     - concurrent front-desk terminals: readers never block the writer
+#   bulk    - one-off data loads where a crash just means re-running the load
+PROFILES = {
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 0,
+    },
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,        # 64 MB
+        'mmap_size': 268435456,      # 256 MB
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+    'bulk': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -256000,       # 256 MB
+        'mmap_size': 1073741824,     # 1 GB
+        'busy_timeout': 30000,
+        'temp_store': 'MEMORY',
+    },
+}
+
+DEFAULT_PROFILE = 'wal'
+
+# Size of each connection's prepared-statement cache; must stay above the
+# number of queries registered in data_access.QUERIES plus the variants its
+# builders make
+CACHED_STATEMENTS = 256
+
+
+def apply_profile(conn, profile=DEFAULT_PROFILE):
+    for pragma, value in PROFILES[profile].items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+class HospitalConnection(sqlite3.Connection):
+    """
+    Connection in autocommit mode: a statement run on its own commits by
+    itself, and related statements are grouped with transactions.transaction().
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.isolation_level = None
+        self.unit_of_work_depth = 0
+        # SQL texts in sqlite3's statement cache, least recently used first
+        # (data_access mirrors the cache to count preparations)
+        self.prepared_statements = OrderedDict()
+
+
+def connect(path=DB_PATH, profile=DEFAULT_PROFILE):
+    """Open a connection to the hospital database with a PRAGMA profile applied."""
+    conn = sqlite3.connect(path, check_same_thread=False, factory=HospitalConnection,
+                           cached_statements=CACHED_STATEMENTS)
+    if instrumentation.TRACE:
+        instrumentation.sql_metrics.instrument(conn)
+    return apply_profile(conn, profile)
+
+
+class ConnectionPool:
+    """
+    A fixed-size pool of tuned connections. Connections are opened lazily and
+    handed back out most-recently-used first so their page caches stay warm.
+    """
+
+    def __init__(self, path=DB_PATH, profile=DEFAULT_PROFILE, size=5):
+        self.path = path
+        self.profile = profile
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._all = []
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                conn = connect(self.path, self.profile)
+                self._all.append(conn)
+                return conn
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        for conn in self._all:
+            conn.close()
+        self._all = []
+        self._opened = 0
+        self._idle = queue.LifoQueue()
+
+
+_pool = None
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool()
+    return _pool
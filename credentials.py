@@ -0,0 +1,162 @@
+import atexit
+import base64
+import hashlib
+import hmac
+import os
+import threading
+
+from data_access import execute_query, fetch_data
+
+# Stored password format: scheme$param$...$salt$hash (salt and hash base64).
+# Anything else in LoginCredits.Password is a legacy plaintext password and
+# is replaced with a hash the next time its owner logs in.
+SCRYPT = 'scrypt'
+PBKDF2 = 'pbkdf2_sha256'
+
+SCRYPT_COST = 2 ** 14        # n; r=8 makes this 16 MiB per hash
+SCRYPT_BLOCK_SIZE = 8
+SCRYPT_PARALLELISM = 1
+PBKDF2_ITERATIONS = 600000
+SALT_BYTES = 16
+
+# scrypt needs OpenSSL 1.1+; fall back to PBKDF2 where it is missing
+DEFAULT_SCHEME = SCRYPT if hasattr(hashlib, 'scrypt') else PBKDF2
+
+# Verification runs in worker processes so concurrent logins use every core
+# instead of queueing behind one interpreter.
+VERIFY_WORKERS = os.cpu_count() or 1
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _derive(scheme, password, salt, params):
+    if scheme == SCRYPT:
+        n, r, p = params
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
+    (iterations,) = params
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+
+
+def hash_password(password, scheme=DEFAULT_SCHEME, cost=None):
+    """
+    Salted hash of `password` in the stored format. `cost` is scrypt's n or
+    the PBKDF2 iteration count (default: the current policy).
+    """
+    salt = os.urandom(SALT_BYTES)
+    if scheme == SCRYPT:
+        params = (cost or SCRYPT_COST, SCRYPT_BLOCK_SIZE, SCRYPT_PARALLELISM)
+    elif scheme == PBKDF2:
+        params = (cost or PBKDF2_ITERATIONS,)
+    else:
+        raise ValueError(f"unknown password scheme {scheme!r}")
+    digest = _derive(scheme, password, salt, params)
+    return "$".join([scheme, *map(str, params), _b64(salt), _b64(digest)])
+
+
+def _parse(stored):
+    """(scheme, params, salt, digest), or None for a legacy plaintext password."""
+    parts = (stored or "").split("$")
+    try:
+        if parts[0] == SCRYPT and len(parts) == 6:
+            params = tuple(int(x) for x in parts[1:4])
+        elif parts[0] == PBKDF2 and len(parts) == 4:
+            params = (int(parts[1]),)
+        else:
+            return None
+        return parts[0], params, base64.b64decode(parts[-2]), base64.b64decode(parts[-1])
+    except ValueError:
+        return None
+
+
+def verify_password(password, stored):
+    """Constant-time check of `password` against a stored hash or legacy plaintext."""
+    if stored is None:
+        return False
+    parsed = _parse(stored)
+    if parsed is None:
+        return hmac.compare_digest(password.encode(), stored.encode())
+    scheme, params, salt, digest = parsed
+    return hmac.compare_digest(_derive(scheme, password, salt, params), digest)
+
+
+def needs_upgrade(stored):
+    """True for plaintext rows and hashes made under an older cost policy."""
+    parsed = _parse(stored)
+    if parsed is None:
+        return True
+    scheme, params, _, _ = parsed
+    if scheme != DEFAULT_SCHEME:
+        return True
+    if scheme == SCRYPT:
+        return params != (SCRYPT_COST, SCRYPT_BLOCK_SIZE, SCRYPT_PARALLELISM)
+    return params[0] < PBKDF2_ITERATIONS
+
+
+# Verified when the UserID does not exist, so unknown and known users take
+# the same time to reject
+_DUMMY_HASH = None
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Imported here: multiprocessing is a large import most runs never need
+            from concurrent.futures import ProcessPoolExecutor
+            _executor = ProcessPoolExecutor(max_workers=VERIFY_WORKERS)
+            atexit.register(_executor.shutdown)
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def authenticate(conn, user_id, password, user_type, upgrade=True, inline=False):
+    """
+    Check a login. The KDF runs in the verification process pool (or in this
+    thread with inline=True); a correct legacy or outdated password is
+    re-hashed and stored. Returns True if the credentials are valid.
+    """
+    global _DUMMY_HASH
+    row = fetch_data(conn, 'login', (user_id, user_type))
+    if row:
+        stored = row[0][1]
+    else:
+        if _DUMMY_HASH is None:
+            _DUMMY_HASH = hash_password("")
+        stored = _DUMMY_HASH
+
+    if inline:
+        valid = verify_password(password, stored)
+    else:
+        valid = get_executor().submit(verify_password, password, stored).result()
+    if not (valid and row):
+        return False
+
+    if upgrade and needs_upgrade(stored):
+        new_hash = hash_password(password) if inline else get_executor().submit(hash_password, password).result()
+        execute_query(conn, 'update_password', (new_hash, user_id))
+    return True
+
+
+def set_password(conn, user_id, password):
+    execute_query(conn, 'update_password', (hash_password(password), user_id))
+
+
+def password_status(stored):
+    """Short description of how a password is stored, for admin listings."""
+    parsed = _parse(stored)
+    if parsed is None:
+        return "plaintext (upgraded at next login)"
+    scheme, params, _, _ = parsed
+    return f"{scheme}, cost {params[0]}" + (" (outdated)" if needs_upgrade(stored) else "")
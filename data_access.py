@@ -0,0 +1,462 @@
+import threading
+import time
+from functools import lru_cache
+
+from connection import CACHED_STATEMENTS
+from dates import age_sql, day_number_sql
+from instrumentation import sql_metrics, timed
+
+# Every statement the application runs, by name. Keeping the SQL text fixed
+# (values always passed as parameters) means each one is prepared once per
+# connection and then served from sqlite3's statement cache. Statements whose
+# shape depends on the caller are made by the builders further down.
+QUERIES = {
+    # Login and accounts
+    # Password holds a salted hash (see credentials.py), checked in Python
+    'login': "SELECT UserID, Password FROM LoginCredits WHERE UserID = ? AND UserType = ?",
+    'insert_credentials': "INSERT INTO LoginCredits (Password, UserType) VALUES (?, ?)",
+    'insert_admin_credentials': "INSERT INTO LoginCredits (Password) VALUES (?)",
+    'update_password': "UPDATE LoginCredits SET Password = ? WHERE UserID = ?",
+
+    # Doctors
+    'specializations': "SELECT DISTINCT Specialization FROM Doctor",
+    'doctor_by_id': f"SELECT *, {age_sql('DOB')} AS Age FROM Doctor WHERE DoctorID = ?",
+    'doctor_name': "SELECT Name FROM Doctor WHERE DoctorID = ?",
+    'doctor_has_patient': "SELECT 1 FROM Treatment WHERE DoctorID = ?1 AND PatientID = ?2 "
+                          "UNION ALL SELECT 1 FROM Appointment WHERE DoctorID = ?1 AND PatientID = ?2 LIMIT 1",
+    'active_doctors': "SELECT DoctorID, Name, Specialization FROM Doctor WHERE WorkStatus = 'Active' ORDER BY Specialization",
+    'active_specializations': "SELECT DISTINCT Specialization FROM Doctor WHERE WorkStatus = 'Active'",
+    'active_doctors_by_specialization': """
+        SELECT DoctorID, Name, YearsOfExperience, AppointmentCost
+        FROM Doctor
+        WHERE Specialization = ? AND WorkStatus = 'Active'
+        ORDER BY Name
+    """,
+    'active_doctor_in_specialization': """
+        SELECT DoctorID, AppointmentCost FROM Doctor
+        WHERE DoctorID = ? AND Specialization = ? AND WorkStatus = 'Active'
+    """,
+    'active_doctor_cost': """
+        SELECT DoctorID, AppointmentCost FROM Doctor
+        WHERE DoctorID = ? AND WorkStatus = 'Active'
+    """,
+    'active_doctor_by_id': """
+        SELECT DoctorID, Name, Specialization, YearsOfExperience, AppointmentCost
+        FROM Doctor
+        WHERE DoctorID = ? AND WorkStatus = 'Active'
+    """,
+    'active_doctors_by_name': """
+        SELECT DoctorID, Name, Specialization, YearsOfExperience, AppointmentCost
+        FROM Doctor
+        WHERE Name LIKE ? AND WorkStatus = 'Active'
+    """,
+    'insert_doctor': """
+        INSERT INTO Doctor (Name, DOB, Gender, Specialization, PhoneNo, EmailID, Address, YearsOfExperience, WorkStatus)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+
+    # Patients
+    'patient_by_id': f"SELECT *, {age_sql('DOB')} AS Age FROM Patient WHERE PatientID = ?",
+    'insert_patient': """
+        INSERT INTO Patient (Name, DOB, Weight, Height, Gender, PhoneNo, EmailID, Address, MedicalHistory)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    'insert_patient_with_id': """
+        INSERT INTO Patient (PatientID, Name, DOB, Weight, Height, Gender, PhoneNo, EmailID, Address, MedicalHistory)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    'doctor_patients': """
+        SELECT DISTINCT p.*
+        FROM Patient p
+        JOIN Treatment t ON p.PatientID = t.PatientID
+        WHERE t.DoctorID = ?
+    """,
+
+    # Appointments
+    'doctor_appointments': f"""
+        SELECT a.AppointmentID, a.PatientID, a.Date, a.Time, p.Name, p.DOB, p.Gender, {age_sql('p.DOB')}
+        FROM Appointment a
+        JOIN Patient p ON a.PatientID = p.PatientID
+        WHERE a.DoctorID = ?
+        ORDER BY a.Date, a.Time
+    """,
+    'patient_appointments': """
+        SELECT a.*, d.Name as DoctorName
+        FROM Appointment a
+        JOIN Doctor d ON a.DoctorID = d.DoctorID
+        WHERE a.PatientID = ?
+        ORDER BY a.Date, a.Time
+    """,
+    # The slot index: every booked slot of one doctor over a range of days
+    'doctor_booked_slots': "SELECT Date, Time FROM Appointment WHERE DoctorID = ? AND Date BETWEEN ? AND ?",
+    'appointment_for_doctor': "SELECT * FROM Appointment WHERE AppointmentID = ? AND DoctorID = ?",
+    'insert_appointment': """
+        INSERT INTO Appointment (PatientID, DoctorID, Date, Time, Purpose)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    'delete_appointment': "DELETE FROM Appointment WHERE AppointmentID = ?",
+
+    # Treatments
+    'treatment_for_doctor': "SELECT * FROM Treatment WHERE TreatmentID = ? AND DoctorID = ?",
+    'insert_treatment': """
+        INSERT INTO Treatment (PatientID, DoctorID, Diagnosis, Medicines, TreatmentPlan, StartDate, EndDate)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+
+    # Bills
+    'insert_bill': """
+        INSERT INTO Bill (PatientID, BillType, Amount, Date, PaymentStatus)
+        VALUES (?, ?, ?, ?, 'Pending')
+    """,
+    'patient_bills': "SELECT BillID, Amount, BillType, Date, PaymentStatus FROM Bill WHERE PatientID = ?",
+    'unpaid_bills': "SELECT BillID, Amount, BillType, Date FROM Bill WHERE PatientID = ? AND PaymentStatus = 'Pending'",
+    'pending_bill_amount': "SELECT Amount FROM Bill WHERE BillID = ? AND PatientID = ? AND PaymentStatus = 'Pending'",
+    'pay_bill': "UPDATE Bill SET PaymentStatus = 'Paid' WHERE BillID = ?",
+    'patient_balance': """
+        SELECT Outstanding, PendingCount, OldestPending, LastPayment
+        FROM PatientBalance WHERE PatientID = ?
+    """,
+
+    # Rooms (stays are half-open date intervals, CheckIn <= night < CheckOut)
+    'all_rooms': "SELECT RoomID, RoomType, Cost FROM Room ORDER BY RoomType, RoomID",
+    'active_room_stays': """
+        SELECT RoomID, CheckIn, CheckOut, StayID FROM RoomStay
+        WHERE Status = 'Active' AND CheckOut > ?
+    """,
+    'room_stay_overlap': """
+        SELECT StayID FROM RoomStay
+        WHERE RoomID = ? AND Status = 'Active' AND CheckIn < ? AND CheckOut > ?
+        LIMIT 1
+    """,
+    'insert_room_stay': """
+        INSERT INTO RoomStay (RoomID, PatientID, CheckIn, CheckOut, BillID)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    'room_stay_by_id': "SELECT StayID, RoomID, PatientID, CheckIn, CheckOut, Status FROM RoomStay WHERE StayID = ?",
+    'patient_room_stays': """
+        SELECT s.StayID, s.RoomID, r.RoomType, s.CheckIn, s.CheckOut
+        FROM RoomStay s
+        JOIN Room r ON r.RoomID = s.RoomID
+        WHERE s.PatientID = ? AND s.Status = 'Active'
+        ORDER BY s.CheckIn
+    """,
+    'end_room_stay': "UPDATE RoomStay SET Status = ?, CheckOut = ? WHERE StayID = ? AND Status = 'Active'",
+    'set_room_status': "UPDATE Room SET AvailabilityStatus = ? WHERE RoomID = ?",
+    # Set-based refresh of every room's status for the night of ?
+    'sync_room_status': """
+        UPDATE Room SET AvailabilityStatus = CASE WHEN EXISTS (
+            SELECT 1 FROM RoomStay s
+            WHERE s.RoomID = Room.RoomID AND s.Status = 'Active' AND s.CheckIn <= ?1 AND s.CheckOut > ?1
+        ) THEN 'Occupied' ELSE 'Available' END
+    """,
+
+    'end_past_room_stays': "UPDATE RoomStay SET Status = 'Discharged' WHERE Status = 'Active' AND CheckOut <= ?",
+
+    # Medicines
+    'medicine_by_id': "SELECT Name, Cost, Use FROM Medicine WHERE MedicineID = ?",
+    'all_medicines': "SELECT MedicineID, Name, Cost, Use FROM Medicine",
+    'medicine_prices': "SELECT MedicineID, Name, Cost FROM Medicine WHERE MedicineID = ?",
+    'insert_bill_item': """
+        INSERT INTO BillItem (BillID, MedicineID, Quantity, UnitPrice)
+        VALUES (?, ?, ?, ?)
+    """,
+    'bill_items': """
+        SELECT i.MedicineID, m.Name, i.Quantity, i.UnitPrice
+        FROM BillItem i
+        LEFT JOIN Medicine m ON m.MedicineID = i.MedicineID
+        WHERE i.BillID = ?
+        ORDER BY i.BillItemID
+    """,
+    'top_medicines': """
+        SELECT s.MedicineID, m.Name, s.UnitsSold, s.Revenue, s.Orders, s.LastSold
+        FROM MedicineSales s
+        LEFT JOIN Medicine m ON m.MedicineID = s.MedicineID
+        ORDER BY s.UnitsSold DESC, s.MedicineID
+        LIMIT ?
+    """,
+    'catalog_version': "SELECT Version FROM CatalogVersion WHERE Name = ?",
+
+    'archive_appointments': "INSERT INTO AppointmentArchive SELECT * FROM Appointment WHERE Date < ?",
+    'delete_archived_appointments': "DELETE FROM Appointment WHERE Date < ?",
+
+    # Summaries, rebuilt from the base tables by the scheduler
+    'recompute_patient_balance': """
+        INSERT INTO PatientBalance (PatientID, Outstanding, PendingCount, OldestPending)
+        SELECT PatientID,
+               ROUND(TOTAL(CASE WHEN PaymentStatus = 'Pending' THEN Amount END), 2),
+               COUNT(CASE WHEN PaymentStatus = 'Pending' THEN 1 END),
+               MIN(CASE WHEN PaymentStatus = 'Pending' THEN Date END)
+        FROM Bill WHERE PatientID IS NOT NULL GROUP BY PatientID
+        ON CONFLICT (PatientID) DO UPDATE SET
+            Outstanding = excluded.Outstanding,
+            PendingCount = excluded.PendingCount,
+            OldestPending = excluded.OldestPending
+        WHERE Outstanding IS NOT excluded.Outstanding OR PendingCount IS NOT excluded.PendingCount
+           OR OldestPending IS NOT excluded.OldestPending
+    """,
+    'clear_medicine_sales': "DELETE FROM MedicineSales",
+    'recompute_medicine_sales': """
+        INSERT INTO MedicineSales (MedicineID, UnitsSold, Revenue, Orders, LastSold)
+        SELECT i.MedicineID, SUM(i.Quantity), ROUND(TOTAL(i.Quantity * i.UnitPrice), 2), COUNT(*), MAX(b.Date)
+        FROM BillItem i
+        LEFT JOIN Bill b ON b.BillID = i.BillID
+        GROUP BY i.MedicineID
+    """,
+
+    # Reports: whole-table reads, optionally limited to dates ?1 to ?2
+    'report_bill_types': """
+        SELECT DISTINCT BillType FROM Bill
+        WHERE BillType IS NOT NULL AND (?1 IS NULL OR Date >= ?1) AND (?2 IS NULL OR Date <= ?2)
+    """,
+    'report_appointments': f"""
+        SELECT COALESCE(DoctorID, 0), {day_number_sql('Date')} FROM Appointment
+        WHERE (?1 IS NULL OR Date >= ?1) AND (?2 IS NULL OR Date <= ?2)
+        UNION ALL
+        SELECT COALESCE(DoctorID, 0), {day_number_sql('Date')} FROM AppointmentArchive
+        WHERE (?1 IS NULL OR Date >= ?1) AND (?2 IS NULL OR Date <= ?2)
+    """,
+    'report_treatments': """
+        SELECT COALESCE(DoctorID, 0) FROM Treatment
+        WHERE (?1 IS NULL OR StartDate >= ?1) AND (?2 IS NULL OR StartDate <= ?2)
+    """,
+    'report_doctors': "SELECT DoctorID, Name, COALESCE(AppointmentCost, 0) FROM Doctor",
+
+    # Leaves
+    'insert_leave': """
+        INSERT INTO Leave (DoctorID, SelectDate, ReturnDate, NoOfDays, Reason, LeaveStatus)
+        VALUES (?, ?, ?, ?, ?, 'Pending')
+    """,
+    'pending_leaves': """
+        SELECT Leave.LeaveID, Doctor.Name, Leave.SelectDate, Leave.ReturnDate,
+               Leave.NoOfDays, Leave.Reason
+        FROM Leave
+        JOIN Doctor ON Leave.DoctorID = Doctor.DoctorID
+        WHERE Leave.LeaveStatus = 'Pending'
+        ORDER BY Leave.SelectDate
+    """,
+    'leave_by_id': "SELECT LeaveID, DoctorID, LeaveStatus, SelectDate, ReturnDate FROM Leave WHERE LeaveID = ?",
+    'accepted_leaves': """
+        SELECT DoctorID, SelectDate, ReturnDate FROM Leave
+        WHERE LeaveStatus = 'Accepted' AND SelectDate IS NOT NULL AND ReturnDate IS NOT NULL
+        ORDER BY DoctorID, SelectDate
+    """,
+    'expire_pending_leaves': "UPDATE Leave SET LeaveStatus = 'Expired' WHERE LeaveStatus = 'Pending' AND SelectDate <= ?",
+    # SelectDate <= ReturnDate, so the first bound only narrows the index range
+    'complete_leaves': """
+        UPDATE Leave SET LeaveStatus = 'Completed'
+        WHERE LeaveStatus = 'Accepted' AND SelectDate < ?1 AND ReturnDate < ?1
+    """,
+    'appointments_between': "SELECT COUNT(*) FROM Appointment WHERE DoctorID = ? AND Date BETWEEN ? AND ?",
+    'accept_leave': "UPDATE Leave SET LeaveStatus = 'Accepted' WHERE LeaveID = ?",
+    'reject_leave': "UPDATE Leave SET LeaveStatus = 'Rejected' WHERE LeaveID = ?",
+}
+
+# Menu-driven searches and edits pick a column from a fixed list; each
+# column gets its own named statement instead of an f-string at call time.
+DOCTOR_FIELDS = ['Name', 'DOB', 'Gender', 'Specialization', 'PhoneNo', 'EmailID', 'Address',
+                 'YearsOfExperience', 'WorkStatus']
+PATIENT_FIELDS = ['Name', 'DOB', 'Weight', 'Height', 'Gender', 'PhoneNo', 'EmailID', 'Address',
+                  'MedicalHistory']
+TREATMENT_FIELDS = ['Diagnosis', 'Medicines', 'TreatmentPlan', 'StartDate', 'EndDate']
+
+for _field in DOCTOR_FIELDS:
+    QUERIES[f'update_doctor_{_field}'] = f"UPDATE Doctor SET {_field} = ? WHERE DoctorID = ?"
+for _field in ['DoctorID'] + DOCTOR_FIELDS:
+    QUERIES[f'search_doctor_{_field}'] = f"SELECT * FROM Doctor WHERE {_field} LIKE ?"
+# Takes the bounds from dates.birth_date_range()
+QUERIES['search_doctor_Age'] = "SELECT * FROM Doctor WHERE DOB > ? AND DOB <= ?"
+for _field in PATIENT_FIELDS:
+    QUERIES[f'update_patient_{_field}'] = f"UPDATE Patient SET {_field} = ? WHERE PatientID = ?"
+for _field in ['PatientID'] + PATIENT_FIELDS:
+    QUERIES[f'search_patient_{_field}'] = f"SELECT * FROM Patient WHERE {_field} LIKE ?"
+for _field in TREATMENT_FIELDS:
+    QUERIES[f'update_treatment_{_field}'] = f"UPDATE Treatment SET {_field} = ? WHERE TreatmentID = ?"
+for _field in ['PatientID', 'TreatmentID']:
+    QUERIES[f'treatment_by_{_field}'] = f"SELECT * FROM Treatment WHERE {_field} = ?"
+del _field
+
+# Full-text search over each FTS5 index (see migration 3), best match first
+for _table, _key in [('Patient', 'PatientID'), ('Doctor', 'DoctorID'), ('Treatment', 'TreatmentID')]:
+    QUERIES[f'fulltext_{_table}'] = f"""
+        SELECT t.*
+        FROM {_table}Search
+        JOIN {_table} t ON t.{_key} = {_table}Search.rowid
+        WHERE {_table}Search MATCH ?
+        ORDER BY {_table}Search.rank
+        LIMIT ?
+    """
+del _table, _key
+
+# Statements assembled at run time from a fixed set of parts (keyset pages,
+# report columns, bulk inserts). A builder is registered by name and returns
+# the same SQL for the same arguments, so each variant is still prepared once
+# per connection; timings are kept under the builder's name.
+BUILDERS = {}
+
+
+def query_builder(name):
+    """Decorator registering a SQL builder under `name`; its results are memoized."""
+    def register(func):
+        BUILDERS[name] = lru_cache(maxsize=256)(func)
+        return func
+    return register
+
+
+@query_builder('report_bills')
+def _report_bills(type_count):
+    # Bill types are encoded to small integers by SQLite, so only numbers
+    # cross into Python: ?1 and ?2 are the dates, then a (type, code) pair each
+    case = " ".join(f"WHEN ?{3 + 2 * i} THEN ?{4 + 2 * i}" for i in range(type_count)) or "WHEN NULL THEN -1"
+    return f"""
+        SELECT CASE BillType {case} ELSE -1 END, COALESCE(Amount, 0), {day_number_sql('Date')},
+               COALESCE(PaymentStatus = 'Paid', 0)
+        FROM Bill
+        WHERE (?1 IS NULL OR Date >= ?1) AND (?2 IS NULL OR Date <= ?2)
+    """
+
+
+@query_builder('keyset_page')
+def _keyset_page(columns, from_clause, keys, where, conditions, direction):
+    # See paging.KeysetPager; parameters are the filter's, the conditions', then LIMIT
+    conditions = ([f"({where})"] if where else []) + list(conditions)
+    query = f"SELECT {', '.join(columns)}, {', '.join(keys)} FROM {from_clause}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY " + ", ".join(f"{key} {direction}" for key in keys)
+    return query + " LIMIT ?"
+
+
+@query_builder('bulk_insert')
+def _bulk_insert(table, columns):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+
+# Per-query counters: a hit is a run whose statement was still in the
+# connection's statement cache, a miss one that sqlite3 had to prepare. The
+# cache is an LRU of CACHED_STATEMENTS SQL texts, mirrored per connection.
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _count_preparation(conn, name, query):
+    prepared = getattr(conn, 'prepared_statements', None)
+    if prepared is None:
+        return
+    hit = query in prepared
+    if hit:
+        prepared.move_to_end(query)
+    else:
+        prepared[query] = None
+        if len(prepared) > CACHED_STATEMENTS:
+            prepared.popitem(last=False)
+    with _stats_lock:
+        counts = _stats.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+def query_stats():
+    """Return (name, hits, misses) for every query run so far, busiest first."""
+    with _stats_lock:
+        rows = [(name, hits, misses) for name, (hits, misses) in _stats.items()]
+    return sorted(rows, key=lambda row: row[1] + row[2], reverse=True)
+
+
+def builder_stats():
+    """Return (name, hits, misses, variants) of each builder's SQL cache."""
+    return [(name, info.hits, info.misses, info.currsize)
+            for name, info in ((name, build.cache_info()) for name, build in sorted(BUILDERS.items()))]
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _stats.clear()
+    for build in BUILDERS.values():
+        build.cache_clear()
+
+
+def _run(conn, name, params, many=False, fetch=False, query=None):
+    if query is None:
+        query = QUERIES[name]
+    _count_preparation(conn, name, query)
+    cursor = conn.cursor()
+
+    def run():
+        if many:
+            cursor.executemany(query, params)
+        else:
+            cursor.execute(query, params)
+        if fetch:
+            rows = cursor.fetchall()
+            return rows, len(rows)
+        return cursor, cursor.rowcount
+
+    # Latency, rows and the slow-query log (see instrumentation.py). A slow
+    # executemany() is explained with its first row of parameters.
+    sample = params
+    if many:
+        sample = params[0] if isinstance(params, list) and params else ()
+    return timed(conn, name, query, sample, run)
+
+
+def execute_query(conn, name, params=()):
+    """
+    Run the named write statement. Outside a transaction() block it commits on
+    its own; inside one it becomes part of that unit of work.
+    """
+    cursor = _run(conn, name, params)
+    if conn.in_transaction and not getattr(conn, 'unit_of_work_depth', 0):
+        conn.commit()
+    return cursor
+
+
+def execute_many(conn, name, rows):
+    """Run the named write statement once per row of parameters, as one executemany()."""
+    cursor = _run(conn, name, rows, many=True)
+    if conn.in_transaction and not getattr(conn, 'unit_of_work_depth', 0):
+        conn.commit()
+    return cursor
+
+
+def fetch_data(conn, name, params=()):
+    """Run the named query and return all rows."""
+    return _run(conn, name, params, fetch=True)
+
+
+def fetch_built(conn, name, args, params=()):
+    """Build the statement BUILDERS[name](*args), run it and return all rows."""
+    return _run(conn, name, params, fetch=True, query=BUILDERS[name](*args))
+
+
+def execute_many_built(conn, name, args, rows):
+    """executemany() of the statement BUILDERS[name](*args); commits like execute_many()."""
+    cursor = _run(conn, name, rows, many=True, query=BUILDERS[name](*args))
+    if conn.in_transaction and not getattr(conn, 'unit_of_work_depth', 0):
+        conn.commit()
+    return cursor
+
+
+def fetch_chunks(conn, name, params=(), size=10000, args=None):
+    """
+    Run a named (or, with `args`, built) query and yield its rows `size` at a
+    time, for results too large to hold as one list of tuples. Time spent in
+    SQLite over the whole read is reported as one run of the query.
+    """
+    query = QUERIES[name] if args is None else BUILDERS[name](*args)
+    cursor = conn.cursor()
+    seconds, rows, error = 0.0, 0, None
+    started = time.perf_counter()
+    try:
+        cursor.execute(query, params)
+        while True:
+            chunk = cursor.fetchmany(size)
+            seconds += time.perf_counter() - started
+            if not chunk:
+                break
+            rows += len(chunk)
+            yield chunk
+            started = time.perf_counter()
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        sql_metrics.observe_query(conn, name, query, () if error else params, seconds, rows, error=error)
@@ -0,0 +1,80 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+# Every date column is stored as ISO 8601 text, 'YYYY-MM-DD': it sorts and
+# range-scans correctly as plain text and SQLite's date functions read it.
+ISO_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+
+# julianday() of 1970-01-01 (midnight falls on .5); reports handle dates as
+# days since the epoch
+EPOCH_JULIAN_DAY = 2440587.5
+
+# Formats accepted from menus and imports, tried in order
+INPUT_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"]
+
+DATE_COLUMNS = {
+    'Patient': ['DOB'],
+    'Doctor': ['DOB'],
+    'Bill': ['Date'],
+    'Leave': ['SelectDate', 'ReturnDate'],
+    'Treatment': ['StartDate', 'EndDate'],
+    'Appointment': ['Date'],
+}
+
+
+@lru_cache(maxsize=4096)
+def _parse(text):
+    for fmt in INPUT_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    try:
+        # Timestamps such as '2024-10-01 09:30:00'
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        raise ValueError(f"unrecognised date {text!r}, expected YYYY-MM-DD or DD/MM/YYYY")
+
+
+def parse_date(value):
+    """date, datetime or text in one of INPUT_FORMATS -> date. Raises ValueError."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return _parse(str(value).strip())
+
+
+def to_iso(value):
+    """The stored form of a date: 'YYYY-MM-DD', or None for a missing one."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    return parse_date(value).isoformat()
+
+
+def _years_before(day, years):
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        # 29 February in a non-leap year
+        return day.replace(year=day.year - years, day=28)
+
+
+def birth_date_range(age, today=None):
+    """
+    (after, up_to) bounds on DOB for everyone exactly `age` years old today,
+    so an age search becomes `DOB > after AND DOB <= up_to` on an index.
+    """
+    today = today or date.today()
+    return _years_before(today, age + 1).isoformat(), _years_before(today, age).isoformat()
+
+
+def age_sql(column):
+    """SQL expression for whole years elapsed since the ISO date in `column`."""
+    return (f"(CAST(strftime('%Y', 'now', 'localtime') AS INTEGER) - CAST(strftime('%Y', {column}) AS INTEGER)"
+            f" - (strftime('%m-%d', 'now', 'localtime') < strftime('%m-%d', {column})))")
+
+
+def day_number_sql(column):
+    """SQL expression for days since 1970-01-01 of the ISO date in `column` (-1 if unreadable)."""
+    return f"COALESCE(CAST(julianday({column}) - {EPOCH_JULIAN_DAY} AS INTEGER), -1)"
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+
+from data_access import fetch_data
+
+# The doctor directory queries: they read only Doctor, which changes when a
+# doctor is added or edited. Leave is kept separately (leaves.py).
+CACHED_QUERIES = {
+    'specializations',
+    'active_doctors',
+    'active_specializations',
+    'active_doctors_by_specialization',
+    'active_doctor_in_specialization',
+    'active_doctor_cost',
+    'active_doctor_by_id',
+}
+
+# How long a checked Doctor version is trusted before it is read again (seconds)
+VERSION_CHECK_SECONDS = 1.0
+
+
+class DirectoryCache:
+    """
+    In-process read-through cache for the doctor directory queries, shared by
+    every connection in the process.
+
+    Entries are tagged with the generation they were loaded under. invalidate()
+    starts a new generation, so a result loaded before a write is never served
+    after it, even if the load finishes late. At most `max_entries` results are
+    kept, least recently used dropped first.
+
+    Like the medicine index, the cache compares the Doctor version in
+    CatalogVersion (one primary-key lookup) with the one its entries were
+    loaded under, so writes made by other processes (a second terminal, the
+    batch runner) start a new generation too. The version is read at most
+    once per `check_seconds`: hits in between run no query at all, and
+    another process's edit can go unseen for up to that long. This process's
+    own writes call invalidate() and are never served stale.
+    """
+
+    def __init__(self, max_entries=256, check_seconds=VERSION_CHECK_SECONDS):
+        self.max_entries = max_entries
+        self.check_seconds = check_seconds
+        self.version = None
+        self.version_checks = 0
+        self._checked = None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fetch(self, conn, name, params=()):
+        """fetch_data() for a directory query, served from memory when possible."""
+        if name not in CACHED_QUERIES:
+            raise KeyError(f"{name!r} is not a directory query")
+        key = (name, tuple(str(p) for p in params))
+        self.ensure_current(conn)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == self.generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self.generation
+
+        rows = fetch_data(conn, name, params)
+        with self._lock:
+            if generation == self.generation:
+                self._entries[key] = (generation, rows)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return rows
+
+    @staticmethod
+    def _current_version(conn):
+        row = fetch_data(conn, 'catalog_version', ('Doctor',))
+        return row[0][0] if row else None
+
+    def ensure_current(self, conn):
+        """Start a new generation if Doctor changed since the entries were loaded."""
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_seconds:
+            return
+        version = self._current_version(conn)
+        with self._lock:
+            self._checked = now
+            self.version_checks += 1
+            if version != self.version:
+                self.version = version
+                self.generation += 1
+                self._entries.clear()
+
+    def invalidate(self):
+        """Call after a write to Doctor commits, so this process stops serving old entries at once."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._checked = None
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / total if total else 0.0,
+                    'entries': len(self._entries), 'generation': self.generation,
+                    'version_checks': self.version_checks}
+
+
+directory = DirectoryCache()
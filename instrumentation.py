@@ -0,0 +1,249 @@
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+# Latency histogram bucket upper bounds, in seconds (Prometheus 'le' labels)
+BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+
+# Named queries slower than this are written to the slow-query log
+SLOW_QUERY_SECONDS = 0.1
+SLOW_QUERY_LOG = 'slow_queries.log'
+
+# Waits for the write lock shorter than this are not counted as waits
+LOCK_WAIT_SECONDS = 0.001
+
+# With HOSPITAL_SQL_TRACE=1 every new connection also gets sqlite3's trace
+# callback (statement counts by shape, including SQL run outside the query
+# registry) and a progress handler (virtual machine work per named query).
+TRACE = os.environ.get('HOSPITAL_SQL_TRACE') == '1'
+PROGRESS_STEPS = 1000
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(sql):
+    """SQL with literals replaced by ? and whitespace collapsed."""
+    return _SPACE.sub(" ", _LITERAL.sub("?", sql)).strip()[:200]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None if empty or above the last bucket)."""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return None
+
+
+class QueryMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.rows = 0
+        self.errors = 0
+        self.slow = 0
+        self.vm_steps = 0
+
+
+class SqlMetrics:
+    """
+    Process-wide SQL metrics. data_access reports every named query here,
+    transactions reports waits for the write lock, and connections opened with
+    tracing on report every statement they run.
+    """
+
+    def __init__(self, slow_seconds=SLOW_QUERY_SECONDS, slow_log=SLOW_QUERY_LOG):
+        self.slow_seconds = slow_seconds
+        self.slow_log = slow_log
+        self.queries = {}
+        self.statements = {}
+        self.lock_waits = Histogram()
+        self.busy_errors = 0
+        self._plans = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # Hooks
+
+    def observe_query(self, conn, name, sql, params, seconds, rows, error=None, vm_steps=0):
+        with self._lock:
+            metrics = self.queries.get(name)
+            if metrics is None:
+                metrics = self.queries[name] = QueryMetrics()
+            metrics.latency.observe(seconds)
+            metrics.rows += max(rows, 0)
+            metrics.vm_steps += vm_steps
+            if error is not None:
+                metrics.errors += 1
+                if 'locked' in str(error) or 'busy' in str(error):
+                    self.busy_errors += 1
+            slow = self.slow_seconds is not None and seconds >= self.slow_seconds
+            if slow:
+                metrics.slow += 1
+        if slow:
+            self._log_slow(conn, name, sql, params, seconds, rows)
+
+    def observe_lock_wait(self, seconds, error=None):
+        with self._lock:
+            if error is not None:
+                self.busy_errors += 1
+            if seconds >= LOCK_WAIT_SECONDS:
+                self.lock_waits.observe(seconds)
+
+    def _trace(self, sql):
+        if sql.startswith('--'):
+            # Statements run by triggers and FTS5 internals on SQLite's behalf
+            return
+        shape = statement_shape(sql)
+        with self._lock:
+            self.statements[shape] = self.statements.get(shape, 0) + 1
+
+    def _progress(self):
+        self._local.steps = getattr(self._local, 'steps', 0) + 1
+        return 0
+
+    def vm_steps(self):
+        """Progress-handler ticks seen on this thread so far (x PROGRESS_STEPS instructions)."""
+        return getattr(self._local, 'steps', 0)
+
+    def instrument(self, conn):
+        """Attach the trace callback and progress handler to a new connection."""
+        conn.set_trace_callback(self._trace)
+        conn.set_progress_handler(self._progress, PROGRESS_STEPS)
+        return conn
+
+    # Slow-query log
+
+    def _plan(self, conn, name, sql, params):
+        # A registered statement's text is fixed (a builder's is fixed per
+        # variant), so each plan is looked up once
+        key = (name, sql)
+        if key not in self._plans:
+            try:
+                rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+            except Exception as e:
+                return [f"unavailable: {e}"]
+            self._plans[key] = [row[-1] for row in rows]
+        return self._plans[key]
+
+    def _log_slow(self, conn, name, sql, params, seconds, rows):
+        # Parameters are left out: they can hold passwords and patient details
+        entry = {'time': datetime.now().isoformat(timespec='seconds'), 'query': name,
+                 'ms': round(seconds * 1000, 3), 'rows': rows, 'plan': self._plan(conn, name, sql, params)}
+        try:
+            with open(self.slow_log, 'a') as log:
+                log.write(json.dumps(entry) + "\n")
+        except OSError:
+            pass
+
+    # Reporting
+
+    def summary(self):
+        """Per-query rows for the admin page, most total time first."""
+        with self._lock:
+            rows = [{'query': name, 'count': m.latency.count, 'total_seconds': m.latency.total,
+                     'avg_seconds': m.latency.total / m.latency.count if m.latency.count else 0.0,
+                     'p95_seconds': m.latency.quantile(0.95), 'rows': m.rows, 'errors': m.errors,
+                     'slow': m.slow, 'vm_steps': m.vm_steps * PROGRESS_STEPS}
+                    for name, m in self.queries.items()]
+        return sorted(rows, key=lambda row: row['total_seconds'], reverse=True)
+
+    def prometheus_text(self, extra=None):
+        """
+        Metrics in the Prometheus text exposition format. `extra` maps metric
+        name -> (help, type, value) for gauges kept elsewhere (caches, jobs).
+        """
+        lines = []
+
+        def histogram(metric, help_text, histograms):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, h in histograms:
+                cumulative = 0
+                for bound, n in zip(BUCKETS + ['+Inf'], h.counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{{labels}le="{bound}"}} {cumulative}')
+                labels = f"{{{labels.rstrip(',')}}}" if labels else ""
+                lines.append(f"{metric}_sum{labels} {h.total}")
+                lines.append(f"{metric}_count{labels} {h.count}")
+
+        def counter(metric, help_text, values, kind='counter'):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for labels, value in values:
+                lines.append(f"{metric}{{{labels}}} {value}" if labels else f"{metric} {value}")
+
+        with self._lock:
+            queries = sorted(self.queries.items())
+            histogram('hospital_sql_query_duration_seconds', "Named query latency.",
+                      [(f'query="{name}",', m.latency) for name, m in queries])
+            counter('hospital_sql_query_rows_total', "Rows returned or changed by named queries.",
+                    [(f'query="{name}"', m.rows) for name, m in queries])
+            counter('hospital_sql_query_errors_total', "Named queries that raised.",
+                    [(f'query="{name}"', m.errors) for name, m in queries])
+            counter('hospital_sql_slow_queries_total', f"Named queries slower than {self.slow_seconds}s.",
+                    [(f'query="{name}"', m.slow) for name, m in queries])
+            if TRACE:
+                counter('hospital_sql_query_vm_steps_total', "SQLite VM instructions run by named queries.",
+                        [(f'query="{name}"', m.vm_steps * PROGRESS_STEPS) for name, m in queries])
+                counter('hospital_sql_statements_total', "Statements run, by shape.",
+                        [('shape="{}"'.format(shape.replace('\\', '\\\\').replace('"', '\\"')), n)
+                         for shape, n in sorted(self.statements.items())])
+            histogram('hospital_sql_lock_wait_seconds', "Time spent waiting for the write lock.",
+                      [('', self.lock_waits)])
+            counter('hospital_sql_busy_errors_total', "Statements that failed with database locked/busy.",
+                    [('', self.busy_errors)])
+        for metric, (help_text, kind, value) in sorted((extra or {}).items()):
+            counter(metric, help_text, [('', value)], kind)
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, extra=None):
+        """Write the metrics file atomically, for node_exporter's textfile collector."""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as out:
+            out.write(self.prometheus_text(extra))
+        os.replace(tmp, path)
+
+    def reset(self):
+        with self._lock:
+            self.queries.clear()
+            self.statements.clear()
+            self.lock_waits = Histogram()
+            self.busy_errors = 0
+            self._plans.clear()
+
+
+sql_metrics = SqlMetrics()
+
+
+def timed(conn, name, sql, params, run):
+    """Call run() and report it to sql_metrics; run() returns (result, row count)."""
+    steps = sql_metrics.vm_steps() if TRACE else 0
+    started = time.perf_counter()
+    try:
+        result, rows = run()
+    except Exception as e:
+        sql_metrics.observe_query(conn, name, sql, (), time.perf_counter() - started, 0, error=e)
+        raise
+    elapsed = time.perf_counter() - started
+    sql_metrics.observe_query(conn, name, sql, params, elapsed, rows,
+                              vm_steps=sql_metrics.vm_steps() - steps if TRACE else 0)
+    return result
@@ -0,0 +1,78 @@
+import threading
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from data_access import fetch_data
+
+
+def _iso(day):
+    return day.isoformat() if isinstance(day, date) else str(day)
+
+
+class LeaveCalendar:
+    """
+    In-memory interval index over accepted leaves.
+
+    Each doctor's leaves are merged into disjoint inclusive ranges of ISO
+    dates, held as two parallel sorted lists (starts, ends). "Is the doctor
+    on leave on X" is one bisect; the leave days in a window are found by
+    bisecting to the first range that can reach it and walking forward.
+
+    Like the medicine index, the calendar is reloaded when CatalogVersion
+    shows that accepted leaves changed, so approvals made by any process are
+    picked up with one primary-key lookup.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._ranges = {}
+        self._lock = threading.Lock()
+
+    def load(self, conn):
+        version = self._current_version(conn)
+        ranges = {}
+        for doctor_id, start, end in fetch_data(conn, 'accepted_leaves'):
+            starts, ends = ranges.setdefault(doctor_id, ([], []))
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        with self._lock:
+            self._ranges, self.version = ranges, version
+
+    @staticmethod
+    def _current_version(conn):
+        row = fetch_data(conn, 'catalog_version', ('Leave',))
+        return row[0][0] if row else None
+
+    def ensure_current(self, conn):
+        """Reload if accepted leaves changed since the last load."""
+        if self.version is None or self._current_version(conn) != self.version:
+            self.load(conn)
+
+    def is_on_leave(self, doctor_id, day):
+        starts, ends = self._ranges.get(int(doctor_id), ((), ()))
+        day = _iso(day)
+        i = bisect_right(starts, day) - 1
+        return i >= 0 and ends[i] >= day
+
+    def leave_days(self, doctor_id, start_date, days):
+        """Set of dates in the `days` days from `start_date` the doctor is on leave."""
+        starts, ends = self._ranges.get(int(doctor_id), ((), ()))
+        last_date = start_date + timedelta(days=days - 1)
+        first, last = start_date.isoformat(), last_date.isoformat()
+        blocked = set()
+        i = max(bisect_right(starts, first) - 1, 0)
+        while i < len(starts) and starts[i] <= last:
+            if ends[i] >= first:
+                day = max(date.fromisoformat(starts[i]), start_date)
+                end = min(date.fromisoformat(ends[i]), last_date)
+                while day <= end:
+                    blocked.add(day)
+                    day += timedelta(days=1)
+            i += 1
+        return blocked
+
+
+leave_calendar = LeaveCalendar()
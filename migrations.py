@@ -0,0 +1,663 @@
+import sqlite3
+
+from connection import DB_PATH
+from dates import DATE_COLUMNS, ISO_GLOB, to_iso
+
+
+def _fts_statements(table, key, columns):
+    """
+    DDL for an external-content FTS5 index over `columns` of `table`, kept in
+    sync with the base table by triggers and filled from the existing rows.
+    """
+    index = f"{table}Search"
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    old_values = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+            {cols}, content='{table}', content_rowid='{key}',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {index} (rowid, {cols}) VALUES (new.{key}, {new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {index} ({index}, rowid, {cols}) VALUES ('delete', old.{key}, {old_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+            INSERT INTO {index} ({index}, rowid, {cols}) VALUES ('delete', old.{key}, {old_values});
+            INSERT INTO {index} (rowid, {cols}) VALUES (new.{key}, {new_values});
+        END
+        """,
+        f"INSERT INTO {index} ({index}) VALUES ('rebuild')",
+    ]
+
+
+def _not_iso(value):
+    # date() only normalises out-of-range days such as 02-30 when given a modifier
+    return f"({value} IS NOT NULL AND ({value} NOT GLOB '{ISO_GLOB}' OR date({value}, '+0 days') IS NOT {value}))"
+
+
+def _normalize_dates(conn):
+    """
+    Rewrite every date column to 'YYYY-MM-DD'. Values that cannot be read as
+    a date are copied to DateRepair and cleared; an appointment whose fixed
+    date collides with an existing booking is moved to AppointmentConflict.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS DateRepair (
+        TableName TEXT,
+        RowID INTEGER,
+        ColumnName TEXT,
+        Value TEXT
+    )
+    """)
+    for table, columns in DATE_COLUMNS.items():
+        for column in columns:
+            rows = conn.execute(f"SELECT rowid, {column} FROM {table} WHERE {_not_iso(column)}").fetchall()
+            for rowid, value in rows:
+                try:
+                    fixed = to_iso(value)
+                except ValueError:
+                    fixed = None
+                    conn.execute("INSERT INTO DateRepair VALUES (?, ?, ?, ?)", (table, rowid, column, str(value)))
+                try:
+                    conn.execute(f"UPDATE {table} SET {column} = ? WHERE rowid = ?", (fixed, rowid))
+                except sqlite3.IntegrityError:
+                    # Only a booking can collide (one appointment per doctor per slot)
+                    if table != 'Appointment':
+                        raise
+                    conn.execute("INSERT INTO AppointmentConflict SELECT * FROM Appointment WHERE rowid = ?", (rowid,))
+                    conn.execute("DELETE FROM Appointment WHERE rowid = ?", (rowid,))
+
+
+def _date_check_statements(date_columns=DATE_COLUMNS):
+    """Triggers that reject any date not written as 'YYYY-MM-DD'."""
+    statements = []
+    for table, columns in date_columns.items():
+        bad = " OR ".join(_not_iso(f"new.{column}") for column in columns)
+        for event, name in (("INSERT", "bi"), (f"UPDATE OF {', '.join(columns)}", "bu")):
+            statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_dates_{name} BEFORE {event} ON {table}
+            WHEN {bad} BEGIN
+                SELECT RAISE(ABORT, 'dates in {table} must be written as YYYY-MM-DD');
+            END
+            """)
+    return statements
+
+
+# Records a payment's day in local time, like every other date the app writes
+_BILL_BALANCE_AU = """
+    CREATE TRIGGER IF NOT EXISTS Bill_balance_au AFTER UPDATE OF PatientID, Amount, Date, PaymentStatus ON Bill BEGIN
+        UPDATE PatientBalance SET
+            Outstanding = ROUND(Outstanding - CASE WHEN old.PaymentStatus = 'Pending' THEN old.Amount ELSE 0 END, 2),
+            PendingCount = PendingCount - (old.PaymentStatus = 'Pending')
+        WHERE PatientID = old.PatientID;
+        INSERT OR IGNORE INTO PatientBalance (PatientID) VALUES (new.PatientID);
+        UPDATE PatientBalance SET
+            Outstanding = ROUND(Outstanding + CASE WHEN new.PaymentStatus = 'Pending' THEN new.Amount ELSE 0 END, 2),
+            PendingCount = PendingCount + (new.PaymentStatus = 'Pending'),
+            LastPayment = CASE WHEN new.PaymentStatus = 'Paid' AND old.PaymentStatus IS NOT 'Paid'
+                               THEN date('now', 'localtime') ELSE LastPayment END
+        WHERE PatientID = new.PatientID;
+        UPDATE PatientBalance SET OldestPending = (
+            SELECT MIN(Date) FROM Bill
+            WHERE Bill.PatientID = PatientBalance.PatientID AND PaymentStatus = 'Pending'
+        ) WHERE PatientID IN (old.PatientID, new.PatientID);
+    END
+    """
+
+
+# Each migration is (version, description, statements). Migrations are applied
+# in order, each one in its own transaction, and the applied version is stored
+# in the schema_version table so an existing Hospital_Database.db is upgraded
+# in place.
+MIGRATIONS = [
+    (1, "Initial schema", [
+        '''
+        CREATE TABLE IF NOT EXISTS Patient (
+            PatientID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Name TEXT,
+            DOB DATE,
+            Weight REAL,
+            Height REAL,
+            Gender TEXT,
+            PhoneNo TEXT,
+            EmailID TEXT,
+            Address TEXT,
+            MedicalHistory TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Doctor (
+            DoctorID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Name TEXT,
+            DOB DATE,
+            Gender TEXT,
+            Specialization TEXT,
+            PhoneNo TEXT,
+            EmailID TEXT,
+            Address TEXT,
+            AppointmentCost INTEGER,
+            YearsOfExperience INTEGER,
+            WorkStatus TEXT DEFAULT 'Active'
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Bill (
+            BillID INTEGER PRIMARY KEY AUTOINCREMENT,
+            PatientID INTEGER,
+            BillType TEXT,
+            Amount REAL,
+            Date DATE,
+            PaymentStatus TEXT DEFAULT 'Pending',
+            FOREIGN KEY (PatientID) REFERENCES Patient(PatientID)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Room (
+            RoomID INTEGER PRIMARY KEY AUTOINCREMENT,
+            RoomType TEXT,
+            AvailabilityStatus TEXT,
+            Cost REAL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Leave (
+            LeaveID INTEGER PRIMARY KEY AUTOINCREMENT,
+            DoctorID INTEGER,
+            SelectDate DATE,
+            ReturnDate DATE,
+            NoOfDays INTEGER,
+            Reason TEXT,
+            LeaveStatus TEXT DEFAULT 'Pending',
+            FOREIGN KEY (DoctorID) REFERENCES Doctor(DoctorID)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Treatment (
+            TreatmentID INTEGER PRIMARY KEY AUTOINCREMENT,
+            PatientID INTEGER,
+            DoctorID INTEGER,
+            Diagnosis TEXT,
+            TreatmentPlan TEXT,
+            Medicines TEXT,
+            StartDate DATE,
+            EndDate DATE,
+            FOREIGN KEY (PatientID) REFERENCES Patient(PatientID),
+            FOREIGN KEY (DoctorID) REFERENCES Doctor(DoctorID)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Medicine (
+            MedicineID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Name TEXT,
+            Cost REAL,
+            Use TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Appointment (
+            AppointmentID INTEGER PRIMARY KEY AUTOINCREMENT,
+            PatientID INTEGER,
+            DoctorID INTEGER,
+            Date DATE,
+            Time TEXT,
+            Purpose TEXT,
+            FOREIGN KEY (PatientID) REFERENCES Patient(PatientID),
+            FOREIGN KEY (DoctorID) REFERENCES Doctor(DoctorID)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS LoginCredits (
+            UserID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Password TEXT,
+            UserType TEXT
+        )
+        ''',
+    ]),
+    (2, "Indexes for availability, billing, treatment and leave lookups", [
+        # is_date_available / get_available_slots: covering, no table lookup
+        "CREATE INDEX IF NOT EXISTS idx_appointment_doctor_date ON Appointment (DoctorID, Date, Time)",
+        # view_patient_appointments
+        "CREATE INDEX IF NOT EXISTS idx_appointment_patient_date ON Appointment (PatientID, Date, Time)",
+        # patient_bills / view_unpaid_bills / pay_bill
+        "CREATE INDEX IF NOT EXISTS idx_bill_patient_status ON Bill (PatientID, PaymentStatus)",
+        # pending_bills
+        "CREATE INDEX IF NOT EXISTS idx_bill_status ON Bill (PaymentStatus, BillID)",
+        # my_patients: covering, DISTINCT PatientID straight from the index
+        "CREATE INDEX IF NOT EXISTS idx_treatment_doctor_patient ON Treatment (DoctorID, PatientID)",
+        # treatment_info by PatientID
+        "CREATE INDEX IF NOT EXISTS idx_treatment_patient ON Treatment (PatientID)",
+        # handle_pending_leaves: filter and ORDER BY from the same index
+        "CREATE INDEX IF NOT EXISTS idx_leave_status_date ON Leave (LeaveStatus, SelectDate)",
+        "CREATE INDEX IF NOT EXISTS idx_leave_doctor_date ON Leave (DoctorID, SelectDate)",
+        # book_appointment / select_doctors_by_specialization
+        "CREATE INDEX IF NOT EXISTS idx_doctor_status_spec ON Doctor (WorkStatus, Specialization, Name)",
+        # view_doctors
+        "CREATE INDEX IF NOT EXISTS idx_doctor_spec ON Doctor (Specialization)",
+        # view_patients
+        "CREATE INDEX IF NOT EXISTS idx_patient_name ON Patient (Name)",
+        # book_room
+        "CREATE INDEX IF NOT EXISTS idx_room_type_status ON Room (RoomType, AvailabilityStatus)",
+        "ANALYZE",
+    ]),
+    (3, "Full-text search indexes for patients, doctors and treatments",
+        _fts_statements('Patient', 'PatientID', ['Name', 'MedicalHistory', 'Address'])
+        + _fts_statements('Doctor', 'DoctorID', ['Name', 'Specialization'])
+        + _fts_statements('Treatment', 'TreatmentID', ['Diagnosis', 'TreatmentPlan', 'Medicines'])),
+    (4, "Index for paging through all leaves by date", [
+        "CREATE INDEX IF NOT EXISTS idx_leave_date ON Leave (SelectDate, LeaveID)",
+    ]),
+    (5, "One appointment per doctor per slot", [
+        # Keep the earliest booking of each slot; later double-bookings are
+        # moved aside for the front desk to resolve rather than deleted
+        """
+        CREATE TABLE IF NOT EXISTS AppointmentConflict AS
+        SELECT * FROM Appointment WHERE 0
+        """,
+        """
+        INSERT INTO AppointmentConflict
+        SELECT * FROM Appointment a
+        WHERE EXISTS (
+            SELECT 1 FROM Appointment b
+            WHERE b.DoctorID = a.DoctorID AND b.Date = a.Date AND b.Time = a.Time
+              AND b.AppointmentID < a.AppointmentID
+        )
+        """,
+        "DELETE FROM Appointment WHERE AppointmentID IN (SELECT AppointmentID FROM AppointmentConflict)",
+        "DROP INDEX IF EXISTS idx_appointment_doctor_date",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_appointment_slot ON Appointment (DoctorID, Date, Time)",
+    ]),
+    (6, "Trigger-maintained patient balance summary", [
+        """
+        CREATE TABLE IF NOT EXISTS PatientBalance (
+            PatientID INTEGER PRIMARY KEY,
+            Outstanding REAL NOT NULL DEFAULT 0,
+            PendingCount INTEGER NOT NULL DEFAULT 0,
+            OldestPending DATE,
+            LastPayment DATE
+        )
+        """,
+        # Dunning list: patients who owe money, oldest debt first
+        """
+        CREATE INDEX IF NOT EXISTS idx_balance_oldest_pending
+        ON PatientBalance (OldestPending, PatientID) WHERE PendingCount > 0
+        """,
+        # Lets the triggers find a patient's oldest pending bill with one seek
+        "DROP INDEX IF EXISTS idx_bill_patient_status",
+        "CREATE INDEX IF NOT EXISTS idx_bill_patient_status_date ON Bill (PatientID, PaymentStatus, Date)",
+        """
+        INSERT OR REPLACE INTO PatientBalance (PatientID, Outstanding, PendingCount, OldestPending, LastPayment)
+        SELECT PatientID,
+               ROUND(TOTAL(CASE WHEN PaymentStatus = 'Pending' THEN Amount END), 2),
+               COUNT(CASE WHEN PaymentStatus = 'Pending' THEN 1 END),
+               MIN(CASE WHEN PaymentStatus = 'Pending' THEN Date END),
+               MAX(CASE WHEN PaymentStatus = 'Paid' THEN Date END)
+        FROM Bill WHERE PatientID IS NOT NULL GROUP BY PatientID
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS Bill_balance_ai AFTER INSERT ON Bill BEGIN
+            INSERT OR IGNORE INTO PatientBalance (PatientID) VALUES (new.PatientID);
+            UPDATE PatientBalance SET
+                Outstanding = ROUND(Outstanding + CASE WHEN new.PaymentStatus = 'Pending' THEN new.Amount ELSE 0 END, 2),
+                PendingCount = PendingCount + (new.PaymentStatus = 'Pending'),
+                OldestPending = CASE WHEN new.PaymentStatus = 'Pending'
+                                      AND (OldestPending IS NULL OR new.Date < OldestPending)
+                                     THEN new.Date ELSE OldestPending END,
+                LastPayment = CASE WHEN new.PaymentStatus = 'Paid'
+                                    AND (LastPayment IS NULL OR new.Date > LastPayment)
+                                   THEN new.Date ELSE LastPayment END
+            WHERE PatientID = new.PatientID;
+        END
+        """,
+        _BILL_BALANCE_AU,
+        """
+        CREATE TRIGGER IF NOT EXISTS Bill_balance_ad AFTER DELETE ON Bill BEGIN
+            UPDATE PatientBalance SET
+                Outstanding = ROUND(Outstanding - CASE WHEN old.PaymentStatus = 'Pending' THEN old.Amount ELSE 0 END, 2),
+                PendingCount = PendingCount - (old.PaymentStatus = 'Pending'),
+                OldestPending = (
+                    SELECT MIN(Date) FROM Bill
+                    WHERE Bill.PatientID = old.PatientID AND PaymentStatus = 'Pending'
+                )
+            WHERE PatientID = old.PatientID;
+        END
+        """,
+    ]),
+    (7, "Canonical YYYY-MM-DD dates", [
+        _normalize_dates,
+        *_date_check_statements(),
+        # Age searches become DOB range scans
+        "CREATE INDEX IF NOT EXISTS idx_doctor_dob ON Doctor (DOB)",
+        "CREATE INDEX IF NOT EXISTS idx_patient_dob ON Patient (DOB)",
+    ]),
+    (8, "Medicine catalog version for the in-memory search index", [
+        """
+        CREATE TABLE IF NOT EXISTS CatalogVersion (
+            Name TEXT PRIMARY KEY,
+            Version INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR IGNORE INTO CatalogVersion (Name) VALUES ('Medicine')",
+        """
+        CREATE TRIGGER IF NOT EXISTS Medicine_version_ai AFTER INSERT ON Medicine BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'Medicine';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS Medicine_version_au AFTER UPDATE ON Medicine BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'Medicine';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS Medicine_version_ad AFTER DELETE ON Medicine BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'Medicine';
+        END
+        """,
+    ]),
+    (9, "Bill line items and per-medicine sales totals", [
+        """
+        CREATE TABLE IF NOT EXISTS BillItem (
+            BillItemID INTEGER PRIMARY KEY AUTOINCREMENT,
+            BillID INTEGER NOT NULL,
+            MedicineID INTEGER,
+            Quantity INTEGER NOT NULL CHECK (Quantity > 0),
+            UnitPrice REAL NOT NULL,
+            FOREIGN KEY (BillID) REFERENCES Bill(BillID),
+            FOREIGN KEY (MedicineID) REFERENCES Medicine(MedicineID)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_bill_item_bill ON BillItem (BillID)",
+        """
+        CREATE TABLE IF NOT EXISTS MedicineSales (
+            MedicineID INTEGER PRIMARY KEY,
+            UnitsSold INTEGER NOT NULL DEFAULT 0,
+            Revenue REAL NOT NULL DEFAULT 0,
+            Orders INTEGER NOT NULL DEFAULT 0,
+            LastSold DATE
+        )
+        """,
+        # Top sellers straight from the index
+        "CREATE INDEX IF NOT EXISTS idx_medicine_sales_units ON MedicineSales (UnitsSold DESC, MedicineID)",
+        """
+        CREATE TRIGGER IF NOT EXISTS BillItem_sales_ai AFTER INSERT ON BillItem BEGIN
+            INSERT OR IGNORE INTO MedicineSales (MedicineID) VALUES (new.MedicineID);
+            UPDATE MedicineSales SET
+                UnitsSold = UnitsSold + new.Quantity,
+                Revenue = ROUND(Revenue + new.Quantity * new.UnitPrice, 2),
+                Orders = Orders + 1,
+                LastSold = NULLIF(MAX(COALESCE(LastSold, ''),
+                                      COALESCE((SELECT Date FROM Bill WHERE BillID = new.BillID), '')), '')
+            WHERE MedicineID = new.MedicineID;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS BillItem_sales_ad AFTER DELETE ON BillItem BEGIN
+            UPDATE MedicineSales SET
+                UnitsSold = UnitsSold - old.Quantity,
+                Revenue = ROUND(Revenue - old.Quantity * old.UnitPrice, 2),
+                Orders = Orders - 1
+            WHERE MedicineID = old.MedicineID;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS BillItem_sales_au AFTER UPDATE OF MedicineID, Quantity, UnitPrice ON BillItem BEGIN
+            UPDATE MedicineSales SET
+                UnitsSold = UnitsSold - old.Quantity,
+                Revenue = ROUND(Revenue - old.Quantity * old.UnitPrice, 2),
+                Orders = Orders - 1
+            WHERE MedicineID = old.MedicineID;
+            INSERT OR IGNORE INTO MedicineSales (MedicineID) VALUES (new.MedicineID);
+            UPDATE MedicineSales SET
+                UnitsSold = UnitsSold + new.Quantity,
+                Revenue = ROUND(Revenue + new.Quantity * new.UnitPrice, 2),
+                Orders = Orders + 1
+            WHERE MedicineID = new.MedicineID;
+        END
+        """,
+    ]),
+    (10, "Dated room stays", [
+        # A stay holds its room for the nights CheckIn <= night < CheckOut while
+        # Status is 'Active'; released and discharged stays are kept as history.
+        """
+        CREATE TABLE IF NOT EXISTS RoomStay (
+            StayID INTEGER PRIMARY KEY AUTOINCREMENT,
+            RoomID INTEGER NOT NULL,
+            PatientID INTEGER,
+            CheckIn DATE NOT NULL,
+            CheckOut DATE NOT NULL,
+            Status TEXT NOT NULL DEFAULT 'Active',
+            BillID INTEGER,
+            CHECK (CheckOut >= CheckIn),
+            FOREIGN KEY (RoomID) REFERENCES Room(RoomID),
+            FOREIGN KEY (PatientID) REFERENCES Patient(PatientID),
+            FOREIGN KEY (BillID) REFERENCES Bill(BillID)
+        )
+        """,
+        # Overlap check for one room: seek to the room, range-scan CheckIn
+        "CREATE INDEX IF NOT EXISTS idx_room_stay_room ON RoomStay (RoomID, CheckIn) WHERE Status = 'Active'",
+        # Loading current and future stays; the daily status sync
+        "CREATE INDEX IF NOT EXISTS idx_room_stay_checkout ON RoomStay (CheckOut) WHERE Status = 'Active'",
+        "CREATE INDEX IF NOT EXISTS idx_room_stay_patient ON RoomStay (PatientID, CheckIn)",
+        # Room lists by type come from the index in RoomID order
+        "DROP INDEX IF EXISTS idx_room_type_status",
+        "CREATE INDEX IF NOT EXISTS idx_room_type ON Room (RoomType, RoomID)",
+        # A room flipped to 'occupied' by the old booking flow has no dates:
+        # hold it for tonight only, so it returns to inventory tomorrow.
+        """
+        INSERT INTO RoomStay (RoomID, CheckIn, CheckOut)
+        SELECT RoomID, date('now', 'localtime'), date('now', 'localtime', '+1 day')
+        FROM Room WHERE LOWER(AvailabilityStatus) = 'occupied'
+        """,
+        # AvailabilityStatus now only mirrors whether a stay covers tonight
+        """
+        UPDATE Room SET AvailabilityStatus = CASE WHEN LOWER(AvailabilityStatus) = 'occupied'
+                                                  THEN 'Occupied' ELSE 'Available' END
+        """,
+    ] + _date_check_statements({'RoomStay': ['CheckIn', 'CheckOut']})),
+    (11, "Leave calendar replaces the permanent 'On Leave' status", [
+        # Early sample data used 'Approved' for what the app calls 'Accepted'
+        "UPDATE Leave SET LeaveStatus = 'Accepted' WHERE LeaveStatus = 'Approved'",
+        # Doctors sent 'On Leave' by an approval were never brought back;
+        # booking now checks the leave dates instead
+        """
+        UPDATE Doctor SET WorkStatus = 'Active'
+        WHERE WorkStatus = 'On Leave'
+          AND DoctorID IN (SELECT DoctorID FROM Leave WHERE LeaveStatus = 'Accepted')
+        """,
+        # Loading the calendar: covering, already in (DoctorID, SelectDate) order
+        """
+        CREATE INDEX IF NOT EXISTS idx_leave_accepted ON Leave (DoctorID, SelectDate, ReturnDate)
+        WHERE LeaveStatus = 'Accepted'
+        """,
+        "INSERT OR IGNORE INTO CatalogVersion (Name) VALUES ('Leave')",
+        """
+        CREATE TRIGGER IF NOT EXISTS Leave_version_ai AFTER INSERT ON Leave
+        WHEN new.LeaveStatus = 'Accepted' BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'Leave';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS Leave_version_au AFTER UPDATE ON Leave
+        WHEN old.LeaveStatus = 'Accepted' OR new.LeaveStatus = 'Accepted' BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'Leave';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS Leave_version_ad AFTER DELETE ON Leave
+        WHEN old.LeaveStatus = 'Accepted' BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'Leave';
+        END
+        """,
+    ]),
+    (12, "Archive for past appointments", [
+        # Same columns as Appointment, without its one-booking-per-slot index
+        "CREATE TABLE IF NOT EXISTS AppointmentArchive AS SELECT * FROM Appointment WHERE 0",
+        "CREATE INDEX IF NOT EXISTS idx_appointment_archive_date ON AppointmentArchive (Date)",
+    ]),
+    (13, "Patient balance records payments on the local date", [
+        "DROP TRIGGER IF EXISTS Bill_balance_au",
+        _BILL_BALANCE_AU,
+    ]),
+    (14, "Doctor version for the directory cache", [
+        "INSERT OR IGNORE INTO CatalogVersion (Name) VALUES ('Doctor')",
+        """
+        CREATE TRIGGER IF NOT EXISTS Doctor_version_ai AFTER INSERT ON Doctor BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'Doctor';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS Doctor_version_au AFTER UPDATE ON Doctor BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'Doctor';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS Doctor_version_ad AFTER DELETE ON Doctor BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'Doctor';
+        END
+        """,
+    ]),
+    (15, "Room allocator version; rooms added as occupied hold tonight", [
+        # Covers the room list too: the allocator loads both
+        "INSERT OR IGNORE INTO CatalogVersion (Name) VALUES ('RoomStay')",
+        """
+        CREATE TRIGGER IF NOT EXISTS RoomStay_version_ai AFTER INSERT ON RoomStay BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'RoomStay';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS RoomStay_version_au AFTER UPDATE ON RoomStay BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'RoomStay';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS RoomStay_version_ad AFTER DELETE ON RoomStay BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'RoomStay';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS Room_version_ai AFTER INSERT ON Room BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'RoomStay';
+        END
+        """,
+        # AvailabilityStatus is kept in step by the bookings themselves
+        """
+        CREATE TRIGGER IF NOT EXISTS Room_version_au AFTER UPDATE OF RoomID, RoomType, Cost ON Room BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'RoomStay';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS Room_version_ad AFTER DELETE ON Room BEGIN
+            UPDATE CatalogVersion SET Version = Version + 1 WHERE Name = 'RoomStay';
+        END
+        """,
+        # Rooms inserted as occupied (the sample data's ICU) get the same
+        # tonight-only stay that version 10 gave the existing ones
+        """
+        CREATE TRIGGER IF NOT EXISTS Room_occupied_ai AFTER INSERT ON Room
+        WHEN LOWER(new.AvailabilityStatus) = 'occupied' BEGIN
+            INSERT INTO RoomStay (RoomID, CheckIn, CheckOut)
+            VALUES (new.RoomID, date('now', 'localtime'), date('now', 'localtime', '+1 day'));
+        END
+        """,
+        """
+        INSERT INTO RoomStay (RoomID, CheckIn, CheckOut)
+        SELECT RoomID, date('now', 'localtime'), date('now', 'localtime', '+1 day')
+        FROM Room WHERE LOWER(AvailabilityStatus) = 'occupied'
+          AND NOT EXISTS (SELECT 1 FROM RoomStay s
+                          WHERE s.RoomID = Room.RoomID AND s.Status = 'Active'
+                            AND s.CheckIn <= date('now', 'localtime') AND s.CheckOut > date('now', 'localtime'))
+        """,
+    ]),
+]
+
+
+def current_version(conn):
+    """Return the schema version recorded in the database (0 if none)."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        Version INTEGER PRIMARY KEY,
+        Description TEXT,
+        AppliedAt TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    row = conn.execute("SELECT MAX(Version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def latest_version():
+    return MIGRATIONS[-1][0]
+
+
+def applied_version(conn):
+    """The recorded schema version, read without any DDL (0 for a new database)."""
+    try:
+        row = conn.execute("SELECT MAX(Version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            raise
+        return 0
+    return row[0] or 0
+
+
+def init_schema(conn):
+    """
+    Create or upgrade the schema at startup. A database that is already at
+    the latest version costs one SELECT and no DDL or write lock.
+    Returns the list of versions that were applied.
+    """
+    if applied_version(conn) >= latest_version():
+        return []
+    return migrate(conn)
+
+
+def migrate(conn, target=None):
+    """
+    Apply every pending migration up to `target` (default: latest).
+    Returns the list of versions that were applied.
+    """
+    if target is None:
+        target = latest_version()
+
+    applied = []
+    version = current_version(conn)
+    conn.commit()
+
+    for step_version, description, statements in MIGRATIONS:
+        if step_version <= version or step_version > target:
+            continue
+        try:
+            conn.execute("BEGIN")
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute("INSERT INTO schema_version (Version, Description) VALUES (?, ?)",
+                         (step_version, description))
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        applied.append(step_version)
+
+    return applied
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    before = current_version(conn)
+    applied = migrate(conn)
+    conn.close()
+    if applied:
+        print(f"Schema upgraded from version {before} to {applied[-1]}.")
+    else:
+        print(f"Schema is up to date (version {before}).")
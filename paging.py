@@ -0,0 +1,154 @@
+from data_access import fetch_built
+
+
+class KeysetPager:
+    """
+    Keyset (seek) pagination over an ordered query. Each page is fetched with
+    `WHERE keys after (last seen keys) ORDER BY keys LIMIT n`, so every page
+    costs an index seek whatever its position, and only the current page is
+    held in memory.
+
+    `columns` and `from_clause` describe the listing, `keys` are the ORDER BY
+    columns (the last one must be unique and NOT NULL, usually the primary
+    key) and `where` is an optional filter with its `params`.
+
+    Earlier keys may be NULL. NULL sorts before every value, as it does in
+    SQLite's own ORDER BY, and the rows after a cursor are read as a few
+    runs, each an equality prefix plus one range, so a NULL key is compared
+    with IS NULL instead of a row value that would never match.
+    """
+
+    def __init__(self, conn, columns, from_clause, keys, where=None, params=(),
+                 page_size=20, descending=False):
+        self.conn = conn
+        self.columns = columns
+        self.from_clause = from_clause
+        self.keys = keys
+        self.where = where
+        self.params = tuple(params)
+        self.page_size = page_size
+        self.descending = descending
+        self.page_number = 0
+        self._first_key = None
+        self._last_key = None
+        self._has_next = True
+
+    def _runs(self, after, forward):
+        """
+        (conditions, params) for each run of rows that follows the key values
+        `after`, in order: rows that tie on every key but the last and
+        follow on it first, then those that tie on one key fewer, and so on.
+        """
+        runs = []
+        for i in reversed(range(len(self.keys))):
+            prefix, prefix_params = [], []
+            for key, value in zip(self.keys[:i], after[:i]):
+                if value is None:
+                    prefix.append(f"{key} IS NULL")
+                else:
+                    prefix.append(f"{key} = ?")
+                    prefix_params.append(value)
+            key, value = self.keys[i], after[i]
+            if forward:
+                steps = [(f"{key} IS NOT NULL", [])] if value is None else [(f"{key} > ?", [value])]
+            else:
+                steps = [] if value is None else [(f"{key} < ?", [value]), (f"{key} IS NULL", [])]
+            runs.extend((prefix + [condition], prefix_params + params) for condition, params in steps)
+        return runs
+
+    def _query(self, conditions, params, forward, limit):
+        args = (tuple(self.columns), self.from_clause, tuple(self.keys), self.where, tuple(conditions),
+                "ASC" if forward else "DESC")
+        return fetch_built(self.conn, 'keyset_page', args, [*self.params, *params, limit])
+
+    def _fetch(self, after=None, backwards=False):
+        forward = self.descending == backwards
+        wanted = self.page_size + 1
+        if after is None:
+            rows = self._query([], [], forward, wanted)
+        else:
+            rows = []
+            for conditions, params in self._runs(after, forward):
+                rows.extend(self._query(conditions, params, forward, wanted - len(rows)))
+                if len(rows) == wanted:
+                    break
+
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+        return rows, more
+
+    def _page(self, rows):
+        width = len(self.columns)
+        if rows:
+            self._first_key = rows[0][width:]
+            self._last_key = rows[-1][width:]
+        return [row[:width] for row in rows]
+
+    def first_page(self):
+        rows, self._has_next = self._fetch()
+        self.page_number = 1
+        return self._page(rows)
+
+    def next_page(self):
+        """Return the next page, or [] (staying put) when on the last page."""
+        if self.page_number == 0:
+            return self.first_page()
+        if not self._has_next:
+            return []
+        rows, self._has_next = self._fetch(self._last_key)
+        self.page_number += 1
+        return self._page(rows)
+
+    def prev_page(self):
+        """Return the previous page, or [] (staying put) when on the first page."""
+        if self.page_number <= 1:
+            return []
+        rows, _ = self._fetch(self._first_key, backwards=True)
+        self._has_next = True
+        self.page_number -= 1
+        return self._page(rows)
+
+    @property
+    def has_next(self):
+        return self._has_next
+
+    @property
+    def has_prev(self):
+        return self.page_number > 1
+
+
+def browse(pager, show_row, header=None):
+    """
+    Interactive listing: show one page at a time with next/previous navigation.
+    `show_row` prints a single row; `header` (optional) prints column titles.
+    """
+    page = pager.first_page()
+    if not page:
+        return False
+
+    while True:
+        if header:
+            header()
+        for row in page:
+            show_row(row)
+        print(f"-- Page {pager.page_number} --")
+
+        options = []
+        if pager.has_next:
+            options.append("n] Next page")
+        if pager.has_prev:
+            options.append("p] Previous page")
+        options.append("q] Done")
+        print("  ".join(options))
+        choice = input("Enter your option: ").strip().lower()
+
+        if choice == 'n' and pager.has_next:
+            page = pager.next_page() or page
+        elif choice == 'p' and pager.has_prev:
+            page = pager.prev_page() or page
+        elif choice == 'q':
+            return True
+        else:
+            print("Invalid option.")
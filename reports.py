@@ -0,0 +1,244 @@
+import argparse
+import json
+import sys
+from datetime import date, timedelta
+
+from connection import DB_PATH, connect
+from data_access import fetch_chunks, fetch_data
+from migrations import init_schema
+
+# NumPy is optional and slow to import, so it is loaded by the first report
+np = None
+
+# Rows fetched per round trip while loading columns into arrays
+CHUNK_ROWS = 250000
+
+# Outstanding bills are aged into these buckets (upper bounds in days)
+AGING_BUCKETS = [(30, "0-30 days"), (60, "31-60 days"), (90, "61-90 days")]
+AGING_OVERDUE = "over 90 days"
+
+
+class ReportError(Exception):
+    pass
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ReportError("Reports need NumPy, which is not installed. Install it with: pip install numpy")
+        np = numpy
+
+
+def _day(value):
+    """ISO date (or date) -> days since the epoch."""
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return (value - date(1970, 1, 1)).days
+
+
+def _iso(day):
+    return (date(1970, 1, 1) + timedelta(days=int(day))).isoformat()
+
+
+def _date_range(since, until):
+    """The (since, until) parameters of the report queries, as ISO dates or None."""
+    return tuple(date.fromisoformat(day).isoformat() if day else None for day in (since, until))
+
+
+def load_columns(conn, name, params, dtype, args=None, chunk_rows=CHUNK_ROWS):
+    """Run a registered query and load its rows into a structured array, `chunk_rows` at a time."""
+    chunks = [np.array(rows, dtype=dtype) for rows in fetch_chunks(conn, name, params, chunk_rows, args)]
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+
+
+def load_bills(conn, since=None, until=None):
+    """Bill columns as arrays: type code, amount, day, paid flag. Returns (types, bills)."""
+    dates = _date_range(since, until)
+    types = [row[0] for row in fetch_data(conn, 'report_bill_types', dates)]
+    code_params = [value for code, name in enumerate(types) for value in (name, code)]
+    dtype = [('type', 'i2'), ('amount', 'f8'), ('day', 'i4'), ('paid', 'i1')]
+    return types, load_columns(conn, 'report_bills', dates + tuple(code_params), dtype, args=(len(types),))
+
+
+def load_appointments(conn, since=None, until=None):
+    """Current and archived appointments (the scheduler moves old ones to AppointmentArchive)."""
+    return load_columns(conn, 'report_appointments', _date_range(since, until), [('doctor', 'i8'), ('day', 'i4')])
+
+
+def load_treatments(conn, since=None, until=None):
+    return load_columns(conn, 'report_treatments', _date_range(since, until), [('doctor', 'i8')])
+
+
+def _sum_by(codes, weights, size):
+    return np.bincount(codes, weights=weights, minlength=size)[:size]
+
+
+def revenue_by_type(types, bills):
+    known = bills['type'] >= 0
+    codes, amount, paid = bills['type'][known], bills['amount'][known], bills['paid'][known].astype(bool)
+    billed = _sum_by(codes, amount, len(types))
+    collected = _sum_by(codes, np.where(paid, amount, 0.0), len(types))
+    counts = _sum_by(codes, None, len(types))
+    return [{'bill_type': name, 'bills': int(counts[i]), 'billed': round(float(billed[i]), 2),
+             'collected': round(float(collected[i]), 2),
+             'outstanding': round(float(billed[i] - collected[i]), 2),
+             'collection_rate': round(float(collected[i] / billed[i]), 4) if billed[i] else None}
+            for i, name in enumerate(types)]
+
+
+def _revenue_by_period(periods, bills):
+    """Group bills by an integer period (day number or week start)."""
+    keys, inverse = np.unique(periods, return_inverse=True)
+    amount, paid = bills['amount'], bills['paid'].astype(bool)
+    billed = np.bincount(inverse, weights=amount, minlength=len(keys))
+    collected = np.bincount(inverse, weights=np.where(paid, amount, 0.0), minlength=len(keys))
+    return [{'date': _iso(key), 'billed': round(float(b), 2), 'collected': round(float(c), 2)}
+            for key, b, c in zip(keys, billed, collected)]
+
+
+def revenue_by_day(bills):
+    dated = bills[bills['day'] >= 0]
+    return _revenue_by_period(dated['day'], dated)
+
+
+def revenue_by_week(bills):
+    """Weeks start on Monday; 1970-01-01 was a Thursday."""
+    dated = bills[bills['day'] >= 0]
+    return _revenue_by_period(dated['day'] - (dated['day'] + 3) % 7, dated)
+
+
+def outstanding_aging(bills, today=None):
+    today = _day(today or date.today())
+    unpaid = bills[(bills['paid'] == 0) & (bills['day'] >= 0)]
+    age = np.maximum(today - unpaid['day'], 0)
+    bounds = np.array([limit for limit, _ in AGING_BUCKETS])
+    bucket = np.searchsorted(bounds, age, side='left')
+    labels = [label for _, label in AGING_BUCKETS] + [AGING_OVERDUE]
+    amounts = _sum_by(bucket, unpaid['amount'], len(labels))
+    counts = _sum_by(bucket, None, len(labels))
+    return [{'bucket': label, 'bills': int(counts[i]), 'amount': round(float(amounts[i]), 2)}
+            for i, label in enumerate(labels)]
+
+
+def revenue_by_doctor(conn, appointments, treatments):
+    """
+    Appointments, their booked value and treatments per doctor. Bills carry
+    no DoctorID, so the booked value is appointments x the doctor's current
+    AppointmentCost, not what was billed or collected.
+    """
+    doctors = fetch_data(conn, 'report_doctors')
+    if not doctors:
+        return []
+    size = max(max(d[0] for d in doctors), int(appointments['doctor'].max(initial=0)),
+               int(treatments['doctor'].max(initial=0))) + 1
+    cost = np.zeros(size)
+    cost[[d[0] for d in doctors]] = [d[2] for d in doctors]
+    booked = np.bincount(appointments['doctor'], minlength=size)
+    value = np.bincount(appointments['doctor'], weights=cost[appointments['doctor']], minlength=size)
+    treated = np.bincount(treatments['doctor'], minlength=size)
+    rows = [{'doctor_id': doctor_id, 'name': name, 'appointments': int(booked[doctor_id]),
+             'booked_value': round(float(value[doctor_id]), 2), 'treatments': int(treated[doctor_id])}
+            for doctor_id, name, _ in doctors]
+    return sorted(rows, key=lambda row: row['booked_value'], reverse=True)
+
+
+def build_report(conn, since=None, until=None, today=None):
+    """Load the billing columns once and compute every report from the arrays."""
+    _require_numpy()
+    types, bills = load_bills(conn, since, until)
+    appointments = load_appointments(conn, since, until)
+    treatments = load_treatments(conn, since, until)
+
+    billed = float(bills['amount'].sum())
+    collected = float(bills['amount'][bills['paid'] == 1].sum())
+    return {
+        'since': since,
+        'until': until,
+        'totals': {'bills': int(len(bills)), 'billed': round(billed, 2), 'collected': round(collected, 2),
+                   'outstanding': round(billed - collected, 2),
+                   'collection_rate': round(collected / billed, 4) if billed else None},
+        'by_type': revenue_by_type(types, bills),
+        'by_day': revenue_by_day(bills),
+        'by_week': revenue_by_week(bills),
+        'by_doctor': revenue_by_doctor(conn, appointments, treatments),
+        'aging': outstanding_aging(bills, today),
+        # All-time totals, kept by triggers on BillItem
+        'top_medicines': [{'medicine_id': r[0], 'name': r[1], 'units_sold': r[2], 'revenue': r[3]}
+                          for r in fetch_data(conn, 'top_medicines', (10,))],
+    }
+
+
+def _rate(value):
+    return "-" if value is None else f"{value * 100:.1f}%"
+
+
+def print_report(report, out=sys.stdout, top=10, recent=14):
+    """Plain-text version of build_report() for the admin menu and the CLI."""
+    totals = report['totals']
+    span = f"{report['since'] or 'beginning'} to {report['until'] or 'today'}"
+    print(f"\nRevenue report ({span})", file=out)
+    print(f"Bills: {totals['bills']}, billed: ${totals['billed']:,.2f}, collected: ${totals['collected']:,.2f}, "
+          f"outstanding: ${totals['outstanding']:,.2f}, collection rate: {_rate(totals['collection_rate'])}",
+          file=out)
+
+    print(f"\n{'Bill type':<15} | {'Bills':>8} | {'Billed':>14} | {'Collected':>14} | {'Rate':>7}", file=out)
+    print("-" * 68, file=out)
+    for row in report['by_type']:
+        print(f"{str(row['bill_type']):<15} | {row['bills']:>8} | {row['billed']:>14,.2f} | "
+              f"{row['collected']:>14,.2f} | {_rate(row['collection_rate']):>7}", file=out)
+
+    for title, rows in (("Day", report['by_day'][-recent:]), ("Week of", report['by_week'][-recent:])):
+        print(f"\n{title:<12} | {'Billed':>14} | {'Collected':>14}", file=out)
+        print("-" * 46, file=out)
+        for row in rows:
+            print(f"{row['date']:<12} | {row['billed']:>14,.2f} | {row['collected']:>14,.2f}", file=out)
+
+    print(f"\n{'Doctor':<25} | {'Appointments':>12} | {'Booked value':>14} | {'Treatments':>10}", file=out)
+    print("-" * 71, file=out)
+    for row in report['by_doctor'][:top]:
+        print(f"{str(row['name'])[:25]:<25} | {row['appointments']:>12} | {row['booked_value']:>14,.2f} | "
+              f"{row['treatments']:>10}", file=out)
+
+    if report['top_medicines']:
+        print(f"\n{'Top medicine':<30} | {'Units':>8} | {'Revenue':>14}", file=out)
+        print("-" * 58, file=out)
+        for row in report['top_medicines'][:top]:
+            print(f"{str(row['name'])[:30]:<30} | {row['units_sold']:>8} | {row['revenue']:>14,.2f}", file=out)
+
+    print(f"\n{'Outstanding age':<15} | {'Bills':>8} | {'Amount':>14}", file=out)
+    print("-" * 43, file=out)
+    for row in report['aging']:
+        print(f"{row['bucket']:<15} | {row['bills']:>8} | {row['amount']:>14,.2f}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Revenue and billing reports")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--since', help="first date to include (YYYY-MM-DD)")
+    parser.add_argument('--until', help="last date to include (YYYY-MM-DD)")
+    parser.add_argument('--json', action='store_true', help="print the full report as JSON")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        init_schema(conn)
+        report = build_report(conn, args.since, args.until)
+    except ReportError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import threading
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+from data_access import fetch_data
+
+
+def _nights(start, end):
+    """ISO dates of the nights in [start, end)."""
+    night, last = date.fromisoformat(start), date.fromisoformat(end)
+    while night < last:
+        yield night.isoformat()
+        night += timedelta(days=1)
+
+
+class RoomAllocator:
+    """
+    In-memory occupancy index for room booking.
+
+    Each room keeps its active stays as a sorted list of (CheckIn, CheckOut,
+    StayID) with ISO dates, so they compare as plain text. A room's active
+    stays never overlap, which makes them sorted by CheckOut as well: the
+    only stay that can clash with nights [start, end) is the last one that
+    checks in before `end`, found with one bisect.
+
+    Free rooms are found without visiting rooms one by one. Rooms of a
+    RoomType are numbered in RoomID order, and every night with a stay has a
+    bitmask of that type's occupied rooms, like the slot masks in
+    availability.py. The rooms free for [start, end) are the bits set in none
+    of those nights' masks, lowest (smallest RoomID) first.
+
+    RoomStay is the authority: a booking re-checks the room inside its write
+    transaction (services.book_room). Triggers bump the 'RoomStay' version
+    in CatalogVersion on every change to stays or to the room list, so
+    bookings made by other processes are picked up with one primary-key
+    lookup, as with the leave calendar.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.rooms = {}
+        self.by_type = {}
+        self._bits = {}
+        self._stays = {}
+        self._occupied = {}
+        self._lock = threading.Lock()
+
+    def load(self, conn, today=None):
+        """Read every room and every stay that has not yet checked out."""
+        version = self._current_version(conn)
+        today = (today or date.today()).isoformat()
+        rooms, by_type, bits, stays, occupied = {}, {}, {}, {}, {}
+        for room_id, room_type, cost in fetch_data(conn, 'all_rooms'):
+            rooms[room_id] = (room_type, cost)
+            type_rooms = by_type.setdefault(room_type, [])
+            bits[room_id] = 1 << len(type_rooms)
+            type_rooms.append(room_id)
+        for room_id, check_in, check_out, stay_id in fetch_data(conn, 'active_room_stays', (today,)):
+            stays.setdefault(room_id, []).append((check_in, check_out, stay_id))
+            if room_id in rooms:
+                masks = occupied.setdefault(rooms[room_id][0], {})
+                for night in _nights(max(check_in, today), check_out):
+                    masks[night] = masks.get(night, 0) | bits[room_id]
+        for room_stays in stays.values():
+            room_stays.sort()
+        with self._lock:
+            self.rooms, self.by_type, self._bits = rooms, by_type, bits
+            self._stays, self._occupied, self.version = stays, occupied, version
+
+    @staticmethod
+    def _current_version(conn):
+        row = fetch_data(conn, 'catalog_version', ('RoomStay',))
+        return row[0][0] if row else None
+
+    def ensure_current(self, conn):
+        """Reload if rooms or stays changed since the last load."""
+        if self.version is None or self._current_version(conn) != self.version:
+            self.load(conn)
+
+    def invalidate(self):
+        """Reload on next use; call after a rollback."""
+        self.version = None
+
+    def room_types(self):
+        return sorted(self.by_type)
+
+    def is_free(self, room_id, start, end):
+        """True if no active stay of the room overlaps nights [start, end)."""
+        stays = self._stays.get(room_id, ())
+        i = bisect_left(stays, (end,))
+        return i == 0 or stays[i - 1][1] <= start
+
+    def free_rooms(self, room_type, start, end, limit=None):
+        """RoomIDs of `room_type` free for every night in [start, end)."""
+        with self._lock:
+            type_rooms = self.by_type.get(room_type, ())
+            masks = self._occupied.get(room_type, {})
+            busy = 0
+            for night in _nights(start, end):
+                busy |= masks.get(night, 0)
+            free = ((1 << len(type_rooms)) - 1) & ~busy
+            found = []
+            while free and len(found) != limit:
+                low = free & -free
+                found.append(type_rooms[low.bit_length() - 1])
+                free ^= low
+            return found
+
+    def _mark(self, room_id, start, end, occupied):
+        room_type, bit = self.rooms[room_id][0], self._bits[room_id]
+        masks = self._occupied.setdefault(room_type, {})
+        for night in _nights(start, end):
+            mask = masks.get(night, 0) | bit if occupied else masks.get(night, 0) & ~bit
+            if mask:
+                masks[night] = mask
+            else:
+                masks.pop(night, None)
+
+    def add_stay(self, room_id, start, end, stay_id):
+        with self._lock:
+            insort(self._stays.setdefault(room_id, []), (start, end, stay_id))
+            if room_id in self.rooms:
+                self._mark(room_id, start, end, True)
+
+    def remove_stay(self, room_id, stay_id):
+        with self._lock:
+            stays = self._stays.get(room_id, [])
+            removed = [stay for stay in stays if stay[2] == stay_id]
+            stays[:] = [stay for stay in stays if stay[2] != stay_id]
+            if room_id in self.rooms:
+                # A room's active stays never overlap, so their nights are its alone
+                for start, end, _ in removed:
+                    self._mark(room_id, start, end, False)
+
+
+room_allocator = RoomAllocator()
@@ -0,0 +1,229 @@
+import argparse
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from connection import DB_PATH, DEFAULT_PROFILE, connect
+from data_access import execute_query
+from migrations import init_schema
+from rooms import room_allocator
+from transactions import retry_on_busy, transaction
+
+# Appointments are moved to AppointmentArchive this many days after their date
+ARCHIVE_AFTER_DAYS = 30
+
+# Longest the scheduler thread sleeps between checks for due jobs (seconds)
+MAX_SLEEP = 60
+
+
+# Jobs: each takes (conn, today) and runs inside its own transaction.
+# They return the number of rows changed.
+
+def expire_leaves(conn, today):
+    """
+    Close leaves whose dates have passed. Approved leaves take effect by date
+    through the leave calendar, so only their end needs a state change.
+    """
+    today = today.isoformat()
+    expired = execute_query(conn, 'expire_pending_leaves', (today,)).rowcount
+    return expired + execute_query(conn, 'complete_leaves', (today,)).rowcount
+
+
+def archive_appointments(conn, today):
+    cutoff = (today - timedelta(days=ARCHIVE_AFTER_DAYS)).isoformat()
+    execute_query(conn, 'archive_appointments', (cutoff,))
+    return execute_query(conn, 'delete_archived_appointments', (cutoff,)).rowcount
+
+
+def release_rooms(conn, today):
+    """Discharge stays that reached their check-out date and refresh room status."""
+    ended = execute_query(conn, 'end_past_room_stays', (today.isoformat(),)).rowcount
+    execute_query(conn, 'sync_room_status', (today.isoformat(),))
+    if ended:
+        # Drop the finished stays from this process's allocator
+        room_allocator.invalidate()
+    return ended
+
+
+def recompute_summaries(conn, today):
+    """Rebuild the trigger-maintained summaries from their base tables."""
+    changed = execute_query(conn, 'recompute_patient_balance').rowcount
+    execute_query(conn, 'clear_medicine_sales')
+    return changed + execute_query(conn, 'recompute_medicine_sales').rowcount
+
+
+class Job:
+    def __init__(self, name, func, interval, delay=0.0):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.next_run = time.monotonic() + delay
+        self.runs = 0
+        self.failures = 0
+        self.rows = 0
+        self.last_rows = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_run = None
+        self.last_error = None
+
+    def metrics(self):
+        return {'job': self.name, 'interval': self.interval, 'runs': self.runs, 'failures': self.failures,
+                'rows': self.rows, 'last_rows': self.last_rows,
+                'avg_seconds': self.total_seconds / self.runs if self.runs else 0.0,
+                'max_seconds': self.max_seconds, 'last_run': self.last_run, 'last_error': self.last_error}
+
+
+class Scheduler:
+    """
+    Runs registered periodic jobs on a background thread with its own
+    connection. Each run is one transaction, retried while the database is
+    busy; a failing job is recorded in its metrics and tried again at its
+    next interval. Jobs are due once at start() unless given a delay.
+    """
+
+    def __init__(self, path=DB_PATH, profile=DEFAULT_PROFILE):
+        self.path = path
+        self.profile = profile
+        self.jobs = {}
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, func, interval, delay=0.0):
+        """Run func(conn, today) every `interval` seconds."""
+        with self._lock:
+            self.jobs[name] = Job(name, func, interval, delay)
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = connect(self.path, self.profile)
+        return self._conn
+
+    def run_job(self, name):
+        """Run one job now, whatever its schedule. Returns rows changed, or None on failure."""
+        job = self.jobs[name]
+        conn = self._connection()
+
+        def run():
+            with transaction(conn):
+                return job.func(conn, date.today())
+
+        started = time.perf_counter()
+        try:
+            rows = retry_on_busy(run)
+        except Exception as e:
+            rows = None
+            with self._lock:
+                job.failures += 1
+                job.last_error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            job.runs += 1
+            job.total_seconds += elapsed
+            job.max_seconds = max(job.max_seconds, elapsed)
+            job.last_run = datetime.now().isoformat(timespec='seconds')
+            job.next_run = time.monotonic() + job.interval
+            if rows is not None:
+                job.rows += rows
+                job.last_rows = rows
+                job.last_error = None
+        return rows
+
+    def run_pending(self):
+        """Run every due job; returns the seconds until the next one is due."""
+        for job in list(self.jobs.values()):
+            if job.next_run <= time.monotonic() and not self._stop.is_set():
+                self.run_job(job.name)
+        with self._lock:
+            upcoming = min((job.next_run for job in self.jobs.values()), default=time.monotonic() + MAX_SLEEP)
+        return max(0.0, upcoming - time.monotonic())
+
+    def _loop(self):
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(min(self.run_pending(), MAX_SLEEP))
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        elif self._conn is not None:
+            # Jobs run with run_job() and no thread: the loop never closed it
+            self._conn.close()
+            self._conn = None
+
+    def metrics(self):
+        with self._lock:
+            return [job.metrics() for job in self.jobs.values()]
+
+
+def default_scheduler(path=DB_PATH, profile=DEFAULT_PROFILE):
+    """A scheduler with the hospital's housekeeping jobs registered."""
+    scheduler = Scheduler(path, profile)
+    scheduler.register('expire_leaves', expire_leaves, 3600)
+    scheduler.register('archive_appointments', archive_appointments, 6 * 3600)
+    scheduler.register('release_rooms', release_rooms, 900)
+    # A full rebuild; the triggers keep the summaries right in between
+    scheduler.register('recompute_summaries', recompute_summaries, 24 * 3600, delay=3600)
+    return scheduler
+
+
+def print_metrics(metrics, out=sys.stdout):
+    print(f"\n{'Job':<22} | {'Runs':>5} | {'Failed':>6} | {'Rows':>8} | {'Avg ms':>8} | {'Max ms':>8} | Last run",
+          file=out)
+    print("-" * 92, file=out)
+    for m in metrics:
+        print(f"{m['job']:<22} | {m['runs']:>5} | {m['failures']:>6} | {m['rows']:>8} | "
+              f"{m['avg_seconds'] * 1000:>8.1f} | {m['max_seconds'] * 1000:>8.1f} | {m['last_run'] or '-'}",
+              file=out)
+        if m['last_error']:
+            print(f"    last error: {m['last_error']}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the hospital housekeeping jobs")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--job', action='append', help="run only this job (repeatable)")
+    parser.add_argument('--forever', action='store_true', help="keep running jobs on their schedule")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    init_schema(conn)
+    conn.close()
+
+    scheduler = default_scheduler(args.db)
+    if args.forever:
+        scheduler.start()
+        try:
+            while True:
+                time.sleep(MAX_SLEEP)
+        except KeyboardInterrupt:
+            scheduler.stop()
+    else:
+        for name in args.job or list(scheduler.jobs):
+            if name not in scheduler.jobs:
+                print(f"unknown job {name!r}; jobs: {', '.join(scheduler.jobs)}", file=sys.stderr)
+                return 2
+            scheduler.run_job(name)
+        scheduler.stop()
+    print_metrics(scheduler.metrics())
+    return 1 if any(m['last_error'] for m in scheduler.metrics()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import re
+
+from data_access import fetch_data
+
+# Full-text indexed columns per table (see migration 3)
+SEARCH_COLUMNS = {
+    'Patient': ['Name', 'MedicalHistory', 'Address'],
+    'Doctor': ['Name', 'Specialization'],
+    'Treatment': ['Diagnosis', 'TreatmentPlan', 'Medicines'],
+}
+
+
+def match_expression(text, columns=None):
+    """
+    Turn free text typed at a menu into a safe FTS5 query: every word must
+    match (as a prefix), optionally restricted to some columns.
+    Returns None when the text contains no searchable words.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    expression = " ".join(f'"{word}"*' for word in words)
+    if columns:
+        expression = "{" + " ".join(columns) + "} : (" + expression + ")"
+    return expression
+
+
+def search(conn, table, text, columns=None, limit=50):
+    """
+    Ranked full-text search over `table`. Returns full rows of the base table,
+    best match first.
+    """
+    expression = match_expression(text, columns)
+    if expression is None:
+        return []
+    return fetch_data(conn, f'fulltext_{table}', (expression, limit))
+
+
+def search_patients(conn, text, columns=None, limit=50):
+    return search(conn, 'Patient', text, columns, limit)
+
+
+def search_doctors(conn, text, columns=None, limit=50):
+    return search(conn, 'Doctor', text, columns, limit)
+
+
+def search_treatments(conn, text, columns=None, limit=50):
+    return search(conn, 'Treatment', text, columns, limit)
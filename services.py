@@ -0,0 +1,361 @@
+import sqlite3
+from datetime import date, timedelta
+
+from availability import ALL_SLOTS, doctor_calendar, slot_index
+from credentials import hash_password
+from data_access import execute_many, execute_query, fetch_data
+from dates import parse_date, to_iso
+from directory import directory
+from leaves import leave_calendar
+from rooms import room_allocator
+from transactions import retry_on_busy, transaction
+
+# How far ahead patients may book, and how early doctors must apply for leave
+BOOKING_WINDOW_DAYS = 21
+LEAVE_NOTICE_DAYS = 21
+# Longest single room stay that can be booked in one go
+MAX_STAY_NIGHTS = 90
+
+
+class ServiceError(Exception):
+    """A request that cannot be carried out; the message is shown to the user."""
+
+
+def to_date(value):
+    try:
+        return parse_date(value)
+    except ValueError:
+        raise ServiceError(f"Invalid date {value!r}, expected YYYY-MM-DD.")
+
+
+def iso_date(value):
+    """Stored form of an optional date such as a DOB; ServiceError if unreadable."""
+    try:
+        return to_iso(value)
+    except ValueError:
+        raise ServiceError(f"Invalid date {value!r}, expected YYYY-MM-DD.")
+
+
+# Doctors
+
+def list_doctors(conn, specialization=None):
+    if specialization:
+        rows = directory.fetch(conn, 'active_doctors_by_specialization', (specialization,))
+        return [{'doctor_id': r[0], 'name': r[1], 'specialization': specialization,
+                 'years_of_experience': r[2], 'appointment_cost': r[3]} for r in rows]
+    rows = directory.fetch(conn, 'active_doctors')
+    return [{'doctor_id': r[0], 'name': r[1], 'specialization': r[2]} for r in rows]
+
+
+def doctor_availability(conn, doctor_id, start_date=None, days=BOOKING_WINDOW_DAYS):
+    start_date = to_date(start_date) if start_date else date.today()
+    return [{'date': day.isoformat(), 'booked': booked, 'free_slots': free, 'on_leave': on_leave}
+            for day, booked, free, on_leave in doctor_calendar(conn, doctor_id, start_date, days)]
+
+
+def create_doctor(conn, password, name, dob, gender, specialization, phone, email, address, experience):
+    """Create a doctor's login and profile together. Returns the new UserID."""
+    dob = iso_date(dob)
+    with transaction(conn):
+        user_id = execute_query(conn, 'insert_credentials', (hash_password(password), 'Doctor')).lastrowid
+        execute_query(conn, 'insert_doctor', (name, dob, gender, specialization, phone, email,
+                                              address, experience, 'Active'))
+    directory.invalidate()
+    return user_id
+
+
+# Patients
+
+def create_patient(conn, password, name, dob, weight, height, gender, phone, email, address,
+                   medical_history, same_id=False):
+    """
+    Create a patient's login and record together. Returns the new UserID.
+    With same_id the PatientID is set to the UserID (self sign-in).
+    """
+    dob = iso_date(dob)
+    with transaction(conn):
+        user_id = execute_query(conn, 'insert_credentials', (hash_password(password), 'Patient')).lastrowid
+        if same_id:
+            execute_query(conn, 'insert_patient_with_id', (user_id, name, dob, weight, height, gender,
+                                                           phone, email, address, medical_history))
+        else:
+            execute_query(conn, 'insert_patient', (name, dob, weight, height, gender, phone, email,
+                                                   address, medical_history))
+    return user_id
+
+
+def patient_treatments(conn, patient_id):
+    rows = fetch_data(conn, 'treatment_by_PatientID', (patient_id,))
+    return [{'treatment_id': r[0], 'patient_id': r[1], 'doctor_id': r[2], 'diagnosis': r[3],
+             'treatment_plan': r[4], 'medicines': r[5], 'start_date': r[6], 'end_date': r[7]}
+            for r in rows]
+
+
+# Appointments
+
+def book_appointment(conn, patient_id, doctor_id, day, time, purpose="Regular checkup"):
+    """
+    Book a slot and raise its bill in one transaction. The unique index on
+    Appointment (DoctorID, Date, Time) guarantees a slot is only sold once:
+    the insert itself fails if another booker got there first. Leave is
+    checked under the same write lock, so an approval cannot slip in between.
+    A busy database is retried with jittered backoff.
+    """
+    day = to_date(day)
+    today = date.today()
+    if not today <= day < today + timedelta(days=BOOKING_WINDOW_DAYS):
+        raise ServiceError(f"Please select a date within the next {BOOKING_WINDOW_DAYS} days.")
+    if time not in ALL_SLOTS:
+        raise ServiceError(f"Invalid time slot {time!r}.")
+
+    doctor = directory.fetch(conn, 'active_doctor_cost', (doctor_id,))
+    if not doctor:
+        raise ServiceError("Invalid Doctor ID.")
+    cost = doctor[0][1]
+
+    def book():
+        with transaction(conn):
+            leave_calendar.ensure_current(conn)
+            if leave_calendar.is_on_leave(doctor_id, day):
+                raise ServiceError("The doctor is on leave on that date. Please select another date.")
+            appointment_id = execute_query(conn, 'insert_appointment',
+                                           (patient_id, doctor_id, day.isoformat(), time, purpose)).lastrowid
+            bill_id = execute_query(conn, 'insert_bill', (patient_id, 'Appointment', cost, day.isoformat())).lastrowid
+        return appointment_id, bill_id
+
+    try:
+        # Inside an enclosing transaction the lock is already held: no retry
+        if conn.unit_of_work_depth:
+            appointment_id, bill_id = book()
+        else:
+            appointment_id, bill_id = retry_on_busy(book)
+    except sqlite3.IntegrityError:
+        slot_index.mark_booked(doctor_id, day, time)
+        raise ServiceError("Sorry, this slot has just been booked by another patient.")
+    slot_index.mark_booked(doctor_id, day, time)
+
+    return {'appointment_id': appointment_id, 'bill_id': bill_id, 'doctor_id': int(doctor_id),
+            'date': day.isoformat(), 'time': time, 'cost': cost}
+
+
+# Bills
+
+def patient_bills(conn, patient_id, unpaid_only=False):
+    if unpaid_only:
+        rows = fetch_data(conn, 'unpaid_bills', (patient_id,))
+        return [{'bill_id': r[0], 'amount': r[1], 'bill_type': r[2], 'date': r[3],
+                 'payment_status': 'Pending'} for r in rows]
+    rows = fetch_data(conn, 'patient_bills', (patient_id,))
+    return [{'bill_id': r[0], 'amount': r[1], 'bill_type': r[2], 'date': r[3],
+             'payment_status': r[4]} for r in rows]
+
+
+def patient_balance(conn, patient_id):
+    """Outstanding total and dunning details, read from the PatientBalance summary."""
+    row = fetch_data(conn, 'patient_balance', (patient_id,))
+    outstanding, pending_count, oldest_pending, last_payment = row[0] if row else (0, 0, None, None)
+    return {'patient_id': int(patient_id), 'outstanding': outstanding, 'pending_count': pending_count,
+            'oldest_pending': oldest_pending, 'last_payment': last_payment}
+
+
+def pending_bill_amount(conn, patient_id, bill_id):
+    result = fetch_data(conn, 'pending_bill_amount', (bill_id, patient_id))
+    if not result:
+        raise ServiceError("Invalid BillID or bill is already paid.")
+    return result[0][0]
+
+
+def pay_bill(conn, patient_id, bill_id):
+    with transaction(conn):
+        amount = pending_bill_amount(conn, patient_id, bill_id)
+        execute_query(conn, 'pay_bill', (bill_id,))
+    return {'bill_id': int(bill_id), 'amount': amount, 'payment_status': 'Paid'}
+
+
+# Rooms
+
+def _stay_dates(check_in, nights):
+    check_in = to_date(check_in)
+    nights = int(nights)
+    if check_in < date.today():
+        raise ServiceError("Check-in date cannot be in the past.")
+    if not 1 <= nights <= MAX_STAY_NIGHTS:
+        raise ServiceError(f"A stay must be between 1 and {MAX_STAY_NIGHTS} nights.")
+    return check_in.isoformat(), (check_in + timedelta(days=nights)).isoformat()
+
+
+def room_availability(conn, check_in=None, nights=1):
+    """Free rooms per RoomType for the nights from `check_in` (default tonight)."""
+    start, end = _stay_dates(check_in or date.today(), nights)
+    room_allocator.ensure_current(conn)
+    result = []
+    for room_type in room_allocator.room_types():
+        free = room_allocator.free_rooms(room_type, start, end)
+        result.append({'room_type': room_type, 'free_rooms': free,
+                       'cost': [room_allocator.rooms[room_id][1] for room_id in free]})
+    return result
+
+
+def book_room(conn, patient_id, room_type, check_in, nights=1, room_id=None):
+    """
+    Book a room of `room_type` (a specific `room_id`, or the first free one)
+    for `nights` nights and raise its bill, in one transaction. Candidates
+    come from the in-memory allocator and each is re-checked against RoomStay
+    under the write lock, so two bookers can never hold the same room-night.
+    """
+    start, end = _stay_dates(check_in, nights)
+    nights = int(nights)
+    room_allocator.ensure_current(conn)
+    if room_id is not None:
+        room_id = int(room_id)
+        if room_allocator.rooms.get(room_id, (None,))[0] != room_type:
+            raise ServiceError(f"Room {room_id} is not a {room_type} room.")
+        candidates = [room_id] if room_allocator.is_free(room_id, start, end) else []
+    else:
+        candidates = room_allocator.free_rooms(room_type, start, end)
+    if not candidates:
+        raise ServiceError(f"No {room_type} room is free for those dates.")
+    tonight = date.today().isoformat()
+
+    def book():
+        with transaction(conn):
+            for candidate in candidates:
+                if fetch_data(conn, 'room_stay_overlap', (candidate, end, start)):
+                    continue
+                cost = round(room_allocator.rooms[candidate][1] * nights, 2)
+                bill_id = execute_query(conn, 'insert_bill', (patient_id, 'Room', cost, start)).lastrowid
+                stay_id = execute_query(conn, 'insert_room_stay',
+                                        (candidate, patient_id, start, end, bill_id)).lastrowid
+                if start <= tonight:
+                    execute_query(conn, 'set_room_status', ('Occupied', candidate))
+                return candidate, stay_id, bill_id, cost
+        return None
+
+    booked = book() if conn.unit_of_work_depth else retry_on_busy(book)
+    if booked is None:
+        # Every candidate was taken by another process: our picture is stale
+        room_allocator.invalidate()
+        raise ServiceError("Sorry, that room has just been booked by another patient.")
+    room_id, stay_id, bill_id, cost = booked
+    room_allocator.add_stay(room_id, start, end, stay_id)
+    return {'stay_id': stay_id, 'room_id': room_id, 'room_type': room_type, 'check_in': start,
+            'check_out': end, 'bill_id': bill_id, 'cost': cost}
+
+
+def patient_room_stays(conn, patient_id):
+    rows = fetch_data(conn, 'patient_room_stays', (patient_id,))
+    return [{'stay_id': r[0], 'room_id': r[1], 'room_type': r[2], 'check_in': r[3], 'check_out': r[4]}
+            for r in rows]
+
+
+def end_stay(conn, stay_id):
+    """
+    Give a stay's room back. A stay that has not started yet is 'Released';
+    one in progress is 'Discharged' with its CheckOut moved up to today.
+    """
+    today = date.today().isoformat()
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    with transaction(conn):
+        row = fetch_data(conn, 'room_stay_by_id', (stay_id,))
+        if not row or row[0][5] != 'Active':
+            raise ServiceError("Stay ID not found or the room is already released.")
+        _, room_id, _, check_in, check_out, _ = row[0]
+        if check_in > today:
+            status = 'Released'
+        else:
+            status, check_out = 'Discharged', min(check_out, today)
+        execute_query(conn, 'end_room_stay', (status, check_out, stay_id))
+        if not fetch_data(conn, 'room_stay_overlap', (room_id, tomorrow, today)):
+            execute_query(conn, 'set_room_status', ('Available', room_id))
+    room_allocator.remove_stay(room_id, int(stay_id))
+    return {'stay_id': int(stay_id), 'room_id': room_id, 'status': status, 'check_out': check_out}
+
+
+def discharge_patient(conn, patient_id):
+    """End every stay the patient has started; later bookings are kept."""
+    today = date.today().isoformat()
+    with transaction(conn):
+        return [end_stay(conn, stay['stay_id']) for stay in patient_room_stays(conn, patient_id)
+                if stay['check_in'] <= today]
+
+
+# Pharmacy
+
+def checkout_medicines(conn, patient_id, items):
+    """
+    Bill a cart of (medicine_id, quantity) pairs at current catalog prices:
+    one Bill header plus one BillItem per medicine, written together.
+    """
+    quantities = {}
+    for medicine_id, quantity in items:
+        quantity = int(quantity)
+        if quantity <= 0:
+            raise ServiceError("Quantities must be at least 1.")
+        quantities[int(medicine_id)] = quantities.get(int(medicine_id), 0) + quantity
+    if not quantities:
+        raise ServiceError("Cart is empty.")
+
+    today = date.today().isoformat()
+    with transaction(conn):
+        lines = []
+        for medicine_id, quantity in quantities.items():
+            row = fetch_data(conn, 'medicine_prices', (medicine_id,))
+            if not row:
+                raise ServiceError(f"Medicine {medicine_id} not found.")
+            lines.append((medicine_id, row[0][1], quantity, row[0][2]))
+        total = round(sum(quantity * price for _, _, quantity, price in lines), 2)
+        bill_id = execute_query(conn, 'insert_bill', (patient_id, 'Medicines', total, today)).lastrowid
+        execute_many(conn, 'insert_bill_item',
+                     [(bill_id, medicine_id, quantity, price) for medicine_id, _, quantity, price in lines])
+    return {'bill_id': bill_id, 'amount': total,
+            'items': [{'medicine_id': medicine_id, 'name': name, 'quantity': quantity, 'unit_price': price}
+                      for medicine_id, name, quantity, price in lines]}
+
+
+def top_medicines(conn, limit=10):
+    rows = fetch_data(conn, 'top_medicines', (limit,))
+    return [{'medicine_id': r[0], 'name': r[1], 'units_sold': r[2], 'revenue': r[3],
+             'orders': r[4], 'last_sold': r[5]} for r in rows]
+
+
+# Leaves
+
+def apply_leave(conn, doctor_id, select_date, return_date, reason):
+    select_date, return_date = to_date(select_date), to_date(return_date)
+    if select_date <= date.today() + timedelta(days=LEAVE_NOTICE_DAYS):
+        raise ServiceError("Invalid date. Please select a date at least 3 weeks from today.")
+    if return_date < select_date:
+        raise ServiceError("Return date must not be before the start date.")
+    no_of_days = (return_date - select_date).days + 1
+    leave_id = execute_query(conn, 'insert_leave', (doctor_id, select_date.isoformat(),
+                                                    return_date.isoformat(), no_of_days, reason)).lastrowid
+    return {'leave_id': leave_id, 'no_of_days': no_of_days, 'status': 'Pending'}
+
+
+def _pending_leave(conn, leave_id):
+    leave_info = fetch_data(conn, 'leave_by_id', (leave_id,))
+    if not leave_info:
+        raise ServiceError("Leave ID not found!")
+    if leave_info[0][2] != 'Pending':
+        raise ServiceError("This leave is not in pending state!")
+    return leave_info[0]
+
+
+def accept_leave(conn, leave_id):
+    """
+    Approve a leave. The doctor stays Active: booking consults the leave
+    calendar, so only the leave days themselves become unbookable.
+    Appointments already booked in the window are counted for follow-up.
+    """
+    with transaction(conn):
+        _, doctor_id, _, select_date, return_date = _pending_leave(conn, leave_id)
+        execute_query(conn, 'accept_leave', (leave_id,))
+        booked = fetch_data(conn, 'appointments_between', (doctor_id, select_date, return_date))[0][0]
+    return {'leave_id': int(leave_id), 'status': 'Accepted', 'appointments_affected': booked}
+
+
+def reject_leave(conn, leave_id):
+    with transaction(conn):
+        _pending_leave(conn, leave_id)
+        execute_query(conn, 'reject_leave', (leave_id,))
+    return {'leave_id': int(leave_id), 'status': 'Rejected'}
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import slot_index  # noqa: E402
+from catalog import medicine_index  # noqa: E402
+from connection import connect  # noqa: E402
+from data_access import reset_query_stats  # noqa: E402
+from directory import directory  # noqa: E402
+from instrumentation import sql_metrics  # noqa: E402
+from leaves import leave_calendar  # noqa: E402
+from migrations import init_schema  # noqa: E402
+from rooms import room_allocator  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(tmp_path):
+    """The in-process indexes are module globals; start every test with them empty."""
+    slot_index.invalidate()
+    directory.invalidate()
+    directory.version = None
+    room_allocator.invalidate()
+    leave_calendar.version = None
+    medicine_index.version = None
+    sql_metrics.reset()
+    reset_query_stats()
+    sql_metrics.slow_log = str(tmp_path / "slow_queries.log")
+    yield
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "hospital.db")
+    conn = connect(path)
+    init_schema(conn)
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = connect(db_path)
+    yield conn
+    conn.close()
+
+
+def add_doctor(conn, name="Dr. Emily Clark", specialization="Cardiologist", cost=800):
+    return conn.execute(
+        "INSERT INTO Doctor (Name, Specialization, AppointmentCost, WorkStatus) VALUES (?, ?, ?, 'Active')",
+        (name, specialization, cost)).lastrowid
+
+
+def add_patient(conn, name="John Doe"):
+    return conn.execute("INSERT INTO Patient (Name) VALUES (?)", (name,)).lastrowid
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+from api_server import ApiServer
+from conftest import add_doctor, add_patient
+from connection import connect
+
+
+def _request(method, target, body=None, token=None, headers=()):
+    data = json.dumps(body).encode() if body is not None else b""
+    head = [f"{method} {target} HTTP/1.1", "Host: test"]
+    if token:
+        head.append(f"Authorization: Bearer {token}")
+    head.extend(headers)
+    if not any(h.lower().startswith("content-length") for h in headers):
+        head.append(f"Content-Length: {len(data)}")
+    return ("\r\n".join(head) + "\r\n\r\n").encode() + data
+
+
+async def _read_response(reader):
+    head = (await reader.readuntil(b"\r\n\r\n")).decode('latin-1')
+    status = int(head.split(" ", 2)[1])
+    length = next(int(line.split(":", 1)[1]) for line in head.split("\r\n")
+                  if line.lower().startswith("content-length"))
+    return status, json.loads(await reader.readexactly(length))
+
+
+def _seed(db_path):
+    conn = connect(db_path)
+    doctor_id = add_doctor(conn)
+    patient_id = add_patient(conn)
+    other_id = add_patient(conn, "Jane Roe")
+    conn.execute("INSERT INTO LoginCredits (UserID, Password, UserType) VALUES (?, 'secret', 'Patient')",
+                 (patient_id,))
+    conn.commit()
+    conn.close()
+    return doctor_id, patient_id, other_id
+
+
+def test_pipelined_requests_need_a_token_and_stay_in_order(db_path):
+    doctor_id, patient_id, other_id = _seed(db_path)
+
+    async def scenario():
+        server = ApiServer(db_path, workers=2)
+        await server.start(port=0)
+        port = server.server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(_request('POST', '/login', {'user_id': patient_id, 'user_type': 'Patient',
+                                                     'password': 'secret'}))
+            writer.write(_request('GET', '/doctors'))
+            writer.write(_request('GET', '/doctors', token='not-a-token'))
+            await writer.drain()
+            login = await _read_response(reader)
+            no_token = await _read_response(reader)
+            bad_token = await _read_response(reader)
+
+            token = login[1]['token']
+            # One write, several requests: the answers come back in request order
+            writer.write(_request('GET', '/doctors', token=token)
+                         + _request('GET', f'/patients/{patient_id}/balance', token=token)
+                         + _request('GET', f'/patients/{other_id}/bills', token=token)
+                         + _request('POST', '/leaves/1/accept', {}, token=token)
+                         + _request('GET', f'/doctors/{doctor_id}/availability?days=1', token=token))
+            await writer.drain()
+            pipelined = [await _read_response(reader) for _ in range(5)]
+
+            writer.write(_request('GET', '/doctors', token=token, headers=["Content-Length: -5"]))
+            await writer.drain()
+            negative = await _read_response(reader)
+            writer.close()
+
+            # A kept-alive connection left idle must not hold up shutdown
+            idle_reader, idle_writer = await asyncio.open_connection('127.0.0.1', port)
+            await asyncio.sleep(0.05)
+        finally:
+            await server.close()
+        idle_writer.close()
+        return login, no_token, bad_token, pipelined, negative
+
+    errors = []
+    loop = asyncio.new_event_loop()
+    loop.set_exception_handler(lambda loop, context: errors.append(context))
+    try:
+        login, no_token, bad_token, pipelined, negative = loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+
+    assert login[0] == 200 and login[1]['token']
+    assert no_token[0] == 401
+    assert bad_token[0] == 401
+    assert [status for status, _ in pipelined] == [200, 200, 403, 403, 200]
+    assert negative[0] == 400
+    assert errors == []
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+import services
+from availability import ALL_SLOTS, doctor_calendar, slot_index
+from conftest import add_doctor, add_patient
+from instrumentation import sql_metrics
+
+
+def _loads():
+    metrics = sql_metrics.queries.get('doctor_booked_slots')
+    return metrics.latency.count if metrics else 0
+
+
+def test_calendar_reads_each_day_once(conn):
+    doctor_id = add_doctor(conn)
+    tomorrow = date.today() + timedelta(days=1)
+    conn.execute("INSERT INTO Appointment (PatientID, DoctorID, Date, Time) VALUES (1, ?, ?, '10:00')",
+                 (doctor_id, tomorrow.isoformat()))
+
+    first = doctor_calendar(conn, doctor_id)
+    assert _loads() == 1
+    assert first[1][1] == 1 and "10:00" not in first[1][2]
+
+    assert doctor_calendar(conn, doctor_id) == first
+    assert _loads() == 1
+
+    # Only the days past the cached window are read
+    doctor_calendar(conn, doctor_id, days=30)
+    assert _loads() == 2
+
+
+def test_booking_updates_the_cached_day(conn):
+    doctor_id, patient_id = add_doctor(conn), add_patient(conn)
+    tomorrow = date.today() + timedelta(days=1)
+    assert doctor_calendar(conn, doctor_id)[1][2] == ALL_SLOTS
+
+    services.book_appointment(conn, patient_id, doctor_id, tomorrow.isoformat(), "10:30")
+    day = doctor_calendar(conn, doctor_id)[1]
+    assert day[1] == 1 and "10:30" not in day[2]
+    assert _loads() == 1
+
+
+def test_past_days_are_dropped(conn):
+    doctor_id = add_doctor(conn)
+    last_week = date.today() - timedelta(days=7)
+    slot_index.ensure_loaded(conn, doctor_id, last_week, 14)
+    assert not [key for key in slot_index._masks if key[1] < date.today().isoformat()]
@@ -0,0 +1,24 @@
+import io
+import json
+
+from batch import read_operations, run_batch
+from conftest import add_patient
+
+
+def test_database_errors_fail_only_their_operation(conn):
+    patient_id = add_patient(conn)
+    bill_id = conn.execute("INSERT INTO Bill (PatientID, BillType, Amount, Date) VALUES (?, 'Appointment', 800, "
+                           "'2024-09-25')", (patient_id,)).lastrowid
+    conn.commit()
+    lines = [
+        {'op': 'pay_bill', 'patient_id': patient_id, 'bill_id': [bill_id]},
+        {'op': 'pay_bill', 'patient_id': patient_id, 'bill_id': bill_id},
+    ]
+    out = io.StringIO()
+    succeeded, failed, _ = run_batch(conn, read_operations(io.StringIO("\n".join(map(json.dumps, lines)))),
+                                     out=out)
+
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert (succeeded, failed) == (1, 1)
+    assert [(r['line'], r['ok']) for r in results] == [(1, False), (2, True)]
+    assert conn.execute("SELECT PaymentStatus FROM Bill WHERE BillID = ?", (bill_id,)).fetchone()[0] == 'Paid'
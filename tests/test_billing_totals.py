@@ -0,0 +1,54 @@
+from datetime import date
+
+import services
+from conftest import add_patient
+
+
+def _balances(conn):
+    kept = conn.execute("SELECT PatientID, Outstanding, PendingCount, OldestPending FROM PatientBalance "
+                        "WHERE PendingCount > 0 OR Outstanding != 0 ORDER BY PatientID").fetchall()
+    summed = conn.execute("""
+        SELECT PatientID, ROUND(SUM(Amount), 2), COUNT(*), MIN(Date) FROM Bill
+        WHERE PaymentStatus = 'Pending' GROUP BY PatientID ORDER BY PatientID
+    """).fetchall()
+    return kept, summed
+
+
+def _sales(conn):
+    kept = conn.execute("SELECT MedicineID, UnitsSold, Revenue, Orders FROM MedicineSales "
+                        "WHERE UnitsSold > 0 ORDER BY MedicineID").fetchall()
+    summed = conn.execute("""
+        SELECT MedicineID, SUM(Quantity), ROUND(SUM(Quantity * UnitPrice), 2), COUNT(*) FROM BillItem
+        GROUP BY MedicineID ORDER BY MedicineID
+    """).fetchall()
+    return kept, summed
+
+
+def test_trigger_totals_match_the_bills(conn):
+    paracetamol, insulin = (conn.execute("INSERT INTO Medicine (Name, Cost) VALUES (?, ?)", medicine).lastrowid
+                            for medicine in [("Paracetamol", 2.5), ("Insulin", 40.25)])
+    conn.execute("INSERT INTO Room (RoomType, AvailabilityStatus, Cost) VALUES ('General', 'Available', 500)")
+    alice, bob = add_patient(conn, "Alice"), add_patient(conn, "Bob")
+    conn.commit()
+
+    first = services.checkout_medicines(conn, alice, [(paracetamol, 2), (insulin, 1), (paracetamol, 1)])
+    services.checkout_medicines(conn, bob, [(insulin, 3)])
+    services.book_room(conn, alice, 'General', date.today(), nights=2)
+    assert first['amount'] == 47.75
+    kept, summed = _balances(conn)
+    assert kept == summed and len(kept) == 2
+    kept, summed = _sales(conn)
+    assert kept == summed == [(paracetamol, 3, 7.5, 1), (insulin, 4, 161.0, 2)]
+
+    services.pay_bill(conn, alice, first['bill_id'])
+    services.discharge_patient(conn, alice)
+    kept, summed = _balances(conn)
+    assert kept == summed
+    assert conn.execute("SELECT LastPayment FROM PatientBalance WHERE PatientID = ?",
+                        (alice,)).fetchone()[0] == date.today().isoformat()
+
+    # A price change does not touch what was already sold
+    conn.execute("UPDATE Medicine SET Cost = 99 WHERE MedicineID = ?", (insulin,))
+    conn.commit()
+    kept, summed = _sales(conn)
+    assert kept == summed
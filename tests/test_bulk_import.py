@@ -0,0 +1,29 @@
+import bulk_import
+
+
+def test_bad_jsonl_lines_are_rejected_not_fatal(conn, tmp_path):
+    path = tmp_path / "medicines.jsonl"
+    path.write_text('{"Name": "Ibuprofen", "Cost": 5}\n'
+                    '\n'
+                    '{"Name": "Paracetamol", "Cost": \n'
+                    '[1, 2]\n'
+                    '{"Name": "Aspirin", "Cost": [3]}\n'
+                    '{"Name": "Amoxicillin", "Cost": 15}\n')
+
+    inserted, errors, _ = bulk_import.import_rows(conn, 'Medicine', bulk_import.read_rows(str(path)),
+                                                  batch_size=1, out=None)
+
+    assert inserted == 2
+    assert [number for number, _ in errors] == [3, 4, 5]
+    assert errors[0][1].startswith("invalid JSON")
+    assert errors[1][1] == "each line must be a JSON object"
+    assert [row[0] for row in conn.execute("SELECT Name FROM Medicine ORDER BY MedicineID")] == \
+        ["Ibuprofen", "Amoxicillin"]
+
+
+def test_csv_rows_are_numbered_from_one(conn, tmp_path):
+    path = tmp_path / "rooms.csv"
+    path.write_text("RoomType,Cost\nGeneral,500\nICU,\n")
+    inserted, errors, _ = bulk_import.import_rows(conn, 'Room', bulk_import.read_rows(str(path)), out=None)
+    assert inserted == 1
+    assert errors == [(2, "missing Cost")]
@@ -0,0 +1,32 @@
+import multiprocessing
+from datetime import date, timedelta
+
+from availability import ALL_SLOTS
+from benchmark import _booker
+from conftest import add_doctor, add_patient
+
+BOOKERS = 8
+
+
+def test_exactly_one_process_wins_a_slot(conn, db_path):
+    doctor_id = add_doctor(conn)
+    for i in range(BOOKERS):
+        add_patient(conn, f"Patient {i}")
+    conn.commit()
+    slot = (doctor_id, (date.today() + timedelta(days=1)).isoformat(), ALL_SLOTS[0])
+
+    start, results = multiprocessing.Event(), multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_booker, args=(db_path, i, [slot], BOOKERS, start, results))
+                 for i in range(BOOKERS)]
+    for process in processes:
+        process.start()
+    start.set()
+    counts = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=60)
+
+    assert sum(c['booked'] for c in counts) == 1
+    assert sum(c['taken'] for c in counts) == BOOKERS - 1
+    assert sum(c['errors'] for c in counts) == 0
+    assert conn.execute("SELECT COUNT(*) FROM Appointment").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM Bill").fetchone()[0] == 1
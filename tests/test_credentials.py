@@ -0,0 +1,65 @@
+import pytest
+
+import credentials
+from credentials import (PBKDF2, SCRYPT, authenticate, hash_password, needs_upgrade, password_status,
+                         verify_password)
+
+
+def _add_login(conn, password, user_type='Patient'):
+    user_id = conn.execute("INSERT INTO LoginCredits (Password, UserType) VALUES (?, ?)",
+                           (password, user_type)).lastrowid
+    conn.commit()
+    return user_id
+
+
+def _stored(conn, user_id):
+    return conn.execute("SELECT Password FROM LoginCredits WHERE UserID = ?", (user_id,)).fetchone()[0]
+
+
+@pytest.mark.parametrize('scheme, cost', [(SCRYPT, 2 ** 10), (PBKDF2, 1000)])
+def test_hashes_verify_only_their_password(scheme, cost):
+    stored = hash_password("s3cret", scheme, cost)
+    assert stored.startswith(f"{scheme}${cost}$")
+    assert stored != hash_password("s3cret", scheme, cost)
+    assert verify_password("s3cret", stored)
+    assert not verify_password("s3cret ", stored)
+    assert not verify_password("s3cret", None)
+    # Cheaper than the current policy
+    assert needs_upgrade(stored)
+    assert password_status(stored).endswith("(outdated)")
+
+
+def test_plaintext_password_is_upgraded_at_login(conn):
+    user_id = _add_login(conn, "letmein")
+    assert needs_upgrade("letmein")
+
+    assert not authenticate(conn, user_id, "wrong", 'Patient', inline=True)
+    assert _stored(conn, user_id) == "letmein"
+    assert not authenticate(conn, user_id, "letmein", 'Doctor', inline=True)
+
+    assert authenticate(conn, user_id, "letmein", 'Patient', inline=True)
+    stored = _stored(conn, user_id)
+    assert stored.startswith(credentials.DEFAULT_SCHEME + "$") and not needs_upgrade(stored)
+    assert authenticate(conn, user_id, "letmein", 'Patient', inline=True)
+    assert _stored(conn, user_id) == stored
+
+
+def test_unknown_users_are_checked_against_a_dummy_hash(conn, monkeypatch):
+    checked = []
+    verify = credentials.verify_password
+    monkeypatch.setattr(credentials, 'verify_password',
+                        lambda password, stored: checked.append(stored) or verify(password, stored))
+
+    assert not authenticate(conn, 999, "anything", 'Patient', inline=True)
+    # The KDF still runs, so a missing account is as slow to reject as a wrong password
+    assert checked == [credentials._DUMMY_HASH]
+    assert checked[0].startswith(credentials.DEFAULT_SCHEME + "$")
+
+
+def test_worker_pool_verifies_logins(conn):
+    user_id = _add_login(conn, hash_password("s3cret", PBKDF2, 1000))
+    try:
+        assert authenticate(conn, user_id, "s3cret", 'Patient', upgrade=False)
+        assert not authenticate(conn, user_id, "wrong", 'Patient', upgrade=False)
+    finally:
+        credentials.shutdown()
@@ -0,0 +1,41 @@
+from connection import connect
+from data_access import builder_stats, fetch_chunks, fetch_data, query_stats
+from conftest import add_doctor, add_patient
+from instrumentation import sql_metrics
+from paging import KeysetPager
+from search import search_doctors
+
+
+def test_dynamic_statements_are_timed_under_their_names(conn):
+    add_doctor(conn, "Dr. Robert Brown", "Neurologist")
+    assert [row[1] for row in search_doctors(conn, "neuro")] == ["Dr. Robert Brown"]
+    KeysetPager(conn, ["DoctorID"], "Doctor", keys=["Specialization", "DoctorID"]).first_page()
+    assert {'fulltext_Doctor', 'keyset_page'} <= set(sql_metrics.queries)
+
+
+def test_report_bills_binds_dates_before_bill_types(conn):
+    patient_id = add_patient(conn)
+    for bill_type, day in [('Room', '2024-09-24'), ('Medicines', '2024-09-25'), ('Room', '2024-09-26')]:
+        conn.execute("INSERT INTO Bill (PatientID, BillType, Amount, Date) VALUES (?, ?, 10, ?)",
+                     (patient_id, bill_type, day))
+    dates = ('2024-09-25', None)
+    types = [row[0] for row in fetch_data(conn, 'report_bill_types', dates)]
+    codes = [value for code, name in enumerate(types) for value in (name, code)]
+    rows = [row for chunk in fetch_chunks(conn, 'report_bills', dates + tuple(codes), args=(len(types),))
+            for row in chunk]
+    assert sorted(types[row[0]] for row in rows) == ['Medicines', 'Room']
+
+
+def test_statement_cache_counters_follow_each_connection(conn, db_path):
+    add_doctor(conn)
+    other = connect(db_path)
+    for connection in (conn, conn, other):
+        fetch_data(connection, 'active_doctors')
+    pager = KeysetPager(conn, ["DoctorID"], "Doctor", keys=["DoctorID"])
+    pager.first_page()
+    pager.first_page()
+    other.close()
+
+    assert ('active_doctors', 1, 2) in query_stats()
+    assert dict((row[0], row[1:]) for row in query_stats())['keyset_page'] == (1, 1)
+    assert dict((row[0], row[1:]) for row in builder_stats())['keyset_page'] == (1, 1, 1)
@@ -0,0 +1,44 @@
+from conftest import add_doctor
+from connection import connect
+from directory import directory
+from instrumentation import sql_metrics
+
+
+def test_directory_sees_doctors_added_by_other_connections(conn, db_path, monkeypatch):
+    monkeypatch.setattr(directory, 'check_seconds', 0)
+    add_doctor(conn, "Dr. Emily Clark")
+    conn.commit()
+    hits = directory.hits
+    assert [row[1] for row in directory.fetch(conn, 'active_doctors')] == ["Dr. Emily Clark"]
+    assert [row[1] for row in directory.fetch(conn, 'active_doctors')] == ["Dr. Emily Clark"]
+    assert directory.hits == hits + 1
+
+    # Another process: no local invalidate() runs
+    other = connect(db_path)
+    add_doctor(other, "Dr. Robert Brown", "Neurologist")
+    other.commit()
+    other.close()
+
+    assert [row[1] for row in directory.fetch(conn, 'active_doctors')] == ["Dr. Emily Clark", "Dr. Robert Brown"]
+    assert directory.hits == hits + 1
+
+
+def test_hits_within_the_check_interval_run_no_query(conn, monkeypatch):
+    add_doctor(conn)
+    conn.commit()
+    monkeypatch.setattr(directory, 'check_seconds', 60)
+    directory.fetch(conn, 'active_doctors')
+    before = directory.stats()
+    queries = sql_metrics.queries['catalog_version'].latency.count + sql_metrics.queries['active_doctors'].latency.count
+
+    for _ in range(5):
+        directory.fetch(conn, 'active_doctors')
+    assert sum(sql_metrics.queries[name].latency.count for name in ('catalog_version', 'active_doctors')) == queries
+    after = directory.stats()
+    assert (after['hits'] - before['hits'], after['version_checks'] - before['version_checks']) == (5, 0)
+
+    # A local write is seen at once, interval or not
+    add_doctor(conn, "Dr. Robert Brown")
+    conn.commit()
+    directory.invalidate()
+    assert len(directory.fetch(conn, 'active_doctors')) == 2
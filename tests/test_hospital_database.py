@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter: the check covers everything the import pulls in
+CHECK = """
+import sqlite3
+import threading
+
+opened = []
+connect = sqlite3.connect
+sqlite3.connect = lambda *args, **kwargs: opened.append(args) or connect(*args, **kwargs)
+
+import connection
+import Hospital_Database
+
+assert opened == [], opened
+assert connection._pool is None
+assert Hospital_Database.scheduler._thread is None
+assert threading.active_count() == 1, threading.enumerate()
+"""
+
+
+def test_importing_the_app_has_no_side_effects(tmp_path):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", CHECK], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == ""
+    assert os.listdir(tmp_path) == []
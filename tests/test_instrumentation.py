@@ -0,0 +1,50 @@
+import json
+
+from conftest import add_patient
+from data_access import fetch_data
+from instrumentation import BUCKETS, sql_metrics
+
+
+def test_slow_queries_are_logged_with_their_plan(conn, monkeypatch):
+    patient_id = add_patient(conn)
+    conn.commit()
+    fetch_data(conn, 'patient_balance', (patient_id,))
+    monkeypatch.setattr(sql_metrics, 'slow_seconds', 0.0)
+    fetch_data(conn, 'patient_balance', (patient_id,))
+
+    with open(sql_metrics.slow_log) as log:
+        entries = [json.loads(line) for line in log]
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry['query'] == 'patient_balance' and entry['rows'] == 0 and entry['ms'] >= 0
+    assert any('PatientBalance' in step for step in entry['plan'])
+    # Parameters can hold patient details and are never written
+    assert set(entry) == {'time', 'query', 'ms', 'rows', 'plan'}
+
+
+def test_prometheus_text_has_histograms_counters_and_gauges(conn, monkeypatch):
+    fetch_data(conn, 'all_rooms')
+    fetch_data(conn, 'all_rooms')
+    monkeypatch.setattr(sql_metrics, 'slow_seconds', 0.0)
+    fetch_data(conn, 'all_rooms')
+
+    lines = sql_metrics.prometheus_text({'hospital_cache_entries': ("Cache entries.", 'gauge', 7)}).splitlines()
+    assert "# TYPE hospital_sql_query_duration_seconds histogram" in lines
+    prefix = 'hospital_sql_query_duration_seconds_bucket{query="all_rooms"'
+    buckets = [line for line in lines if line.startswith(prefix)]
+    assert len(buckets) == len(BUCKETS) + 1
+    assert buckets[-1] == 'hospital_sql_query_duration_seconds_bucket{query="all_rooms",le="+Inf"} 3'
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)
+    assert 'hospital_sql_query_duration_seconds_count{query="all_rooms"} 3' in lines
+    assert 'hospital_sql_slow_queries_total{query="all_rooms"} 1' in lines
+    assert 'hospital_sql_query_errors_total{query="all_rooms"} 0' in lines
+    assert "# TYPE hospital_cache_entries gauge" in lines and "hospital_cache_entries 7" in lines
+
+
+def test_prometheus_file_is_replaced_whole(tmp_path):
+    path = tmp_path / "hospital_metrics.prom"
+    path.write_text("stale\n")
+    sql_metrics.write_prometheus(str(path))
+    assert path.read_text() == sql_metrics.prometheus_text()
+    assert not (tmp_path / "hospital_metrics.prom.tmp").exists()
@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+import services
+from conftest import add_doctor
+from connection import connect
+from leaves import leave_calendar
+from migrations import migrate
+
+
+def _leave(conn, doctor_id, start, end, status='Accepted'):
+    conn.execute("INSERT INTO Leave (DoctorID, SelectDate, ReturnDate, LeaveStatus) VALUES (?, ?, ?, ?)",
+                 (doctor_id, start, end, status))
+
+
+def test_calendar_merges_accepted_leaves(conn):
+    doctor_id, other_id = add_doctor(conn), add_doctor(conn, "Dr. Robert Brown")
+    _leave(conn, doctor_id, '2024-09-10', '2024-09-12')
+    _leave(conn, doctor_id, '2024-09-11', '2024-09-15')
+    _leave(conn, doctor_id, '2024-09-20', '2024-09-20')
+    _leave(conn, doctor_id, '2024-09-17', '2024-09-18', status='Pending')
+    _leave(conn, other_id, '2024-09-01', '2024-09-30', status='Rejected')
+    conn.commit()
+    leave_calendar.ensure_current(conn)
+
+    assert leave_calendar._ranges[doctor_id] == (['2024-09-10', '2024-09-20'], ['2024-09-15', '2024-09-20'])
+    assert [day for day in ('2024-09-09', '2024-09-10', '2024-09-15', '2024-09-16', '2024-09-20')
+            if leave_calendar.is_on_leave(doctor_id, day)] == ['2024-09-10', '2024-09-15', '2024-09-20']
+    assert not leave_calendar.is_on_leave(other_id, '2024-09-10')
+    assert leave_calendar.leave_days(doctor_id, date(2024, 9, 14), 7) == {
+        date(2024, 9, 14), date(2024, 9, 15), date(2024, 9, 20)}
+
+
+def test_calendar_reloads_when_a_leave_is_accepted(conn):
+    doctor_id = add_doctor(conn)
+    conn.commit()
+    leave_calendar.ensure_current(conn)
+    assert not leave_calendar.is_on_leave(doctor_id, '2024-09-10')
+
+    _leave(conn, doctor_id, '2024-09-10', '2024-09-10')
+    conn.commit()
+    leave_calendar.ensure_current(conn)
+    assert leave_calendar.is_on_leave(doctor_id, '2024-09-10')
+
+
+def test_leaves_with_unreadable_dates_are_ignored(tmp_path):
+    conn = connect(str(tmp_path / "old.db"))
+    migrate(conn, target=6)
+    doctor_id = add_doctor(conn)
+    tomorrow = date.today() + timedelta(days=1)
+    _leave(conn, doctor_id, tomorrow.isoformat(), 'soon')
+    _leave(conn, doctor_id, 'later', tomorrow.isoformat())
+    conn.commit()
+    # Version 7 clears dates it cannot read
+    migrate(conn)
+
+    calendar = services.doctor_availability(conn, doctor_id, tomorrow.isoformat(), 2)
+    assert [day['on_leave'] for day in calendar] == [False, False]
+    conn.close()
@@ -0,0 +1,65 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from conftest import add_doctor, add_patient
+from connection import connect
+from migrations import migrate
+
+
+def _trigger_sql(conn, name):
+    return conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)).fetchone()[0]
+
+
+def test_upgrade_records_payments_on_the_local_date(tmp_path):
+    conn = connect(str(tmp_path / "old.db"))
+    migrate(conn, target=12)
+    # The trigger as version 6 used to create it, in UTC
+    conn.execute("DROP TRIGGER Bill_balance_au")
+    conn.execute("CREATE TRIGGER Bill_balance_au AFTER UPDATE OF PaymentStatus ON Bill BEGIN "
+                 "UPDATE PatientBalance SET LastPayment = date('now') WHERE PatientID = new.PatientID; END")
+    conn.commit()
+    migrate(conn)
+
+    assert "'localtime'" in _trigger_sql(conn, 'Bill_balance_au')
+    patient_id = add_patient(conn)
+    bill_id = conn.execute("INSERT INTO Bill (PatientID, BillType, Amount, Date) VALUES (?, 'Room', 100, "
+                           "'2024-09-25')", (patient_id,)).lastrowid
+    conn.execute("UPDATE Bill SET PaymentStatus = 'Paid' WHERE BillID = ?", (bill_id,))
+    row = conn.execute("SELECT Outstanding, LastPayment FROM PatientBalance WHERE PatientID = ?",
+                       (patient_id,)).fetchone()
+    assert row == (0, date.today().isoformat())
+    conn.close()
+
+
+def test_date_fix_moves_only_colliding_appointments(tmp_path):
+    conn = connect(str(tmp_path / "old.db"))
+    migrate(conn, target=6)
+    doctor_id, patient_id = add_doctor(conn), add_patient(conn)
+    for day in ('2024-09-25', '25/09/2024'):
+        conn.execute("INSERT INTO Appointment (PatientID, DoctorID, Date, Time) VALUES (?, ?, ?, '10:00')",
+                     (patient_id, doctor_id, day))
+    conn.commit()
+    migrate(conn)
+
+    assert conn.execute("SELECT Date FROM Appointment").fetchall() == [('2024-09-25',)]
+    assert conn.execute("SELECT Date FROM AppointmentConflict").fetchall() == [('25/09/2024',)]
+    conn.close()
+
+
+def test_date_fix_fails_on_other_constraint_errors(tmp_path):
+    conn = connect(str(tmp_path / "old.db"))
+    migrate(conn, target=6)
+    patient_id = add_patient(conn)
+    conn.execute("CREATE UNIQUE INDEX idx_one_bill_a_day ON Bill (PatientID, Date)")
+    for day in ('2024-09-25', '25/09/2024'):
+        conn.execute("INSERT INTO Bill (PatientID, BillType, Amount, Date) VALUES (?, 'Room', 100, ?)",
+                     (patient_id, day))
+    conn.commit()
+    with pytest.raises(sqlite3.IntegrityError):
+        migrate(conn)
+
+    assert conn.execute("SELECT MAX(Version) FROM schema_version").fetchone()[0] == 6
+    assert conn.execute("SELECT COUNT(*) FROM AppointmentConflict").fetchone()[0] == 0
+    conn.close()
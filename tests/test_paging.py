@@ -0,0 +1,42 @@
+import pytest
+
+from paging import KeysetPager
+
+
+@pytest.fixture
+def patients(conn):
+    # 35 patients, 25 of them with no name, interleaved with the named ones
+    for i in range(35):
+        conn.execute("INSERT INTO Patient (Name) VALUES (?)", (None if i % 7 < 5 else f"P{i % 3}",))
+    return conn
+
+
+def _expected(conn, descending):
+    direction = "DESC" if descending else "ASC"
+    return conn.execute(f"SELECT PatientID, Name FROM Patient "
+                        f"ORDER BY Name {direction}, PatientID {direction}").fetchall()
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_null_keys_are_paged_forwards_and_backwards(patients, descending):
+    pager = KeysetPager(patients, ["PatientID", "Name"], "Patient", keys=["Name", "PatientID"],
+                        page_size=4, descending=descending)
+    pages = [pager.first_page()]
+    while pager.has_next:
+        pages.append(pager.next_page())
+    rows = [row for page in pages for row in page]
+    assert rows == _expected(patients, descending)
+    assert len(rows) == 35
+
+    for page in reversed(pages[:-1]):
+        assert pager.prev_page() == page
+    assert not pager.has_prev
+
+
+def test_where_filter_with_null_keys(patients):
+    pager = KeysetPager(patients, ["PatientID"], "Patient", keys=["Name", "PatientID"],
+                        where="PatientID > ?", params=(10,), page_size=3)
+    rows = pager.first_page()
+    while pager.has_next:
+        rows += pager.next_page()
+    assert [row[0] for row in rows] == [row[0] for row in _expected(patients, False) if row[0] > 10]
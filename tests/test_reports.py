@@ -0,0 +1,51 @@
+from datetime import date
+
+import pytest
+
+from conftest import add_doctor, add_patient
+from dates import day_number_sql
+from reports import _day, _iso
+
+
+def test_day_numbers_match_python(conn):
+    assert _day('2024-09-25') == 19991
+    assert _iso(19991) == '2024-09-25'
+    for day in ('1970-01-01', '2000-02-29', '2024-09-25', '2024-12-31'):
+        assert conn.execute(f"SELECT {day_number_sql('?')}", (day,)).fetchone()[0] == _day(day)
+    assert conn.execute(f"SELECT {day_number_sql('?')}", ('not a date',)).fetchone()[0] == -1
+
+
+def test_doctor_rows_report_booked_value(conn):
+    pytest.importorskip('numpy')
+    from reports import build_report
+
+    doctor_id = add_doctor(conn, cost=800)
+    patient_id = add_patient(conn)
+    conn.execute("INSERT INTO Appointment (PatientID, DoctorID, Date, Time) VALUES (?, ?, '2024-09-25', '10:00')",
+                 (patient_id, doctor_id))
+    conn.execute("INSERT INTO Bill (PatientID, BillType, Amount, Date) VALUES (?, 'Appointment', 800, '2024-09-25')",
+                 (patient_id,))
+    conn.commit()
+
+    report = build_report(conn, today=date(2024, 9, 30))
+    assert report['by_day'] == [{'date': '2024-09-25', 'billed': 800.0, 'collected': 0.0}]
+    assert report['by_doctor'][0]['booked_value'] == 800.0
+
+
+def test_report_cli_migrates_a_new_database(tmp_path, monkeypatch, capsys):
+    import reports
+    from connection import connect
+    from migrations import applied_version, latest_version
+
+    path = str(tmp_path / "new.db")
+    monkeypatch.setattr('sys.argv', ['reports.py', '--db', path, '--json'])
+    status = reports.main()
+
+    conn = connect(path)
+    assert applied_version(conn) == latest_version()
+    conn.close()
+    if reports.np is None:
+        # Without NumPy the report stops with its own message, not "no such table"
+        assert status == 1 and "NumPy" in capsys.readouterr().err
+    else:
+        assert status == 0
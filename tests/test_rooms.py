@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+import services
+from conftest import add_patient
+from connection import connect
+from rooms import room_allocator
+
+
+def _day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def _add_rooms(conn):
+    ids = [conn.execute("INSERT INTO Room (RoomType, AvailabilityStatus, Cost) VALUES (?, ?, ?)", room).lastrowid
+           for room in [('General', 'Available', 500.0), ('General', 'Available', 500.0),
+                        ('General', 'Available', 500.0), ('ICU', 'Occupied', 2000.0)]]
+    conn.commit()
+    return ids
+
+
+def test_rooms_added_as_occupied_are_held_tonight(conn):
+    _add_rooms(conn)
+    tonight = {row['room_type']: row['free_rooms'] for row in services.room_availability(conn)}
+    tomorrow = {row['room_type']: row['free_rooms'] for row in services.room_availability(conn, _day(1))}
+    assert tonight['ICU'] == []
+    assert len(tomorrow['ICU']) == 1
+
+
+def test_free_rooms_follow_stays_from_any_connection(conn, db_path):
+    first, second, third, _ = _add_rooms(conn)
+    patient_id = add_patient(conn)
+    conn.commit()
+    stay = services.book_room(conn, patient_id, 'General', _day(2), nights=2, room_id=first)
+
+    assert room_allocator.free_rooms('General', _day(1), _day(2)) == [first, second, third]
+    assert room_allocator.free_rooms('General', _day(3), _day(5)) == [second, third]
+    assert room_allocator.free_rooms('General', _day(0), _day(9), limit=1) == [second]
+
+    # Another process books the second room; no local invalidate() runs
+    other = connect(db_path)
+    other.execute("INSERT INTO RoomStay (RoomID, PatientID, CheckIn, CheckOut) VALUES (?, ?, ?, ?)",
+                  (second, patient_id, _day(3), _day(4)))
+    other.commit()
+    other.close()
+    assert room_allocator.free_rooms('General', _day(3), _day(4)) == [second, third]
+    room_allocator.ensure_current(conn)
+    assert room_allocator.free_rooms('General', _day(3), _day(4)) == [third]
+
+    services.end_stay(conn, stay['stay_id'])
+    room_allocator.ensure_current(conn)
+    assert room_allocator.free_rooms('General', _day(3), _day(4)) == [first, third]
@@ -0,0 +1,58 @@
+import time
+from datetime import date, timedelta
+
+from conftest import add_doctor, add_patient
+from scheduler import default_scheduler
+
+
+def _day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def test_first_tick_runs_the_due_jobs(conn, db_path):
+    doctor_id, patient_id = add_doctor(conn), add_patient(conn)
+    for select_date, return_date, status in [(_day(-1), _day(2), 'Pending'), (_day(3), _day(4), 'Pending'),
+                                             (_day(-5), _day(-2), 'Accepted'), (_day(-1), _day(1), 'Accepted')]:
+        conn.execute("INSERT INTO Leave (DoctorID, SelectDate, ReturnDate, LeaveStatus) VALUES (?, ?, ?, ?)",
+                     (doctor_id, select_date, return_date, status))
+    for day in (_day(-40), _day(-3)):
+        conn.execute("INSERT INTO Appointment (PatientID, DoctorID, Date, Time) VALUES (?, ?, ?, '10:00')",
+                     (patient_id, doctor_id, day))
+    room_id = conn.execute("INSERT INTO Room (RoomType, AvailabilityStatus, Cost) "
+                           "VALUES ('General', 'Occupied', 500)").lastrowid
+    conn.execute("UPDATE RoomStay SET CheckIn = ?, CheckOut = ? WHERE RoomID = ?", (_day(-2), _day(0), room_id))
+    conn.commit()
+
+    scheduler = default_scheduler(db_path).start()
+    due = {'expire_leaves', 'archive_appointments', 'release_rooms'}
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and not all(m['runs'] for m in scheduler.metrics() if m['job'] in due):
+        time.sleep(0.01)
+    scheduler.stop()
+
+    metrics = {m['job']: m for m in scheduler.metrics()}
+    assert {job: (metrics[job]['runs'], metrics[job]['last_error']) for job in due} == {
+        job: (1, None) for job in due}
+    # Held back by its delay
+    assert metrics['recompute_summaries']['runs'] == 0
+    assert [row[0] for row in conn.execute("SELECT LeaveStatus FROM Leave ORDER BY LeaveID")] == [
+        'Expired', 'Pending', 'Completed', 'Accepted']
+    assert conn.execute("SELECT Date FROM Appointment").fetchall() == [(_day(-3),)]
+    assert conn.execute("SELECT Date FROM AppointmentArchive").fetchall() == [(_day(-40),)]
+    assert conn.execute("SELECT Status FROM RoomStay WHERE RoomID = ?", (room_id,)).fetchone()[0] == 'Discharged'
+    assert conn.execute("SELECT AvailabilityStatus FROM Room WHERE RoomID = ?",
+                        (room_id,)).fetchone()[0] == 'Available'
+
+
+def test_recompute_summaries_repairs_drifted_totals(conn, db_path):
+    patient_id = add_patient(conn)
+    conn.execute("INSERT INTO Bill (PatientID, BillType, Amount, Date) VALUES (?, 'Room', 120, ?)",
+                 (patient_id, _day(-1)))
+    conn.execute("UPDATE PatientBalance SET Outstanding = 0, PendingCount = 0 WHERE PatientID = ?", (patient_id,))
+    conn.commit()
+
+    scheduler = default_scheduler(db_path)
+    assert scheduler.run_job('recompute_summaries') == 1
+    scheduler.stop()
+    assert conn.execute("SELECT Outstanding, PendingCount FROM PatientBalance WHERE PatientID = ?",
+                        (patient_id,)).fetchone() == (120, 1)
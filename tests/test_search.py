@@ -0,0 +1,76 @@
+from catalog import medicine_index
+from conftest import add_doctor, add_patient
+from search import match_expression, search_doctors, search_patients
+
+
+def _names(rows):
+    return [row[1] for row in rows]
+
+
+def test_patient_search_follows_inserts_updates_and_deletes(conn):
+    john = add_patient(conn, "John Doe")
+    add_patient(conn, "Johanna Smith")
+    conn.commit()
+    assert sorted(_names(search_patients(conn, "joh"))) == ["Johanna Smith", "John Doe"]
+
+    conn.execute("UPDATE Patient SET Name = 'Jack Doe', MedicalHistory = 'asthma' WHERE PatientID = ?", (john,))
+    conn.commit()
+    assert _names(search_patients(conn, "joh")) == ["Johanna Smith"]
+    assert _names(search_patients(conn, "asth")) == ["Jack Doe"]
+    assert search_patients(conn, "asthma", columns=['Name']) == []
+
+    conn.execute("DELETE FROM Patient WHERE PatientID = ?", (john,))
+    conn.commit()
+    assert search_patients(conn, "doe") == []
+
+
+def test_doctor_search_needs_every_word(conn):
+    add_doctor(conn, "Dr. Emily Clark", "Cardiologist")
+    add_doctor(conn, "Dr. Emily Stone", "Neurologist")
+    conn.commit()
+    assert sorted(_names(search_doctors(conn, "emily"))) == ["Dr. Emily Clark", "Dr. Emily Stone"]
+    assert _names(search_doctors(conn, "emily neuro")) == ["Dr. Emily Stone"]
+    # FTS5 syntax typed at the menu is quoted, not interpreted
+    assert match_expression('clark" OR *') == '"clark"* "OR"*'
+    assert search_doctors(conn, "!!") == []
+
+
+def _add_medicine(conn, name, use, cost=1.0):
+    return conn.execute("INSERT INTO Medicine (Name, Cost, Use) VALUES (?, ?, ?)", (name, cost, use)).lastrowid
+
+
+def test_medicine_index_ranks_name_then_word_then_use(conn):
+    para = _add_medicine(conn, "Paracetamol 500mg", "fever and pain relief")
+    ibu = _add_medicine(conn, "Ibuprofen", "pain and swelling")
+    pain = _add_medicine(conn, "Painkiller Forte", "headache")
+    plus = _add_medicine(conn, "Aspirin Plus", "paracetamol-free pain relief")
+    conn.commit()
+    medicine_index.ensure_current(conn)
+
+    ids = lambda text, k=10: [row[0] for row in medicine_index.search(text, k)]
+    # Whole names first, then later words of names, then uses; each alphabetical
+    assert ids("pa") == [pain, para, ibu, plus]
+    assert ids("pa", k=2) == [pain, para]
+    assert ids("500") == [para]
+    assert ids("pain relief") == [para, plus]
+    assert ids("") == []
+    assert medicine_index.get(ibu)[0] == "Ibuprofen"
+
+
+def test_medicine_index_reloads_after_catalog_changes(conn):
+    para = _add_medicine(conn, "Paracetamol", "fever")
+    conn.commit()
+    medicine_index.ensure_current(conn)
+    assert [row[0] for row in medicine_index.search("para")] == [para]
+
+    conn.execute("UPDATE Medicine SET Name = 'Acetaminophen' WHERE MedicineID = ?", (para,))
+    cough = _add_medicine(conn, "Cough Syrup", "cough")
+    conn.commit()
+    medicine_index.ensure_current(conn)
+    assert medicine_index.search("para") == []
+    assert [row[0] for row in medicine_index.search("acet")] == [para]
+
+    conn.execute("DELETE FROM Medicine WHERE MedicineID = ?", (cough,))
+    conn.commit()
+    medicine_index.ensure_current(conn)
+    assert medicine_index.search("cough") == []
@@ -0,0 +1,27 @@
+import pytest
+
+from transactions import GroupCommitter
+
+
+def _add_medicine(conn, name):
+    if name == "bad":
+        raise ValueError("rejected")
+    return conn.execute("INSERT INTO Medicine (Name, Cost) VALUES (?, 1)", (name,)).lastrowid
+
+
+def test_group_commit_shares_commits_and_isolates_failures(conn, db_path):
+    committer = GroupCommitter(db_path, max_delay=0.05)
+    try:
+        names = [f"m{i}" for i in range(40)] + ["bad"]
+        futures = [committer.submit(_add_medicine, name) for name in names]
+        ids = [future.result(timeout=10) for future in futures[:-1]]
+        with pytest.raises(ValueError):
+            futures[-1].result(timeout=10)
+    finally:
+        committer.close()
+
+    assert len(set(ids)) == 40
+    assert committer.units == 41
+    assert committer.commits < committer.units
+    rows = conn.execute("SELECT Name FROM Medicine ORDER BY MedicineID").fetchall()
+    assert [row[0] for row in rows] == names[:-1]
@@ -0,0 +1,165 @@
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from connection import DB_PATH, connect
+from instrumentation import sql_metrics
+
+
+@contextmanager
+def transaction(conn, immediate=True):
+    """
+    Unit of work: every statement run inside the block commits together, or
+    none of them do. Nested blocks become savepoints of the outer transaction.
+    `immediate` takes the write lock up front so the commit cannot fail with
+    "database is locked" halfway through.
+    """
+    depth = conn.unit_of_work_depth
+    if depth == 0:
+        if conn.in_transaction:
+            conn.commit()
+        # BEGIN IMMEDIATE is where a writer waits out busy_timeout for the lock
+        started = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        except sqlite3.OperationalError as e:
+            sql_metrics.observe_lock_wait(time.perf_counter() - started, e)
+            raise
+        sql_metrics.observe_lock_wait(time.perf_counter() - started)
+    else:
+        conn.execute(f"SAVEPOINT uow_{depth}")
+    conn.unit_of_work_depth = depth + 1
+
+    try:
+        yield conn
+    except BaseException:
+        conn.unit_of_work_depth = depth
+        if depth == 0:
+            conn.rollback()
+        else:
+            conn.execute(f"ROLLBACK TO uow_{depth}")
+            conn.execute(f"RELEASE uow_{depth}")
+        raise
+    else:
+        conn.unit_of_work_depth = depth
+        if depth == 0:
+            conn.commit()
+        else:
+            conn.execute(f"RELEASE uow_{depth}")
+
+
+def is_busy(error):
+    """True for SQLITE_BUSY / SQLITE_LOCKED errors that are worth retrying."""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+def retry_on_busy(func, attempts=8, base_delay=0.005, max_delay=0.5):
+    """
+    Call func() and retry it when the database is busy, sleeping with
+    exponential backoff and full jitter between attempts. Other errors, and
+    the last busy error, are raised unchanged.
+    """
+    for attempt in range(attempts):
+        try:
+            return func()
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+
+class GroupCommitter:
+    """
+    Group commit for high-rate writers. Units of work submitted from any
+    thread are run by one writer thread; up to `max_batch` of them (or as many
+    as arrive within `max_delay` seconds) share a single transaction and
+    therefore a single fsync. Each unit runs in its own savepoint, so a unit
+    that raises is rolled back alone and its Future carries the exception.
+
+    A batch that finds the database busy is retried as a whole. If it still
+    fails, every unit's Future gets the error and `on_rollback` (optional) is
+    called so callers can drop anything they cached from the lost writes.
+    """
+
+    def __init__(self, path=DB_PATH, profile='wal', max_batch=64, max_delay=0.005, on_rollback=None):
+        self.path = path
+        self.profile = profile
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_rollback = on_rollback
+        self.commits = 0
+        self.units = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(conn, *args, **kwargs) and return a Future for its result."""
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        return self.submit(func, *args, **kwargs).result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        conn = connect(self.path, self.profile)
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            self._commit_batch(conn, batch)
+        conn.close()
+
+    def _run_units(self, conn, batch):
+        results = []
+        with transaction(conn):
+            for future, func, args, kwargs in batch:
+                try:
+                    with transaction(conn):
+                        results.append((future, True, func(conn, *args, **kwargs)))
+                except Exception as e:
+                    results.append((future, False, e))
+        return results
+
+    def _commit_batch(self, conn, batch):
+        # Units whose caller gave up waiting (a cancelled Future) are skipped
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = retry_on_busy(lambda: self._run_units(conn, batch))
+        except Exception as e:
+            if self.on_rollback:
+                self.on_rollback()
+            for future, *_ in batch:
+                future.set_exception(e)
+            return
+        self.commits += 1
+        self.units += len(batch)
+        for future, ok, value in results:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)